@@ -0,0 +1 @@
+# Benchmarks do pipeline (payloads sintéticos de report_lia)
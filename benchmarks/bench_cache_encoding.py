@@ -0,0 +1,69 @@
+"""
+Benchmark dos formatos do cache (storage.cache_encoding): pretty, compact, gzip e lzma.
+Para um payload grande (bruto e otimizado) mede bytes em disco, tempo de escrita (encode_json + gravação)
+e de leitura (load_json), e confere que a leitura devolve exatamente o payload gravado.
+Uso:
+  python -m benchmarks.bench_cache_encoding
+  python -m benchmarks.bench_cache_encoding --items 50000 --repeat 3 --json bench_cache_encoding.json
+"""
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.harness import best_time, write_results
+from benchmarks.synthetic import generate_report
+from src.optimizer import optimize_report_response
+from src.storage import CACHE_ENCODINGS, encode_json, load_json
+
+
+def run(n_items: int, repeat: int, folder: Path) -> list[dict]:
+    """Uma linha por (payload, formato)."""
+    raw = generate_report(n_items)
+    payloads = {"raw": raw, "optimized": optimize_report_response(raw, mode="share")}
+    rows = []
+    for kind, data in payloads.items():
+        for encoding in CACHE_ENCODINGS:
+            path = folder / f"{kind}_bench{CACHE_ENCODINGS[encoding]}"
+            write = best_time(lambda: path.write_bytes(encode_json(data, encoding)), repeat)
+            read = best_time(lambda: load_json(path), repeat)
+            rows.append({
+                "benchmark": "cache_encoding",
+                "payload": kind,
+                "items": n_items,
+                "encoding": encoding,
+                "bytes": path.stat().st_size,
+                "write_seconds": round(write, 6),
+                "read_seconds": round(read, 6),
+                "roundtrip_ok": load_json(path) == data,
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos formatos do cache (tamanho, escrita e leitura).")
+    parser.add_argument("--items", type=int, default=20000, help="Quantidade de conversas no payload.")
+    parser.add_argument("--repeat", type=int, default=3, help="Execuções por medição de tempo (vale a melhor).")
+    parser.add_argument("--json", type=str, default=None, help="Salvar resultados neste arquivo JSON.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="wrapper_bench_") as tmp:
+        rows = run(args.items, args.repeat, Path(tmp))
+    print(f"{'payload':>10} {'formato':>8} {'MB':>9} {'vs pretty':>9} {'escrita (ms)':>13} {'leitura (ms)':>13} {'ok':>5}")
+    pretty = {}
+    for row in rows:
+        if row["encoding"] == "pretty":
+            pretty[row["payload"]] = row["bytes"]
+        ratio = row["bytes"] / pretty[row["payload"]]
+        print(
+            f"{row['payload']:>10} {row['encoding']:>8} {row['bytes'] / 1024 / 1024:>9.2f} {ratio:>8.0%} "
+            f"{row['write_seconds'] * 1000:>13.1f} {row['read_seconds'] * 1000:>13.1f} {str(row['roundtrip_ok']):>5}"
+        )
+    if args.json:
+        write_results(args.json, rows, items=args.items, repeat=args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark da Visão Geral pela tabela colunar (src/dashboard_columnar.py) vs o laço item a item anterior
+(VisaoGeralAccumulator.add em cada conversa). Para cada tamanho mede o laço, a tabela com o módulo array
+e, se instalado, com NumPy; separa a montagem da tabela (load) das contagens (aggregate) e confere que
+a visao_geral é idêntica à do laço.
+Uso:
+  python -m benchmarks.bench_dashboard_columnar
+  python -m benchmarks.bench_dashboard_columnar --sizes 10000 100000 200000 --json bench_dashboard_columnar.json
+"""
+import argparse
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.harness import best_time, write_results
+from benchmarks.synthetic import generate_report
+from src.dashboard_columnar import ConversationTable, np
+from src.dashboard_treatments import VisaoGeralAccumulator
+from src.optimizer import optimize_report_response
+
+_HOJE = datetime(2026, 6, 1)
+
+
+def _loop(data: list) -> dict:
+    """build_visao_geral antes da tabela colunar: uma conversa por vez no acumulador."""
+    acc = VisaoGeralAccumulator()
+    for item in data:
+        acc.add(item)
+    return acc.result(_HOJE)
+
+
+def run(sizes: list[int], repeat: int) -> list[dict]:
+    """Uma linha por (tamanho, modo)."""
+    backends = {"array": False}
+    if np is not None:
+        backends["numpy"] = True
+    rows = []
+    for n_items in sizes:
+        data = optimize_report_response(generate_report(n_items), mode="inplace")["data"]
+        expected = _loop(data)
+        rows.append({
+            "benchmark": "build_visao_geral",
+            "items": n_items,
+            "mode": "loop",
+            "seconds": round(best_time(lambda: _loop(data), repeat), 6),
+            "load_seconds": None,
+            "aggregate_seconds": None,
+            "identical_output": True,
+        })
+        for mode, use_numpy in backends.items():
+            table = ConversationTable.from_items(data, use_numpy)
+            rows.append({
+                "benchmark": "build_visao_geral",
+                "items": n_items,
+                "mode": mode,
+                "seconds": round(best_time(lambda: ConversationTable.from_items(data, use_numpy).visao_geral(_HOJE), repeat), 6),
+                "load_seconds": round(best_time(lambda: ConversationTable.from_items(data, use_numpy), repeat), 6),
+                "aggregate_seconds": round(best_time(lambda: table.visao_geral(_HOJE), repeat), 6),
+                "identical_output": table.visao_geral(_HOJE) == expected,
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da Visão Geral colunar vs laço item a item.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 100000], help="Quantidade de conversas por payload.")
+    parser.add_argument("--repeat", type=int, default=3, help="Execuções por medição de tempo (vale a melhor).")
+    parser.add_argument("--json", type=str, default=None, help="Salvar resultados neste arquivo JSON.")
+    args = parser.parse_args()
+
+    rows = run(args.sizes, args.repeat)
+    print(f"{'itens':>8} {'modo':>6} {'total (ms)':>11} {'load (ms)':>10} {'agreg (ms)':>11} {'vs laço':>8} {'idêntico':>9}")
+    loop = {}
+    for row in rows:
+        if row["mode"] == "loop":
+            loop[row["items"]] = row["seconds"]
+        speedup = loop[row["items"]] / row["seconds"] if row["seconds"] else 0
+        load = f"{row['load_seconds'] * 1000:>10.1f}" if row["load_seconds"] is not None else f"{'-':>10}"
+        agg = f"{row['aggregate_seconds'] * 1000:>11.1f}" if row["aggregate_seconds"] is not None else f"{'-':>11}"
+        print(
+            f"{row['items']:>8} {row['mode']:>6} {row['seconds'] * 1000:>11.1f} {load} {agg} "
+            f"{speedup:>7.2f}x {str(row['identical_output']):>9}"
+        )
+    if args.json:
+        write_results(args.json, rows, numpy=np.__version__ if np is not None else None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark do dashboard em vários processos (src/dashboard_parallel.py) vs build_visao_geral em um núcleo.
+Para cada tamanho mede o tempo do modo sequencial, do pool com fork por chamada (só fora do servidor) e do pool
+persistente (reuse_pool, padrão do servidor, com pickle das partes), e confere que a visao_geral é idêntica à sequencial.
+O ganho depende dos núcleos livres: com 1 núcleo só aparece o custo de coordenação.
+Uso:
+  python -m benchmarks.bench_dashboard_parallel
+  python -m benchmarks.bench_dashboard_parallel --sizes 100000 200000 --workers 4 --json bench_dashboard_parallel.json
+"""
+import argparse
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.harness import best_time, write_results
+from benchmarks.synthetic import generate_report
+from src.dashboard_parallel import _fork_available, build_visao_geral_parallel, default_workers, shutdown_pool
+from src.dashboard_treatments import build_visao_geral
+from src.optimizer import optimize_report_response
+
+_HOJE = datetime(2026, 6, 1)
+
+
+def run(sizes: list[int], workers: int, repeat: int) -> list[dict]:
+    """Uma linha por (tamanho, modo)."""
+    modes = {"sequencial": None, "reuse_pool": True}
+    if _fork_available():
+        modes["fork"] = False
+    rows = []
+    for n_items in sizes:
+        optimized = optimize_report_response(generate_report(n_items), mode="inplace")
+        expected = build_visao_geral(optimized, _HOJE)
+        # Aquece o pool persistente (criação dos processos fica fora da medição)
+        build_visao_geral_parallel(optimized, _HOJE, workers=workers, min_items=0, reuse_pool=True)
+        for mode, reuse in modes.items():
+            if reuse is None:
+                fn = lambda: build_visao_geral(optimized, _HOJE)
+            else:
+                fn = lambda reuse=reuse: build_visao_geral_parallel(optimized, _HOJE, workers=workers, min_items=0, reuse_pool=reuse)
+            rows.append({
+                "benchmark": "build_visao_geral",
+                "items": n_items,
+                "mode": mode,
+                "workers": 1 if reuse is None else workers,
+                "seconds": round(best_time(fn, repeat), 6),
+                "identical_output": fn() == expected,
+            })
+    shutdown_pool()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do dashboard em vários processos.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50000, 100000], help="Quantidade de conversas por payload.")
+    parser.add_argument("--workers", type=int, default=default_workers(), help="Processos (padrão: núcleos da máquina).")
+    parser.add_argument("--repeat", type=int, default=3, help="Execuções por medição de tempo (vale a melhor).")
+    parser.add_argument("--json", type=str, default=None, help="Salvar resultados neste arquivo JSON.")
+    args = parser.parse_args()
+
+    rows = run(args.sizes, max(args.workers, 2), args.repeat)
+    print(f"{'itens':>8} {'modo':>11} {'processos':>9} {'tempo (ms)':>11} {'vs seq':>7} {'idêntico':>9}")
+    seq = {}
+    for row in rows:
+        if row["mode"] == "sequencial":
+            seq[row["items"]] = row["seconds"]
+        speedup = seq[row["items"]] / row["seconds"] if row["seconds"] else 0
+        print(
+            f"{row['items']:>8} {row['mode']:>11} {row['workers']:>9} {row['seconds'] * 1000:>11.1f} "
+            f"{speedup:>6.2f}x {str(row['identical_output']):>9}"
+        )
+    if args.json:
+        write_results(args.json, rows, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Micro-benchmark do parse de datas do dashboard: implementação anterior (laço de strptime) vs _DateParser
+(caminho rápido ISO-8601 + memória do formato) e vs o cache de birthDate, para cada forma de entrada aceita.
+Também confere que os resultados são idênticos aos da implementação anterior.
+Uso:
+  python -m benchmarks.bench_dates
+  python -m benchmarks.bench_dates --number 50000 --json bench_dates.json
+"""
+import argparse
+import json
+import sys
+import timeit
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.dashboard_treatments import _DateParser, _data_nascimento, _data_nascimento_memo
+
+# Uma amostra por forma de entrada suportada (e uma inválida)
+SHAPES = {
+    "iso_ms_z": "2026-01-14T14:30:00.123Z",
+    "iso_z": "2026-01-14T14:30:00Z",
+    "iso_espaco": "2026-01-14 14:30:00",
+    "data": "1990-03-10",
+    "iso_offset": "2026-01-14T14:30:00+03:00",
+    "epoch_ms": 1768401000000,
+    "epoch_s": 1768401000.0,
+    "invalida": "14/01/2026",
+}
+
+
+def _parse_date_anterior(value):
+    """Implementação anterior de dashboard_treatments._parse_date (referência)."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        try:
+            if value > 1e12:
+                value = value / 1000.0
+            return datetime.utcfromtimestamp(value)
+        except (OSError, ValueError):
+            return None
+    if isinstance(value, str):
+        for fmt in ("%Y-%m-%dT%H:%M:%S.%fZ", "%Y-%m-%dT%H:%M:%SZ", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
+            try:
+                return datetime.strptime(value.replace("Z", "").split(".")[0], fmt.replace(".%f", "").replace("Z", ""))
+            except ValueError:
+                continue
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            pass
+    return None
+
+
+def run(number: int) -> list[dict]:
+    """Mede µs por chamada de cada implementação, para cada forma de entrada."""
+    rows = []
+    for shape, value in SHAPES.items():
+        parser = _DateParser()
+        identical = repr(parser.parse(value)) == repr(_parse_date_anterior(value))
+        anterior = timeit.timeit(lambda: _parse_date_anterior(value), number=number)
+        novo = timeit.timeit(lambda: parser.parse(value), number=number)
+        _data_nascimento_memo.cache_clear()
+        nascimento = timeit.timeit(lambda: _data_nascimento(value), number=number)
+        rows.append({
+            "benchmark": "parse_date",
+            "shape": shape,
+            "anterior_us": round(anterior / number * 1e6, 3),
+            "date_parser_us": round(novo / number * 1e6, 3),
+            "birthdate_cached_us": round(nascimento / number * 1e6, 3),
+            "identical_output": identical,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark do parse de datas do dashboard.")
+    parser.add_argument("--number", type=int, default=20000, help="Chamadas por medição.")
+    parser.add_argument("--json", type=str, default=None, help="Salvar resultados neste arquivo JSON.")
+    args = parser.parse_args()
+
+    rows = run(args.number)
+    print(f"{'forma':>12} {'anterior (µs)':>14} {'parser (µs)':>12} {'birthDate (µs)':>15} {'idêntico':>9}")
+    for row in rows:
+        print(
+            f"{row['shape']:>12} {row['anterior_us']:>14.3f} {row['date_parser_us']:>12.3f} "
+            f"{row['birthdate_cached_us']:>15.3f} {str(row['identical_output']):>9}"
+        )
+    if args.json:
+        Path(args.json).write_text(json.dumps(rows, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
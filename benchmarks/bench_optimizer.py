@@ -0,0 +1,80 @@
+"""
+Benchmark do optimize_report_response: modos "copy" (deepcopy, comportamento anterior), "share" e "inplace".
+Para cada tamanho mede o tempo (melhor de N execuções) e o pico de memória alocada (tracemalloc),
+e confere que os três modos produzem exatamente o mesmo JSON (conteúdo e ordem das chaves).
+Uso:
+  python -m benchmarks.bench_optimizer
+  python -m benchmarks.bench_optimizer --sizes 1000 20000 --repeat 5 --json bench_optimizer.json
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.harness import best_time, peak_memory, write_results
+from benchmarks.synthetic import generate_report
+from src.optimizer import OPTIMIZE_MODES, optimize_report_response
+
+
+def _time_mode(n_items: int, mode: str, repeat: int) -> float:
+    """Melhor tempo (s) de optimize_report_response; payload novo a cada execução (inplace altera a entrada)."""
+    return best_time(lambda raw: optimize_report_response(raw, mode=mode), repeat, setup=lambda: generate_report(n_items))
+
+
+def _peak_memory(n_items: int, mode: str) -> int:
+    """Pico de memória (bytes) alocado durante a otimização, sem contar o payload de entrada."""
+    return peak_memory(lambda raw: optimize_report_response(raw, mode=mode), setup=lambda: generate_report(n_items))
+
+
+def _check_identical(n_items: int) -> bool:
+    """Os três modos geram o mesmo JSON serializado?"""
+    outputs = {
+        mode: json.dumps(optimize_report_response(generate_report(n_items), mode=mode), ensure_ascii=False)
+        for mode in OPTIMIZE_MODES
+    }
+    return len(set(outputs.values())) == 1
+
+
+def run(sizes: list[int], repeat: int) -> list[dict]:
+    """Executa o benchmark e retorna uma linha por (tamanho, modo)."""
+    rows = []
+    for n_items in sizes:
+        identical = _check_identical(min(n_items, 2000))
+        for mode in ("copy", "share", "inplace"):
+            rows.append({
+                "benchmark": "optimize_report_response",
+                "items": n_items,
+                "mode": mode,
+                "seconds": round(_time_mode(n_items, mode, repeat), 6),
+                "peak_bytes": _peak_memory(n_items, mode),
+                "identical_output": identical,
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos modos do optimizer (tempo e pico de memória).")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="Quantidade de conversas por payload.")
+    parser.add_argument("--repeat", type=int, default=3, help="Execuções por medição de tempo (vale a melhor).")
+    parser.add_argument("--json", type=str, default=None, help="Salvar resultados neste arquivo JSON.")
+    args = parser.parse_args()
+
+    rows = run(args.sizes, args.repeat)
+    print(f"{'itens':>8} {'modo':>8} {'tempo (ms)':>12} {'pico (MB)':>10} {'vs copy':>8} {'idêntico':>9}")
+    baseline = {}
+    for row in rows:
+        if row["mode"] == "copy":
+            baseline[row["items"]] = row["seconds"]
+        speedup = baseline[row["items"]] / row["seconds"] if row["seconds"] else 0
+        print(
+            f"{row['items']:>8} {row['mode']:>8} {row['seconds'] * 1000:>12.1f} "
+            f"{row['peak_bytes'] / 1024 / 1024:>10.2f} {speedup:>7.1f}x {str(row['identical_output']):>9}"
+        )
+    if args.json:
+        write_results(args.json, rows)
+
+
+if __name__ == "__main__":
+    main()
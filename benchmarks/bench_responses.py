@@ -0,0 +1,81 @@
+"""
+Benchmark do corpo das respostas do /wrapper (src/responses.py), visões dashboard e full:
+serialização (json.dumps como o JSONResponse vs render_json/orjson) e compressão (identity, gzip, br se instalado).
+Para cada combinação mostra bytes na resposta, tempo de servidor (serializar + comprimir) e o tempo até o
+último byte estimado para um link de --mbps (servidor + bytes / banda), como o caminho ngrok -> front.
+Uso:
+  python -m benchmarks.bench_responses
+  python -m benchmarks.bench_responses --items 20000 --mbps 20 --json bench_responses.json
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.harness import best_time, write_results
+from benchmarks.synthetic import generate_report
+from src.dashboard_treatments import build_dashboard_payload
+from src.optimizer import optimize_report_response
+from src.responses import SUPPORTED_ENCODINGS, compress, orjson, render_json
+
+
+def _stdlib_render(content) -> bytes:
+    """Serialização do JSONResponse do FastAPI (referência)."""
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def run(n_items: int, mbps: float, repeat: int) -> list[dict]:
+    optimized = optimize_report_response(generate_report(n_items), mode="inplace")
+    views = {"dashboard": build_dashboard_payload(optimized), "full": optimized}
+    renderers = {"json": _stdlib_render}
+    if orjson is not None:
+        renderers["orjson"] = render_json
+    rows = []
+    for view, payload in views.items():
+        for renderer_name, renderer in renderers.items():
+            body = renderer(payload)
+            render_s = best_time(lambda: renderer(payload), repeat)
+            for encoding in ("identity",) + SUPPORTED_ENCODINGS:
+                if encoding == "identity":
+                    content, compress_s = body, 0.0
+                else:
+                    content = compress(body, encoding)
+                    compress_s = best_time(lambda: compress(body, encoding), repeat)
+                server_s = render_s + compress_s
+                rows.append({
+                    "benchmark": "response_body",
+                    "view": view,
+                    "items": n_items,
+                    "renderer": renderer_name,
+                    "encoding": encoding,
+                    "bytes": len(content),
+                    "server_seconds": round(server_s, 6),
+                    "ttlb_seconds": round(server_s + len(content) * 8 / (mbps * 1e6), 6),
+                    "same_body": body == _stdlib_render(payload),
+                })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de serialização e compressão das respostas do wrapper.")
+    parser.add_argument("--items", type=int, default=10000, help="Quantidade de conversas no relatório.")
+    parser.add_argument("--mbps", type=float, default=20.0, help="Banda do link para estimar o tempo até o último byte.")
+    parser.add_argument("--repeat", type=int, default=3, help="Execuções por medição de tempo (vale a melhor).")
+    parser.add_argument("--json", type=str, default=None, help="Salvar resultados neste arquivo JSON.")
+    args = parser.parse_args()
+
+    rows = run(args.items, args.mbps, args.repeat)
+    print(f"{'visão':>9} {'render':>7} {'codif.':>8} {'KB':>10} {'servidor (ms)':>14} {'TTLB (ms)':>10} {'corpo igual':>12}")
+    for row in rows:
+        print(
+            f"{row['view']:>9} {row['renderer']:>7} {row['encoding']:>8} {row['bytes'] / 1024:>10.1f} "
+            f"{row['server_seconds'] * 1000:>14.1f} {row['ttlb_seconds'] * 1000:>10.1f} {str(row['same_body']):>12}"
+        )
+    if args.json:
+        write_results(args.json, rows, items=args.items, mbps=args.mbps)
+
+
+if __name__ == "__main__":
+    main()
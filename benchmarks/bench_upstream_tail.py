@@ -0,0 +1,133 @@
+"""
+Benchmark da latência de cauda das chamadas à API real (api_client.fetch_json_async) contra a API falsa
+(benchmarks/fake_upstream.py) com cauda lenta, erros 503 e conexões derrubadas. Compara três políticas:
+  single        uma tentativa (comportamento anterior)
+  retry         retries com backoff exponencial e jitter
+  retry_hedge   retries + hedge no p95 de latência do endpoint (primeira resposta vence)
+Para cada uma: p50/p95/p99/máximo das chamadas bem-sucedidas, taxa de erro, chamadas feitas à API falsa
+e os contadores de retry/hedge/hedge_win/deadline_exceeded de metrics.
+O hedge no p95 só corta caudas mais raras que 5% das chamadas (com slow_rate >= 0.05 o próprio p95 já é lento);
+por isso o padrão é slow_rate 0.03.
+Uso:
+  python -m benchmarks.bench_upstream_tail
+  python -m benchmarks.bench_upstream_tail --requests 500 --slow-rate 0.05 --error-rate 0.1 --json bench_upstream_tail.json
+"""
+import argparse
+import asyncio
+import math
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.fake_upstream import FaultConfig, start_fake_upstream
+from benchmarks.harness import write_results
+
+_PATH = "v1/convesation/download-report/agent"
+
+
+def _percentile(ordered: list[float], p: float) -> float | None:
+    if not ordered:
+        return None
+    return ordered[max(1, math.ceil(p / 100 * len(ordered))) - 1]
+
+
+async def _run_mode(policy, n_requests: int, concurrency: int) -> tuple[list[float], int]:
+    """(latências das chamadas bem-sucedidas, erros) de n_requests chamadas, concurrency por vez."""
+    from src.api_client import aclose_clients, fetch_json_async
+
+    sem = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    errors = 0
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        async with sem:
+            start = time.perf_counter()
+            try:
+                await fetch_json_async(_PATH, params={"from": "2026-01-01", "to": "2026-01-30", "i": i}, policy=policy)
+                latencies.append(time.perf_counter() - start)
+            except Exception:
+                errors += 1
+
+    await asyncio.gather(*(one(i) for i in range(n_requests)))
+    await aclose_clients()
+    return sorted(latencies), errors
+
+
+def run(faults: FaultConfig, n_requests: int, concurrency: int, deadline: float) -> list[dict]:
+    server, base_url = start_fake_upstream(faults)
+    # A URL da API real é lida do ambiente no import de src.config
+    os.environ["WRAPPER_BASE_URL"] = base_url
+    from src.api_client import UpstreamPolicy
+    from src.metrics import metrics
+
+    base = dict(deadline=deadline, backoff=0.05, max_backoff=1.0, hedge_after=None, hedge_percentile=95, hedge_min_samples=20)
+    policies = {
+        "single": UpstreamPolicy(retries=0, hedge=False, **base),
+        "retry": UpstreamPolicy(retries=2, hedge=False, **base),
+        "retry_hedge": UpstreamPolicy(retries=2, hedge=True, **base),
+    }
+    rows = []
+    try:
+        for mode, policy in policies.items():
+            metrics.reset()
+            calls_before = server.stats["requests"]
+            latencies, errors = asyncio.run(_run_mode(policy, n_requests, concurrency))
+            events = metrics.summary().get(_PATH, {}).get("upstream_events", {})
+            rows.append({
+                "benchmark": "upstream_tail",
+                "mode": mode,
+                "requests": n_requests,
+                "errors": errors,
+                "error_rate": round(errors / n_requests, 4),
+                "upstream_calls": server.stats["requests"] - calls_before,
+                "p50": _percentile(latencies, 50),
+                "p95": _percentile(latencies, 95),
+                "p99": _percentile(latencies, 99),
+                "max": latencies[-1] if latencies else None,
+                **{event: events.get(event, 0) for event in ("retry", "hedge", "hedge_win", "deadline_exceeded")},
+            })
+    finally:
+        server.shutdown()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latência de cauda: uma tentativa vs retries vs retries + hedge.")
+    parser.add_argument("--requests", type=int, default=300, help="Chamadas por política.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Chamadas simultâneas.")
+    parser.add_argument("--deadline", type=float, default=5.0, help="Prazo total de cada chamada (s).")
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--slow-rate", type=float, default=0.03)
+    parser.add_argument("--slow-ms", type=float, default=1500.0)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--drop-rate", type=float, default=0.01)
+    parser.add_argument("--items", type=int, default=100, help="Conversas no relatório servido pela API falsa.")
+    parser.add_argument("--json", type=str, default=None, help="Salvar resultados neste arquivo JSON.")
+    args = parser.parse_args()
+
+    faults = FaultConfig(
+        latency_ms=args.latency_ms,
+        slow_rate=args.slow_rate,
+        slow_ms=args.slow_ms,
+        error_rate=args.error_rate,
+        drop_rate=args.drop_rate,
+        items=args.items,
+    )
+    rows = run(faults, args.requests, args.concurrency, args.deadline)
+    print(f"{'modo':>12} {'erros':>7} {'chamadas':>9} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} {'máx (ms)':>9} {'retry':>6} {'hedge':>6} {'h_win':>6}")
+    for row in rows:
+        ms = [f"{row[k] * 1000:>9.0f}" if row[k] is not None else f"{'-':>9}" for k in ("p50", "p95", "p99", "max")]
+        print(
+            f"{row['mode']:>12} {row['error_rate']:>7.1%} {row['upstream_calls']:>9} {' '.join(ms)} "
+            f"{row['retry']:>6} {row['hedge']:>6} {row['hedge_win']:>6}"
+        )
+    if args.json:
+        write_results(args.json, rows, faults=vars(faults))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+API real falsa para testar prazos, retries e hedge do api_client: responde qualquer GET com um relatório sintético
+(benchmarks/synthetic.py) e injeta latência e falhas conforme os parâmetros.
+  latência   latency_ms + uniforme(0, jitter_ms); com probabilidade slow_rate, slow_ms (cauda lenta)
+  falhas     com probabilidade error_rate, status error_status (503) sem corpo útil;
+             com probabilidade drop_rate, fecha a conexão sem responder
+GET /__stats devolve quantas requisições, erros e quedas foram servidos.
+Uso:
+  python -m benchmarks.fake_upstream --port 3000 --latency-ms 80 --slow-rate 0.05 --slow-ms 3000 --error-rate 0.05
+  WRAPPER_BASE_URL=http://localhost:3000 python main.py   (wrapper contra a API falsa)
+Também usado em processo por benchmarks/bench_upstream_tail.py (start_fake_upstream).
+"""
+import argparse
+import json
+import random
+import socket
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.synthetic import generate_report
+
+
+@dataclass
+class FaultConfig:
+    """Latência e falhas injetadas em cada requisição."""
+
+    latency_ms: float = 50.0
+    jitter_ms: float = 20.0
+    slow_rate: float = 0.0
+    slow_ms: float = 2000.0
+    error_rate: float = 0.0
+    error_status: int = 503
+    drop_rate: float = 0.0
+    items: int = 200
+    seed: int = 42
+
+
+class FakeUpstream(ThreadingHTTPServer):
+    """Servidor HTTP (uma thread por conexão) com o corpo pré-serializado e contadores."""
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], faults: FaultConfig):
+        super().__init__(address, _Handler)
+        self.faults = faults
+        self.body = json.dumps(generate_report(faults.items, seed=faults.seed), ensure_ascii=False).encode("utf-8")
+        self._rnd = random.Random(faults.seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "drops": 0, "slow": 0}
+
+    def draw(self) -> tuple[str, float]:
+        """Sorteia o destino da requisição ("ok", "error" ou "drop") e a latência em segundos."""
+        f = self.faults
+        with self._lock:
+            self.stats["requests"] += 1
+            slow = self._rnd.random() < f.slow_rate
+            latency = (f.slow_ms if slow else f.latency_ms + self._rnd.uniform(0, f.jitter_ms)) / 1000
+            r = self._rnd.random()
+            outcome = "drop" if r < f.drop_rate else "error" if r < f.drop_rate + f.error_rate else "ok"
+            self.stats["slow"] += slow
+            if outcome != "ok":
+                self.stats[outcome + "s"] += 1
+        return outcome, latency
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeUpstream
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path.startswith("/__stats"):
+            self._send(200, json.dumps(self.server.stats).encode("utf-8"))
+            return
+        outcome, latency = self.server.draw()
+        time.sleep(latency)
+        if outcome == "drop":
+            self.close_connection = True
+            try:
+                self.connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            return
+        if outcome == "error":
+            self._send(self.server.faults.error_status, b'{"statusCode":503,"msg":"indisponivel"}')
+            return
+        self._send(200, self.server.body)
+
+    def _send(self, status: int, body: bytes) -> None:
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # Cliente desistiu (hedge perdedor cancelado ou prazo esgotado)
+            self.close_connection = True
+
+    def log_message(self, format, *args):  # sem log por requisição
+        pass
+
+
+def start_fake_upstream(faults: FaultConfig, port: int = 0) -> tuple[FakeUpstream, str]:
+    """Sobe a API falsa numa thread (port=0 escolhe uma porta livre). Retorna (servidor, base_url)."""
+    server = FakeUpstream(("127.0.0.1", port), faults)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    defaults = FaultConfig()
+    parser = argparse.ArgumentParser(description="API real falsa com latência e falhas injetadas.")
+    parser.add_argument("--port", type=int, default=3000)
+    for name, value in asdict(defaults).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    args = vars(parser.parse_args())
+    port = args.pop("port")
+    server, url = start_fake_upstream(FaultConfig(**args), port)
+    print(f"API falsa em {url} ({len(server.body)} bytes por resposta). Ctrl+C para sair.")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Utilitários comuns dos benchmarks: tempo (melhor de N), pico de memória com tracemalloc,
+metadados do ambiente e gravação dos resultados em JSON para comparar versões.
+"""
+import gc
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def best_time(run: Callable[[], Any], repeat: int = 3, setup: Callable[[], Any] | None = None) -> float:
+    """Melhor tempo (s) de run(arg) em repeat execuções; setup() (fora da medição) gera o argumento, se houver."""
+    best = float("inf")
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        gc.collect()
+        t0 = time.perf_counter()
+        run(arg) if setup else run()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def peak_memory(run: Callable[[], Any], setup: Callable[[], Any] | None = None) -> int:
+    """Pico de memória (bytes) alocado por run(arg), descontado o que já existia (ex.: o payload de entrada)."""
+    arg = setup() if setup else None
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base, _ = tracemalloc.get_traced_memory()
+        result = run(arg) if setup else run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak - base
+
+
+def environment() -> dict:
+    """Metadados para identificar a versão medida (commit, Python, máquina)."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "generated_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+
+
+def write_results(path: str | Path, rows: list[dict], **extra: Any) -> None:
+    """Grava {"environment": ..., "results": rows, ...} em JSON."""
+    doc = {"environment": environment(), **extra, "results": rows}
+    Path(path).write_text(json.dumps(doc, ensure_ascii=False, indent=2), encoding="utf-8")
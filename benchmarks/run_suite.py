@@ -0,0 +1,135 @@
+"""
+Suíte de benchmarks do pipeline com relatórios sintéticos (benchmarks/synthetic.py) de 1k a 200k conversas.
+Mede tempo (melhor de N) e pico de memória (tracemalloc) de cada etapa que roda numa chamada do wrapper:
+  optimize      optimize_report_response (modo share, o usado pelo wrapper_server)
+  dashboard     build_visao_geral sobre o otimizado
+  compare       compare_responses + generate_comparison_html (o que a fila de comparação executa)
+  save_raw / save_optimized / save_dashboard   escrita no cache (em pasta temporária); o manifest é apagado antes de
+                cada execução, para medir a gravação e não o atalho de conteúdo inalterado
+  save_unchanged   save_optimized com o mesmo conteúdo já gravado (só hash e comparação com o manifest)
+Os resultados vão para um JSON (commit, Python, tamanhos, linhas por etapa) para comparar versões com --baseline.
+Uso:
+  python -m benchmarks.run_suite
+  python -m benchmarks.run_suite --sizes 1000 10000 50000 200000 --out bench_suite.json
+  python -m benchmarks.run_suite --stages optimize dashboard --baseline bench_suite_anterior.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+STAGES = ("optimize", "dashboard", "compare", "save_raw", "save_optimized", "save_dashboard", "save_unchanged")
+
+
+def _stage_functions(n_items: int) -> dict:
+    """
+    Função medida de cada etapa, ou (função, setup) quando algo precisa ser preparado antes de cada execução
+    (fora da medição). Entrada montada uma vez, fora da medição (nenhuma etapa altera o payload).
+    Os imports ficam aqui para que WRAPPER_CACHE_DIR já aponte para a pasta temporária.
+    """
+    from benchmarks.synthetic import generate_report
+    from src.compare_report import _pretty_json, compare_responses, generate_comparison_html
+    from src.dashboard_treatments import build_visao_geral, dashboard_payload_from_visao_geral
+    from src.optimizer import optimize_report_response
+    from src.storage import MANIFEST_NAME, get_cache_folder, save_dashboard, save_optimized, save_raw
+
+    raw = generate_report(n_items)
+    optimized = optimize_report_response(raw, mode="share")
+    dashboard = dashboard_payload_from_visao_geral(build_visao_geral(optimized))
+    params = {"from": "2026-01-01", "to": "2026-01-30"}
+
+    def compare():
+        raw_json, opt_json = _pretty_json(raw), _pretty_json(optimized)
+        metrics = compare_responses(raw, optimized, raw_json=raw_json, opt_json=opt_json)
+        return generate_comparison_html(raw, optimized, "report_lia", params, metrics, raw_json=raw_json, opt_json=opt_json)
+
+    def forget_hashes():
+        # Sem manifest, a gravação não pode ser pulada por conteúdo igual ao da execução anterior
+        (get_cache_folder("report_lia") / MANIFEST_NAME).unlink(missing_ok=True)
+
+    def save_opt(_=None):
+        return save_optimized("report_lia", optimized, params=params, timestamp="latest")
+
+    return {
+        "optimize": lambda: optimize_report_response(raw, mode="share"),
+        "dashboard": lambda: build_visao_geral(optimized),
+        "compare": compare,
+        "save_raw": (lambda _: save_raw("report_lia", raw, params=params, timestamp="latest"), forget_hashes),
+        "save_optimized": (save_opt, forget_hashes),
+        "save_dashboard": (lambda _: save_dashboard("report_lia", dashboard, params=params, timestamp="latest"), forget_hashes),
+        "save_unchanged": (save_opt, save_opt),
+    }
+
+
+def run(sizes: list[int], stages: list[str], repeat: int, memory: bool = True) -> list[dict]:
+    """Executa as etapas pedidas para cada tamanho; uma linha por (tamanho, etapa)."""
+    from benchmarks.harness import best_time, peak_memory
+
+    rows = []
+    for n_items in sizes:
+        functions = _stage_functions(n_items)
+        for stage in stages:
+            fn, setup = functions[stage] if isinstance(functions[stage], tuple) else (functions[stage], None)
+            rows.append({
+                "benchmark": stage,
+                "items": n_items,
+                "seconds": round(best_time(fn, repeat, setup), 6),
+                "peak_bytes": peak_memory(fn, setup) if memory else None,
+            })
+            print(_format_row(rows[-1]), flush=True)
+        del functions
+    return rows
+
+
+def _format_row(row: dict, baseline: dict | None = None) -> str:
+    peak = f"{row['peak_bytes'] / 1024 / 1024:>10.1f}" if row["peak_bytes"] is not None else f"{'-':>10}"
+    line = f"{row['items']:>8} {row['benchmark']:>15} {row['seconds'] * 1000:>12.1f} {peak}"
+    if baseline is not None:
+        prev = baseline.get((row["benchmark"], row["items"]))
+        if prev and prev.get("seconds"):
+            line += f" {row['seconds'] / prev['seconds']:>9.2f}x"
+        else:
+            line += f" {'-':>10}"
+    return line
+
+
+def _load_baseline(path: str) -> dict:
+    """Resultados anteriores indexados por (etapa, itens)."""
+    doc = json.loads(Path(path).read_text(encoding="utf-8"))
+    rows = doc["results"] if isinstance(doc, dict) else doc
+    return {(r["benchmark"], r["items"]): r for r in rows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suíte de benchmarks do pipeline (tempo e pico de memória por etapa).")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000], help="Quantidade de conversas por payload (até 200000).")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES), help="Etapas a medir.")
+    parser.add_argument("--repeat", type=int, default=3, help="Execuções por medição de tempo (vale a melhor).")
+    parser.add_argument("--no-memory", action="store_true", help="Não medir pico de memória (tracemalloc deixa tudo mais lento).")
+    parser.add_argument("--out", type=str, default="bench_suite.json", help="Arquivo JSON de resultados.")
+    parser.add_argument("--baseline", type=str, default=None, help="JSON de uma execução anterior para comparar (razão de tempo).")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="wrapper_bench_") as cache_dir:
+        os.environ["WRAPPER_CACHE_DIR"] = cache_dir
+        print(f"{'itens':>8} {'etapa':>15} {'tempo (ms)':>12} {'pico (MB)':>10}")
+        rows = run(args.sizes, args.stages, args.repeat, memory=not args.no_memory)
+
+    from benchmarks.harness import write_results
+
+    write_results(args.out, rows, sizes=args.sizes, repeat=args.repeat)
+    print(f"Resultados salvos em {args.out}")
+    if args.baseline:
+        baseline = _load_baseline(args.baseline)
+        print(f"\nComparação com {args.baseline} (tempo atual / anterior; < 1 = mais rápido)")
+        print(f"{'itens':>8} {'etapa':>15} {'tempo (ms)':>12} {'pico (MB)':>10} {'vs base':>10}")
+        for row in rows:
+            print(_format_row(row, baseline))
+
+
+if __name__ == "__main__":
+    main()
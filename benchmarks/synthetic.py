@@ -0,0 +1,86 @@
+"""
+Gerador determinístico (com seed) de payloads brutos sintéticos no formato do report_lia.
+Reproduz o que o optimizer trata: dataCollectFromUser com chaves duplicadas pt/en, sender em lista
+(com firstName para o agente, vazia para o usuário), aiAgent repetido em cada item, agentId vazio
+e Full Conversation de tamanho variável.
+Responsabilidade: fornecer entradas realistas e reprodutíveis para os benchmarks (python -m benchmarks.*).
+"""
+import random
+from datetime import datetime, timedelta
+
+_UFS = ["SP", "RJ", "MG", "BA", "PR", "RS", "SC", "PE", "CE", "GO", "DF", "ES", "Sã", "RI"]
+_NOMES = ["Ana", "Bruno", "Carla", "Diego", "Eduarda", "Felipe", "Gabriela", "Heitor", "Isabela", "João"]
+_FRASES = [
+    "Olá! Como posso ajudar?",
+    "Quero saber o preço.",
+    "Claro, vou verificar para você.",
+    "Qual o prazo de entrega?",
+    "Posso confirmar seus dados?",
+    "Obrigado!",
+]
+_AI_AGENT = {"firstName": "LIA", "lastName": "Assistente", "_id": "68fbc1cecf793a2cbf2159ab", "avatar": None}
+
+
+def _data_collect(rnd: random.Random) -> dict:
+    """dataCollectFromUser com parte das chaves em pt e en (duplicadas), como vem da API real."""
+    nome = rnd.choice(_NOMES)
+    nascimento = f"{rnd.randint(1950, 2015)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}"
+    if rnd.random() < 0.05:
+        # Parte dos usuários digita a data no formato brasileiro (não reconhecido pelo dashboard)
+        ano, mes, dia = nascimento.split("-")
+        nascimento = f"{dia}/{mes}/{ano}"
+    uf = rnd.choice(_UFS)
+    dcu = {}
+    if rnd.random() < 0.7:
+        dcu["nome completo"] = nome
+        dcu["data de nascimento"] = nascimento
+        dcu["estado"] = uf
+        dcu["celular"] = f"119{rnd.randint(10000000, 99999999)}"
+    dcu["name"] = nome
+    dcu["birthDate"] = nascimento
+    dcu["state"] = uf
+    dcu["city"] = "São Paulo"
+    if rnd.random() < 0.3:
+        dcu["e-mail"] = f"{nome.lower()}@example.com"
+    return dcu
+
+
+def _full_conversation(rnd: random.Random, n_messages: int) -> list:
+    """Mensagens alternando agente (sender com firstName) e usuário (sender vazio)."""
+    out = []
+    for i in range(n_messages):
+        sender = [{"firstName": "LIA", "lastName": "Assistente"}] if i % 2 == 0 else []
+        out.append({"sender": sender, "message": rnd.choice(_FRASES), "type": "text"})
+    return out
+
+
+def generate_report(
+    n_items: int,
+    seed: int = 42,
+    min_messages: int = 2,
+    max_messages: int = 30,
+    start: datetime = datetime(2026, 1, 1),
+    days: int = 30,
+) -> dict:
+    """
+    Gera um payload bruto com n_items conversas. Mesmo seed -> mesmo payload.
+    createdAt distribuído em `days` dias a partir de `start` (UTC, ISO-8601 com milissegundos e Z).
+    """
+    rnd = random.Random(seed)
+    data = []
+    for i in range(n_items):
+        created = start + timedelta(seconds=rnd.randint(0, days * 86400 - 1))
+        n_messages = rnd.randint(min_messages, max_messages)
+        item = {
+            "_id": f"{seed:04d}{i:08d}",
+            # Parte das conversas termina antes da coleta de dados
+            "dataCollectFromUser": _data_collect(rnd) if rnd.random() < 0.95 else {},
+            "Full Conversation": _full_conversation(rnd, n_messages),
+            "aiAgent": dict(_AI_AGENT),
+            "agentId": [] if rnd.random() < 0.5 else ["68fbc1cecf793a2cbf2159ab"],
+            "createdAt": created.strftime("%Y-%m-%dT%H:%M:%S.") + f"{rnd.randint(0, 999):03d}Z",
+        }
+        if rnd.random() < 0.6:
+            item["botMessageCount"] = (n_messages + 1) // 2
+        data.append(item)
+    return {"statusCode": 200, "msg": "OK", "data": data}
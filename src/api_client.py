@@ -1,10 +1,109 @@
 """
 Cliente da API real: monta URL a partir de base + path e executa GET com query params.
 A API real exige o header X-API-Key; o valor vem de GENERAL_REPORT_API_KEY no .env.
+Conexões: um pool compartilhado (keep-alive) por processo, com limites globais e por host,
+tanto no cliente assíncrono (usado pelo wrapper_server) quanto no síncrono (CLI e wrapper.run_once).
+Cada chamada assíncrona registra em metrics o status HTTP, a latência (etapa "upstream"), o tamanho do corpo
+e o parse do JSON (etapa "parse").
+Política por endpoint ("upstream" no api_endpoints.json, padrões WRAPPER_UPSTREAM_*): prazo total da chamada
+(deadline_seconds, inclui as novas tentativas), retries com backoff exponencial e jitter para falhas temporárias
+(conexão, timeout, 429/5xx) e hedge opcional: se a primeira tentativa não respondeu até o p95 de latência do
+endpoint (ou hedge_after_seconds), dispara uma segunda e fica com a que responder primeiro. Retries, hedges,
+hedges vencedores e prazos esgotados são contados em metrics (wrapper_upstream_events_total).
+  "upstream": {"deadline_seconds": 30, "retries": 2, "backoff_seconds": 0.5, "hedge": true}
 Responsabilidade: única camada que faz HTTP para o backend; usado pelo wrapper_server.
 """
-import requests
-from src.config import BASE_URL, GENERAL_REPORT_API_KEY, resolve_path
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator
+from urllib.parse import urlsplit
+
+import httpx
+
+from src.config import (
+    BASE_URL,
+    GENERAL_REPORT_API_KEY,
+    UPSTREAM_BACKOFF_SECONDS,
+    UPSTREAM_DEADLINE_SECONDS,
+    UPSTREAM_HEDGE,
+    UPSTREAM_HEDGE_MIN_SAMPLES,
+    UPSTREAM_HEDGE_PERCENTILE,
+    UPSTREAM_KEEPALIVE_EXPIRY,
+    UPSTREAM_MAX_BACKOFF_SECONDS,
+    UPSTREAM_MAX_CONNECTIONS,
+    UPSTREAM_MAX_KEEPALIVE,
+    UPSTREAM_MAX_PER_HOST,
+    UPSTREAM_RETRIES,
+    get_endpoint_setting,
+    resolve_path,
+)
+from src.metrics import metrics
+
+# Clientes compartilhados (criados sob demanda). O assíncrono fica preso ao event loop que o criou.
+_async_client: httpx.AsyncClient | None = None
+_async_client_loop: asyncio.AbstractEventLoop | None = None
+_sync_client: httpx.Client | None = None
+_sync_lock = threading.Lock()
+# Semáforo por host (limita conexões simultâneas ao mesmo backend no cliente assíncrono)
+_host_semaphores: dict[str, asyncio.Semaphore] = {}
+# Status HTTP de falha temporária (backend sobrecarregado ou proxy/túnel): valem nova tentativa
+_RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+@dataclass
+class UpstreamPolicy:
+    """Prazo, retries e hedge das chamadas de um endpoint (hedge_after None = percentil de latência do endpoint)."""
+
+    deadline: float
+    retries: int
+    backoff: float
+    max_backoff: float
+    hedge: bool
+    hedge_after: float | None
+    hedge_percentile: float
+    hedge_min_samples: int
+
+
+def upstream_policy(endpoint_key_or_path: str) -> UpstreamPolicy:
+    """Política do endpoint: "upstream" no api_endpoints.json sobre os padrões WRAPPER_UPSTREAM_*."""
+    setting = get_endpoint_setting(endpoint_key_or_path, "upstream", None)
+    if not isinstance(setting, dict):
+        setting = {}
+    hedge_after = setting.get("hedge_after_seconds")
+    return UpstreamPolicy(
+        deadline=float(setting.get("deadline_seconds", UPSTREAM_DEADLINE_SECONDS)),
+        retries=max(int(setting.get("retries", UPSTREAM_RETRIES)), 0),
+        backoff=float(setting.get("backoff_seconds", UPSTREAM_BACKOFF_SECONDS)),
+        max_backoff=float(setting.get("max_backoff_seconds", UPSTREAM_MAX_BACKOFF_SECONDS)),
+        hedge=bool(setting.get("hedge", UPSTREAM_HEDGE)),
+        hedge_after=float(hedge_after) if hedge_after is not None else None,
+        hedge_percentile=float(setting.get("hedge_percentile", UPSTREAM_HEDGE_PERCENTILE)),
+        hedge_min_samples=int(setting.get("hedge_min_samples", UPSTREAM_HEDGE_MIN_SAMPLES)),
+    )
+
+
+def _retryable(exc: Exception) -> bool:
+    """Falha temporária? (conexão, timeout, protocolo ou status 429/5xx de _RETRY_STATUS)."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in _RETRY_STATUS
+    return isinstance(exc, httpx.TransportError)
+
+
+def _backoff(policy: UpstreamPolicy, attempt: int) -> float:
+    """Espera antes da tentativa seguinte à falha attempt (1, 2, ...): jitter completo sobre backoff * 2^(attempt-1)."""
+    return random.uniform(0, min(policy.max_backoff, policy.backoff * 2 ** (attempt - 1)))
+
+
+def _hedge_delay(endpoint_key_or_path: str, policy: UpstreamPolicy) -> float | None:
+    """Segundos até disparar a segunda chamada; None = sem hedge (desligado ou poucas amostras para o percentil)."""
+    if not policy.hedge:
+        return None
+    if policy.hedge_after is not None:
+        return policy.hedge_after
+    return metrics.stage_percentile("upstream", endpoint_key_or_path, policy.hedge_percentile, policy.hedge_min_samples)
 
 
 def _default_headers() -> dict:
@@ -15,17 +114,30 @@ def _default_headers() -> dict:
     return headers
 
 
-def fetch_json(
-    endpoint_key_or_path: str,
-    params: dict | None = None,
-    timeout: int = 60,
-) -> dict:
+def _limits() -> httpx.Limits:
+    """Limites do pool: conexões totais, conexões ociosas mantidas (keep-alive) e tempo de vida delas."""
+    return httpx.Limits(
+        max_connections=UPSTREAM_MAX_CONNECTIONS,
+        max_keepalive_connections=UPSTREAM_MAX_KEEPALIVE,
+        keepalive_expiry=UPSTREAM_KEEPALIVE_EXPIRY,
+    )
+
+
+def _query_params(params: dict | None) -> dict:
     """
-    Chama a API real e retorna o JSON da resposta.
-    endpoint_key_or_path: chave do api_endpoints.json (ex: report_agent) ou path (ex: v1/convesation/...).
-    params: query string (by, messageHistory, agentId, from, to, etc.).
-    A chave GENERAL_REPORT_API_KEY (.env) é enviada no header X-API-Key.
+    Normaliza query params como o cliente anterior (requests) fazia: None é omitido
+    e bool vira "True"/"False", para a API real receber exatamente a mesma query string.
     """
+    out = {}
+    for k, v in (params or {}).items():
+        if v is None:
+            continue
+        out[k] = str(v) if isinstance(v, bool) else v
+    return out
+
+
+def _build_url(endpoint_key_or_path: str) -> str:
+    """Resolve chave ou path para a URL completa da API real."""
     path = resolve_path(endpoint_key_or_path)
     if path is None:
         raise ValueError(f"Endpoint não encontrado: {endpoint_key_or_path}")
@@ -33,11 +145,230 @@ def fetch_json(
     # No Windows, cliente não pode conectar em 0.0.0.0 — garantir localhost
     if "0.0.0.0" in url:
         url = url.replace("0.0.0.0", "localhost")
-    resp = requests.get(
-        url,
-        params=params or {},
-        headers=_default_headers(),
-        timeout=timeout,
-    )
+    return url
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Retorna o cliente assíncrono compartilhado (pool de conexões keep-alive).
+    Se o event loop mudou (ex.: outro asyncio.run), cria um novo cliente para o loop atual.
+    """
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client.is_closed or _async_client_loop is not loop:
+        _async_client = httpx.AsyncClient(limits=_limits(), headers=_default_headers())
+        _async_client_loop = loop
+        _host_semaphores.clear()
+    return _async_client
+
+
+def get_sync_client() -> httpx.Client:
+    """Retorna o cliente síncrono compartilhado (pool de conexões keep-alive, seguro entre threads)."""
+    global _sync_client
+    with _sync_lock:
+        if _sync_client is None or _sync_client.is_closed:
+            _sync_client = httpx.Client(limits=_limits(), headers=_default_headers())
+        return _sync_client
+
+
+def _host_semaphore(url: str) -> asyncio.Semaphore:
+    """Semáforo do host da URL; limita a UPSTREAM_MAX_PER_HOST requisições simultâneas por host."""
+    host = urlsplit(url).netloc
+    sem = _host_semaphores.get(host)
+    if sem is None:
+        sem = asyncio.Semaphore(UPSTREAM_MAX_PER_HOST)
+        _host_semaphores[host] = sem
+    return sem
+
+
+async def _get_once(
+    endpoint_key_or_path: str, url: str, params: dict | None, timeout: float, per_host_limit: bool = True
+) -> httpx.Response:
+    """
+    Uma tentativa: GET no pool compartilhado com status, latência e bytes em metrics. Status de erro vira
+    HTTPStatusError. Tentativas canceladas (hedge perdedor, prazo) não são medidas.
+    per_host_limit=False (hedge) não espera a vez em UPSTREAM_MAX_PER_HOST: a segunda chamada só existe porque a
+    primeira está lenta, e ficar na fila atrás das outras anularia o hedge (o pool ainda limita as conexões).
+    """
+    client = get_async_client()
+    start = time.perf_counter()
+    try:
+        if per_host_limit:
+            async with _host_semaphore(url):
+                resp = await client.get(url, params=_query_params(params), timeout=timeout)
+        else:
+            resp = await client.get(url, params=_query_params(params), timeout=timeout)
+    except httpx.HTTPError:
+        metrics.observe_stage("upstream", endpoint_key_or_path, time.perf_counter() - start)
+        metrics.count_status(endpoint_key_or_path, "error")
+        raise
+    metrics.observe_stage("upstream", endpoint_key_or_path, time.perf_counter() - start)
+    metrics.count_status(endpoint_key_or_path, resp.status_code)
+    metrics.observe_bytes(endpoint_key_or_path, "upstream", len(resp.content))
     resp.raise_for_status()
-    return resp.json()
+    return resp
+
+
+async def _get_hedged(
+    endpoint_key_or_path: str, url: str, params: dict | None, timeout: float, hedge_after: float | None
+) -> httpx.Response:
+    """
+    Tentativa com hedge: se a primeira chamada não terminou em hedge_after segundos, dispara uma segunda
+    e devolve a primeira resposta bem-sucedida (a outra é cancelada). Se as duas falham, levanta o último erro.
+    """
+    if hedge_after is None:
+        return await _get_once(endpoint_key_or_path, url, params, timeout)
+    tasks = [asyncio.ensure_future(_get_once(endpoint_key_or_path, url, params, timeout))]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+        if not done:
+            metrics.count_event(endpoint_key_or_path, "hedge")
+            tasks.append(asyncio.ensure_future(_get_once(endpoint_key_or_path, url, params, timeout, per_host_limit=False)))
+        pending = set(tasks)
+        error: BaseException | None = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not tasks[0]:
+                        metrics.count_event(endpoint_key_or_path, "hedge_win")
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()  # marca como consumida (evita aviso do asyncio para a perdedora)
+
+
+async def fetch_json_async(
+    endpoint_key_or_path: str,
+    params: dict | None = None,
+    timeout: float | None = None,
+    policy: UpstreamPolicy | None = None,
+) -> dict:
+    """
+    Versão assíncrona de fetch_json: não bloqueia o event loop do servidor.
+    Usa o pool compartilhado; chamadas concorrentes ao mesmo host respeitam UPSTREAM_MAX_PER_HOST.
+    timeout é o prazo total da chamada (padrão: deadline_seconds da política do endpoint); falhas temporárias
+    são tentadas de novo (com hedge, se ligado) enquanto houver tentativas e prazo. Prazo esgotado levanta
+    httpx.TimeoutException. policy substitui a do endpoint (benchmarks).
+    """
+    url = _build_url(endpoint_key_or_path)
+    policy = policy or upstream_policy(endpoint_key_or_path)
+    deadline = policy.deadline if timeout is None else float(timeout)
+    loop = asyncio.get_running_loop()
+    expires = loop.time() + deadline
+    attempt = 0
+    while True:
+        remaining = expires - loop.time()
+        try:
+            resp = await asyncio.wait_for(
+                _get_hedged(endpoint_key_or_path, url, params, remaining, _hedge_delay(endpoint_key_or_path, policy)),
+                remaining,
+            )
+            break
+        except asyncio.TimeoutError as e:
+            metrics.count_event(endpoint_key_or_path, "deadline_exceeded")
+            raise httpx.TimeoutException(f"Prazo de {deadline:g}s esgotado chamando {url}") from e
+        except httpx.HTTPError as e:
+            attempt += 1
+            wait = _backoff(policy, attempt)
+            if not _retryable(e) or attempt > policy.retries or wait >= expires - loop.time():
+                raise
+            metrics.count_event(endpoint_key_or_path, "retry")
+            await asyncio.sleep(wait)
+    with metrics.timed("parse", endpoint_key_or_path):
+        return resp.json()
+
+
+async def stream_bytes_async(
+    endpoint_key_or_path: str,
+    params: dict | None = None,
+    timeout: float | None = None,
+    chunk_size: int = 64 * 1024,
+) -> AsyncIterator[bytes]:
+    """
+    Chama a API real e devolve o corpo da resposta em pedaços, conforme chega (sem bufferizar o corpo inteiro).
+    Usado pelo modo streaming (report_stream). Erro HTTP é levantado antes do primeiro pedaço.
+    A etapa "upstream" mede até os headers; o corpo é medido por quem consome (etapa "stream" no wrapper_server).
+    Falhas temporárias só são tentadas de novo antes do primeiro pedaço (depois o consumidor já recebeu dados);
+    timeout (padrão: deadline_seconds do endpoint) limita cada operação de rede, sem hedge.
+    """
+    url = _build_url(endpoint_key_or_path)
+    policy = upstream_policy(endpoint_key_or_path)
+    timeout = policy.deadline if timeout is None else timeout
+    client = get_async_client()
+    attempt = 0
+    while True:
+        start = time.perf_counter()
+        size = 0
+        try:
+            async with _host_semaphore(url):
+                async with client.stream("GET", url, params=_query_params(params), timeout=timeout) as resp:
+                    metrics.observe_stage("upstream", endpoint_key_or_path, time.perf_counter() - start)
+                    metrics.count_status(endpoint_key_or_path, resp.status_code)
+                    resp.raise_for_status()
+                    async for chunk in resp.aiter_bytes(chunk_size):
+                        size += len(chunk)
+                        yield chunk
+            break
+        except httpx.HTTPError as e:
+            if not isinstance(e, httpx.HTTPStatusError):
+                metrics.count_status(endpoint_key_or_path, "error")
+            attempt += 1
+            if size or not _retryable(e) or attempt > policy.retries:
+                raise
+            metrics.count_event(endpoint_key_or_path, "retry")
+            await asyncio.sleep(_backoff(policy, attempt))
+    metrics.observe_bytes(endpoint_key_or_path, "upstream", size)
+
+
+def fetch_json(
+    endpoint_key_or_path: str,
+    params: dict | None = None,
+    timeout: float | None = None,
+) -> dict:
+    """
+    Chama a API real e retorna o JSON da resposta.
+    endpoint_key_or_path: chave do api_endpoints.json (ex: report_agent) ou path (ex: v1/convesation/...).
+    params: query string (by, messageHistory, agentId, from, to, etc.).
+    A chave GENERAL_REPORT_API_KEY (.env) é enviada no header X-API-Key.
+    Versão síncrona (CLI, wrapper.run_once); reaproveita conexões do pool síncrono. Mesmo prazo total e retries
+    da versão assíncrona (sem hedge).
+    """
+    url = _build_url(endpoint_key_or_path)
+    policy = upstream_policy(endpoint_key_or_path)
+    deadline = policy.deadline if timeout is None else float(timeout)
+    expires = time.monotonic() + deadline
+    attempt = 0
+    while True:
+        remaining = expires - time.monotonic()
+        if remaining <= 0:
+            metrics.count_event(endpoint_key_or_path, "deadline_exceeded")
+            raise httpx.TimeoutException(f"Prazo de {deadline:g}s esgotado chamando {url}")
+        try:
+            resp = get_sync_client().get(url, params=_query_params(params), timeout=remaining)
+            resp.raise_for_status()
+            return resp.json()
+        except httpx.HTTPError as e:
+            attempt += 1
+            wait = _backoff(policy, attempt)
+            if not _retryable(e) or attempt > policy.retries or wait >= expires - time.monotonic():
+                raise
+            metrics.count_event(endpoint_key_or_path, "retry")
+            time.sleep(wait)
+
+
+async def aclose_clients() -> None:
+    """Fecha os clientes compartilhados (chamado no shutdown do servidor)."""
+    global _async_client, _sync_client
+    if _async_client is not None and not _async_client.is_closed:
+        await _async_client.aclose()
+    _async_client = None
+    with _sync_lock:
+        if _sync_client is not None:
+            _sync_client.close()
+        _sync_client = None
@@ -0,0 +1,92 @@
+"""
+POST /wrapper/batch: várias consultas do /wrapper numa única chamada (ex.: report_lia, report_agent e report_by_channel
+de uma página do dashboard, em um ou mais períodos), sem uma ida e volta pelo túnel para cada uma.
+Corpo: lista de itens ou {"requests": [...]}; cada item é
+  {"id": "lia_mes", "endpoint_key": "report_lia", "params": {"from": "2026-05-01", "to": "2026-05-31"},
+   "view": "dashboard" | "full", "compare": "previous_month", "refresh": "full"}
+(só endpoint_key é obrigatório; id padrão = posição na lista). endpoint_key precisa ser chave do api_endpoints.json:
+paths diretos da API real não são aceitos (o item volta com status 404). Resposta:
+  {"results": {"lia_mes": {"endpoint_key": ..., "view": ..., "status": 200, "cache": "MISS", "etag": ..., "body": {...}},
+               "outro": {"endpoint_key": ..., "view": ..., "status": 502, "error": "..."}}}
+Um erro num item vira status/error só daquele item; os corpos já serializados do cache entram no JSON sem reparse.
+Responsabilidade: validação dos itens e montagem do corpo do batch; a execução fica no wrapper_server.
+"""
+from dataclasses import dataclass
+from typing import Any
+
+from src.config import BATCH_MAX_ITEMS
+from src.responses import render_json
+
+
+@dataclass
+class BatchItem:
+    """Uma consulta do batch, já validada (params como viriam na query string do /wrapper)."""
+
+    id: str
+    endpoint_key: str
+    params: dict
+    view_full: bool
+    compare_previous_month: bool
+    refresh_full: bool
+
+    @property
+    def view(self) -> str:
+        return "full" if self.view_full else "dashboard"
+
+
+def parse_batch(payload: Any) -> list[BatchItem]:
+    """Itens do corpo do POST (lista ou {"requests": [...]}). ValueError com a descrição se algo for inválido."""
+    specs = payload.get("requests") if isinstance(payload, dict) else payload
+    if not isinstance(specs, list) or not specs:
+        raise ValueError('corpo deve ser uma lista de itens ou {"requests": [...]} não vazio')
+    if len(specs) > BATCH_MAX_ITEMS:
+        raise ValueError(f"no máximo {BATCH_MAX_ITEMS} itens por batch (WRAPPER_BATCH_MAX_ITEMS)")
+    items: list[BatchItem] = []
+    seen: set[str] = set()
+    for pos, spec in enumerate(specs):
+        if not isinstance(spec, dict) or not isinstance(spec.get("endpoint_key"), str):
+            raise ValueError(f"item {pos}: objeto com endpoint_key obrigatório")
+        item_id = str(spec.get("id", pos))
+        if item_id in seen:
+            raise ValueError(f"item {pos}: id repetido ({item_id})")
+        seen.add(item_id)
+        params = spec.get("params") or {}
+        if not isinstance(params, dict):
+            raise ValueError(f"item {item_id}: params deve ser um objeto")
+        view = spec.get("view") or "dashboard"
+        if view not in ("dashboard", "full"):
+            raise ValueError(f"item {item_id}: view deve ser dashboard ou full")
+        items.append(
+            BatchItem(
+                id=item_id,
+                endpoint_key=spec["endpoint_key"],
+                params=params,
+                view_full=view == "full",
+                compare_previous_month=spec.get("compare") == "previous_month",
+                refresh_full=spec.get("refresh") == "full",
+            )
+        )
+    return items
+
+
+def render_batch(results: list[tuple[BatchItem, dict, bytes | None]]) -> bytes:
+    """
+    JSON do batch: {"results": {id: {<campos do item>, "body": <corpo>}}}, na ordem dos itens.
+    O corpo (JSON já serializado) é copiado como está; itens com erro vão sem "body".
+    """
+    parts = [b'{"results":{']
+    for i, (item, head, body) in enumerate(results):
+        if i:
+            parts.append(b",")
+        parts.append(render_json(item.id))
+        parts.append(b":")
+        entry = render_json(head)
+        if body is None:
+            parts.append(entry)
+        else:
+            parts.append(entry[:-1])
+            parts.append(b',"body":' if head else b'"body":')
+            parts.append(body)
+            parts.append(b"}")
+    parts.append(b"}}")
+    return b"".join(parts)
@@ -1,7 +1,7 @@
 """
 Comparação entre JSON bruto (backend real) e JSON otimizado (nosso).
 Gera relatório em Markdown, HTML lado a lado e métricas em JSON.
-Responsabilidade: carregar par raw/optimized do cache (por params ou par mais recente), comparar tamanhos e alterações, salvar comparison_<slug>_<timestamp>.md/.html/.json; usado pelo wrapper_server e via CLI.
+Responsabilidade: carregar par raw/optimized do cache (por params ou par mais recente), comparar tamanhos e alterações, salvar comparison_<slug>_<timestamp>.md/.html/.json; usado pela fila em segundo plano (comparison_queue) e via CLI.
 """
 import html
 import json
@@ -10,7 +10,7 @@ from datetime import datetime
 from pathlib import Path
 
 from src.config import get_endpoint_slug
-from src.storage import get_cache_folder, _suffix_from_params
+from src.storage import _base_name, _suffix_from_params, atomic_write_bytes, find_cache_file, get_cache_folder, load_json
 
 # Chaves em pt que o optimizer consolida para en (espelho do optimizer)
 _DATA_COLLECT_PT_KEYS = {
@@ -35,43 +35,54 @@ def get_raw_and_optimized_paths(endpoint_key: str, params: dict | None) -> tuple
     folder = get_cache_folder(endpoint_key)
     if params is not None:
         safe = _safe_suffix(params)
-        raw_path = folder / f"raw_{safe}.json"
-        opt_path = folder / f"optimized_{safe}.json"
-        if raw_path.exists() and opt_path.exists():
+        raw_path = find_cache_file(folder, f"raw_{safe}")
+        opt_path = find_cache_file(folder, f"optimized_{safe}")
+        if raw_path and opt_path:
             return (raw_path, opt_path)
-    # Par mais recente: raw_*.json com optimized_<mesmo sufixo>.json
-    raw_files = sorted(folder.glob("raw_*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    # Par mais recente: raw_*.json(.gz/.xz) com optimized_<mesmo sufixo> em qualquer formato
+    raw_files = sorted(
+        (p for p in folder.glob("raw_*.json*") if not p.name.endswith(".tmp")),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True,
+    )
     for raw_path in raw_files:
-        suffix = raw_path.stem.replace("raw_", "", 1)
-        opt_path = folder / f"optimized_{suffix}.json"
-        if opt_path.exists():
+        suffix = _base_name(raw_path).replace("raw_", "", 1)
+        opt_path = find_cache_file(folder, f"optimized_{suffix}")
+        if opt_path:
             return (raw_path, opt_path)
     return (None, None)
 
 
 def load_raw_and_optimized(endpoint_key: str, params: dict | None = None) -> tuple[dict | None, dict | None]:
     """
-    Carrega os dois JSONs do cache. Retorna (raw_dict, optimized_dict) ou (None, None).
+    Carrega os dois JSONs do cache (em qualquer formato do cache_encoding). Retorna (raw_dict, optimized_dict) ou (None, None).
     """
     raw_path, opt_path = get_raw_and_optimized_paths(endpoint_key, params)
     if not raw_path or not opt_path:
         return (None, None)
     try:
-        with open(raw_path, encoding="utf-8") as f:
-            raw = json.load(f)
-        with open(opt_path, encoding="utf-8") as f:
-            optimized = json.load(f)
-        return (raw, optimized)
-    except (json.JSONDecodeError, OSError):
+        return (load_json(raw_path), load_json(opt_path))
+    except (ValueError, OSError):
         return (None, None)
 
 
-def compare_responses(raw: dict, optimized: dict) -> dict:
+def _pretty_json(data: dict) -> str:
+    """JSON indentado usado tanto na medição de tamanho quanto no HTML lado a lado."""
+    return json.dumps(data, ensure_ascii=False, indent=2)
+
+
+def compare_responses(
+    raw: dict,
+    optimized: dict,
+    raw_json: str | None = None,
+    opt_json: str | None = None,
+) -> dict:
     """
     Compara os dois JSONs e retorna um dict de métricas e resumos.
+    raw_json/opt_json: serializações indentadas já prontas (evita serializar de novo).
     """
-    raw_str = json.dumps(raw, ensure_ascii=False, indent=2)
-    opt_str = json.dumps(optimized, ensure_ascii=False, indent=2)
+    raw_str = raw_json if raw_json is not None else _pretty_json(raw)
+    opt_str = opt_json if opt_json is not None else _pretty_json(optimized)
     size_raw = len(raw_str.encode("utf-8"))
     size_opt = len(opt_str.encode("utf-8"))
     saved = size_raw - size_opt
@@ -197,11 +208,19 @@ def generate_comparison_report(
 
 
 def generate_comparison_html(
-    raw: dict, optimized: dict, endpoint_key: str, params: dict | None, metrics: dict
+    raw: dict,
+    optimized: dict,
+    endpoint_key: str,
+    params: dict | None,
+    metrics: dict,
+    raw_json: str | None = None,
+    opt_json: str | None = None,
 ) -> str:
-    """Gera HTML com duas colunas: Original | Otimizado (JSON formatado, rolável)."""
-    raw_json = json.dumps(raw, ensure_ascii=False, indent=2)
-    opt_json = json.dumps(optimized, ensure_ascii=False, indent=2)
+    """Gera HTML com duas colunas: Original | Otimizado (JSON formatado, rolável). Aceita as serializações prontas."""
+    if raw_json is None:
+        raw_json = _pretty_json(raw)
+    if opt_json is None:
+        opt_json = _pretty_json(optimized)
     raw_escaped = html.escape(raw_json)
     opt_escaped = html.escape(opt_json)
 
@@ -246,19 +265,11 @@ def generate_comparison_html(
 </html>"""
 
 
-def save_comparison_report(
-    endpoint_key: str,
-    params: dict | None,
-    report_md: str,
-    report_html: str,
-    metrics: dict,
-    timestamp: str | None = None,
-) -> tuple[Path, Path, Path]:
+def comparison_report_paths(endpoint_key: str, params: dict | None, timestamp: str | None = None) -> tuple[Path, Path, Path]:
     """
-    Salva relatório .md, .html e .json de métricas na pasta do endpoint.
+    Caminhos (md, html, json) do relatório de comparação.
     Se timestamp for "latest", usa só comparison_<slug> (ex.: comparison_liareport.md).
     Se timestamp for outro valor, usa comparison_<slug>_<timestamp>. Caso contrário, sufixo dos params.
-    Retorna (path_md, path_html, path_json).
     """
     folder = get_cache_folder(endpoint_key)
     if timestamp:
@@ -266,12 +277,25 @@ def save_comparison_report(
         safe = slug if timestamp == "latest" else f"{slug}_{timestamp}"
     else:
         safe = _safe_suffix(params)
-    path_md = folder / f"comparison_{safe}.md"
-    path_html = folder / f"comparison_{safe}.html"
-    path_json = folder / f"comparison_{safe}.json"
+    return (folder / f"comparison_{safe}.md", folder / f"comparison_{safe}.html", folder / f"comparison_{safe}.json")
+
 
-    path_md.write_text(report_md, encoding="utf-8")
-    path_html.write_text(report_html, encoding="utf-8")
+def save_comparison_report(
+    endpoint_key: str,
+    params: dict | None,
+    report_md: str,
+    report_html: str,
+    metrics: dict,
+    timestamp: str | None = None,
+) -> tuple[Path, Path, Path]:
+    """
+    Salva relatório .md, .html e .json de métricas na pasta do endpoint (nomes de comparison_report_paths),
+    cada um via arquivo temporário + rename.
+    Retorna (path_md, path_html, path_json).
+    """
+    path_md, path_html, path_json = comparison_report_paths(endpoint_key, params, timestamp)
+    atomic_write_bytes(path_md, report_md.encode("utf-8"))
+    atomic_write_bytes(path_html, report_html.encode("utf-8"))
 
     # Métricas em JSON (sem dados brutos, só números e listas de resumo)
     metrics_serializable = {}
@@ -280,7 +304,7 @@ def save_comparison_report(
             metrics_serializable[k] = v
         elif isinstance(v, list):
             metrics_serializable[k] = [x for x in v if x is not None]
-    path_json.write_text(json.dumps(metrics_serializable, ensure_ascii=False, indent=2), encoding="utf-8")
+    atomic_write_bytes(path_json, json.dumps(metrics_serializable, ensure_ascii=False, indent=2).encode("utf-8"))
 
     return (path_md, path_html, path_json)
 
@@ -301,9 +325,14 @@ def run_comparison(
         raw, optimized = load_raw_and_optimized(endpoint_key, params)
     if raw is None or optimized is None:
         return None
-    metrics = compare_responses(raw, optimized)
+    # Serializa uma única vez: usado no tamanho (métricas) e no HTML
+    raw_json = _pretty_json(raw)
+    opt_json = _pretty_json(optimized)
+    metrics = compare_responses(raw, optimized, raw_json=raw_json, opt_json=opt_json)
     report_md = generate_comparison_report(raw, optimized, endpoint_key, params, metrics)
-    report_html = generate_comparison_html(raw, optimized, endpoint_key, params, metrics)
+    report_html = generate_comparison_html(
+        raw, optimized, endpoint_key, params, metrics, raw_json=raw_json, opt_json=opt_json
+    )
     return save_comparison_report(endpoint_key, params, report_md, report_html, metrics, timestamp=timestamp)
 
 
@@ -0,0 +1,154 @@
+"""
+Fila de geração dos relatórios de comparação (raw vs otimizado) fora do caminho da requisição.
+Uma thread de trabalho consome a fila; cada endpoint tem no máximo um job pendente (debounce):
+um novo envio para o mesmo endpoint substitui o payload pendente, então só o mais recente é comparado.
+A fila é limitada (WRAPPER_COMPARISON_QUEUE_SIZE endpoints pendentes); acima disso o job é descartado.
+Responsabilidade: tirar run_comparison (serialização indentada, HTML lado a lado, 3 arquivos) da latência do /wrapper; usado pelo wrapper_server.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from src.compare_report import run_comparison
+from src.config import COMPARISON_DEBOUNCE_SECONDS, COMPARISON_QUEUE_SIZE, get_endpoint_setting
+from src.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def comparison_enabled(endpoint_key: str) -> bool:
+    """Endpoint gera comparação? Opt-out com "comparison": false no api_endpoints.json."""
+    return bool(get_endpoint_setting(endpoint_key, "comparison", True))
+
+
+class ComparisonQueue:
+    """Fila limitada com um job pendente por endpoint e uma thread de trabalho (criada sob demanda)."""
+
+    def __init__(self, maxsize: int, debounce_seconds: float = 0.0):
+        self.maxsize = maxsize
+        self.debounce_seconds = debounce_seconds
+        # endpoint_key -> (pronto_em, kwargs de run_comparison); ordem = ordem de chegada
+        self._pending: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+        self._running = 0
+        self.submitted = 0
+        self.debounced = 0
+        self.dropped = 0
+        self.completed = 0
+        self.failed = 0
+
+    def submit(
+        self,
+        endpoint_key: str,
+        params: dict | None,
+        raw: dict,
+        optimized: dict,
+        timestamp: str | None = None,
+    ) -> bool:
+        """
+        Agenda a comparação do endpoint. Se já houver job pendente do mesmo endpoint, substitui o payload
+        (mantendo o horário previsto). Retorna False se a fila estiver cheia e o job foi descartado.
+        """
+        job = {"endpoint_key": endpoint_key, "params": params, "raw": raw, "optimized": optimized, "timestamp": timestamp}
+        with self._cond:
+            if self._stopping:
+                return False
+            self.submitted += 1
+            if endpoint_key in self._pending:
+                ready_at, _ = self._pending[endpoint_key]
+                self._pending[endpoint_key] = (ready_at, job)
+                self.debounced += 1
+            elif len(self._pending) >= self.maxsize:
+                self.dropped += 1
+                logger.warning("Fila de comparação cheia; comparação de %s descartada", endpoint_key)
+                return False
+            else:
+                self._pending[endpoint_key] = (time.monotonic() + self.debounce_seconds, job)
+            self._ensure_worker()
+            self._cond.notify()
+        return True
+
+    def _ensure_worker(self) -> None:
+        """Cria a thread de trabalho na primeira submissão. Chamar com o lock adquirido."""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._work, name="comparison-queue", daemon=True)
+            self._thread.start()
+
+    def _next_job(self) -> dict | None:
+        """Bloqueia até haver job pronto (respeitando o debounce) ou a fila ser encerrada."""
+        with self._cond:
+            while True:
+                if self._stopping:
+                    return None
+                if self._pending:
+                    endpoint_key, (ready_at, job) = next(iter(self._pending.items()))
+                    wait = ready_at - time.monotonic()
+                    if wait <= 0:
+                        del self._pending[endpoint_key]
+                        self._running += 1
+                        return job
+                    self._cond.wait(timeout=wait)
+                else:
+                    self._cond.wait()
+
+    def _work(self) -> None:
+        """Laço da thread: executa run_comparison para cada job pronto."""
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            try:
+                with metrics.timed("comparison", job["endpoint_key"]):
+                    run_comparison(**job)
+                ok = True
+            except Exception:
+                logger.exception("Falha ao gerar comparação de %s", job["endpoint_key"])
+                ok = False
+            with self._cond:
+                self._running -= 1
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                self._cond.notify_all()
+
+    def join(self, timeout: float | None = None) -> bool:
+        """Aguarda a fila esvaziar (sem jobs pendentes nem em execução). Retorna False em timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._running:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(timeout=remaining)
+        return True
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Encerra a thread de trabalho; jobs ainda pendentes são descartados."""
+        with self._cond:
+            self._stopping = True
+            self._pending.clear()
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+
+    def stats(self) -> dict:
+        """Contadores da fila: pendentes, em execução, enviados, substituídos (debounce), descartados, concluídos, falhas."""
+        with self._cond:
+            return {
+                "pending": len(self._pending),
+                "running": self._running,
+                "max_pending": self.maxsize,
+                "submitted": self.submitted,
+                "debounced": self.debounced,
+                "dropped": self.dropped,
+                "completed": self.completed,
+                "failed": self.failed,
+            }
+
+
+# Instância única usada pelo wrapper_server
+comparison_queue = ComparisonQueue(COMPARISON_QUEUE_SIZE, COMPARISON_DEBOUNCE_SECONDS)
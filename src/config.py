@@ -41,6 +41,65 @@ if "0.0.0.0" in _raw_base and (PROJECT_ROOT / ".env").exists():
 BASE_URL = _raw_base.replace("0.0.0.0", "localhost")
 CACHE_DIR = Path(os.getenv("WRAPPER_CACHE_DIR", str(PROJECT_ROOT / "cache")))
 WRAPPER_PORT = int(os.getenv("WRAPPER_PORT", "8000"))
+# Pool de conexões com a API real (keep-alive compartilhado entre requisições)
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv("WRAPPER_UPSTREAM_MAX_CONNECTIONS", "20"))
+UPSTREAM_MAX_KEEPALIVE = int(os.getenv("WRAPPER_UPSTREAM_MAX_KEEPALIVE", "10"))
+UPSTREAM_MAX_PER_HOST = int(os.getenv("WRAPPER_UPSTREAM_MAX_PER_HOST", "8"))
+UPSTREAM_KEEPALIVE_EXPIRY = float(os.getenv("WRAPPER_UPSTREAM_KEEPALIVE_EXPIRY", "30"))
+# Chamadas à API real (cada endpoint pode sobrescrever em "upstream" no api_endpoints.json): prazo total por
+# chamada (inclui retries), retries com backoff exponencial e jitter, e hedge (segunda chamada se a primeira
+# passar do percentil de latência do endpoint, com um mínimo de amostras)
+UPSTREAM_DEADLINE_SECONDS = float(os.getenv("WRAPPER_UPSTREAM_DEADLINE_SECONDS", "60"))
+UPSTREAM_RETRIES = int(os.getenv("WRAPPER_UPSTREAM_RETRIES", "2"))
+UPSTREAM_BACKOFF_SECONDS = float(os.getenv("WRAPPER_UPSTREAM_BACKOFF_SECONDS", "0.5"))
+UPSTREAM_MAX_BACKOFF_SECONDS = float(os.getenv("WRAPPER_UPSTREAM_MAX_BACKOFF_SECONDS", "8"))
+UPSTREAM_HEDGE = os.getenv("WRAPPER_UPSTREAM_HEDGE", "false").strip().lower() in ("1", "true", "yes")
+UPSTREAM_HEDGE_PERCENTILE = float(os.getenv("WRAPPER_UPSTREAM_HEDGE_PERCENTILE", "95"))
+UPSTREAM_HEDGE_MIN_SAMPLES = int(os.getenv("WRAPPER_UPSTREAM_HEDGE_MIN_SAMPLES", "20"))
+# Cache em memória das respostas do wrapper (TTL padrão; cada endpoint pode definir cache_ttl_seconds)
+RESPONSE_CACHE_TTL = float(os.getenv("WRAPPER_RESPONSE_CACHE_TTL", "30"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("WRAPPER_RESPONSE_CACHE_MAX_ENTRIES", "128"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("WRAPPER_RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Visão Geral do mês anterior (?compare=previous_month): meses fechados não mudam, então o TTL é longo
+PREVIOUS_MONTH_CACHE_TTL = float(os.getenv("WRAPPER_PREVIOUS_MONTH_CACHE_TTL", str(7 * 24 * 3600)))
+PREVIOUS_MONTH_CACHE_MAX_ENTRIES = int(os.getenv("WRAPPER_PREVIOUS_MONTH_CACHE_MAX_ENTRIES", "256"))
+# Stale-while-revalidate: idade máxima padrão dos snapshots por consulta ("stale_while_revalidate": true no endpoint)
+SWR_MAX_STALE_SECONDS = float(os.getenv("WRAPPER_SWR_MAX_STALE_SECONDS", "600"))
+# Otimizados em memória para paginar o view=full em streaming (?fields/offset/limit/cursor); cada entrada é um relatório inteiro
+FULL_VIEW_CACHE_MAX_ENTRIES = int(os.getenv("WRAPPER_FULL_VIEW_CACHE_MAX_ENTRIES", "4"))
+# Compressão das respostas do /wrapper (gzip; brotli se o pacote estiver instalado): tamanho mínimo e níveis
+RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv("WRAPPER_RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+RESPONSE_GZIP_LEVEL = int(os.getenv("WRAPPER_RESPONSE_GZIP_LEVEL", "6"))
+RESPONSE_BROTLI_QUALITY = int(os.getenv("WRAPPER_RESPONSE_BROTLI_QUALITY", "5"))
+# Cache-Control das respostas do /wrapper (cada endpoint pode definir cache_control); no-cache = revalidar com ETag
+RESPONSE_CACHE_CONTROL = os.getenv("WRAPPER_CACHE_CONTROL", "no-cache").strip()
+# Profiling sob demanda (?profile=1 no /wrapper): só com WRAPPER_PROFILING_ENABLED; linhas do resumo em texto
+PROFILING_ENABLED = os.getenv("WRAPPER_PROFILING_ENABLED", "false").strip().lower() in ("1", "true", "yes")
+PROFILING_TOP_N = int(os.getenv("WRAPPER_PROFILING_TOP_N", "40"))
+# Fila de comparação em segundo plano (endpoints pendentes e espera antes de gerar, para agrupar chamadas seguidas)
+COMPARISON_QUEUE_SIZE = int(os.getenv("WRAPPER_COMPARISON_QUEUE_SIZE", "8"))
+COMPARISON_DEBOUNCE_SECONDS = float(os.getenv("WRAPPER_COMPARISON_DEBOUNCE_SECONDS", "2"))
+# Formato dos arquivos raw/optimized/dashboard no cache: pretty, compact, gzip ou lzma (cada endpoint pode definir cache_encoding)
+CACHE_ENCODING = os.getenv("WRAPPER_CACHE_ENCODING", "pretty").strip().lower()
+# Dashboard em vários processos (build_visao_geral_parallel): mínimo de conversas, processos (0 = núcleos da máquina)
+DASHBOARD_PARALLEL_MIN_ITEMS = int(os.getenv("WRAPPER_DASHBOARD_PARALLEL_MIN_ITEMS", "100000"))
+DASHBOARD_PARALLEL_WORKERS = int(os.getenv("WRAPPER_DASHBOARD_PARALLEL_WORKERS", "0"))
+# POST /wrapper/batch: itens por chamada e consultas executadas ao mesmo tempo
+BATCH_MAX_ITEMS = int(os.getenv("WRAPPER_BATCH_MAX_ITEMS", "20"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("WRAPPER_BATCH_MAX_CONCURRENCY", "4"))
+# Prefetch dos presets do api_endpoints.json ("prefetch" no endpoint; só com o servidor iniciado por serve()):
+# liga/desliga, intervalo padrão, jitter, execuções simultâneas e pausa após erro da API real (dobra até o máximo)
+PREFETCH_ENABLED = os.getenv("WRAPPER_PREFETCH_ENABLED", "true").strip().lower() in ("1", "true", "yes")
+PREFETCH_INTERVAL_SECONDS = float(os.getenv("WRAPPER_PREFETCH_INTERVAL_SECONDS", "300"))
+PREFETCH_JITTER_SECONDS = float(os.getenv("WRAPPER_PREFETCH_JITTER_SECONDS", "30"))
+PREFETCH_MAX_CONCURRENCY = int(os.getenv("WRAPPER_PREFETCH_MAX_CONCURRENCY", "2"))
+PREFETCH_ERROR_BACKOFF_SECONDS = float(os.getenv("WRAPPER_PREFETCH_ERROR_BACKOFF_SECONDS", "60"))
+PREFETCH_MAX_BACKOFF_SECONDS = float(os.getenv("WRAPPER_PREFETCH_MAX_BACKOFF_SECONDS", "1800"))
+# Shards diários do dashboard: dias mais novos que isto (0 = hoje) não são persistidos
+SHARD_MIN_AGE_DAYS = int(os.getenv("WRAPPER_SHARD_MIN_AGE_DAYS", "1"))
+# Store local de conversas (SQLite) para sync incremental: arquivo e dias recentes sempre rebuscados (0 = só hoje)
+STORE_PATH = Path(os.getenv("WRAPPER_STORE_PATH", str(CACHE_DIR / "conversations.sqlite3")))
+STORE_MIN_AGE_DAYS = int(os.getenv("WRAPPER_STORE_MIN_AGE_DAYS", "1"))
 # Chave da API real de relatório (enviada no header das chamadas)
 GENERAL_REPORT_API_KEY = os.getenv("GENERAL_REPORT_API_KEY", "").strip()
 if not GENERAL_REPORT_API_KEY and (PROJECT_ROOT / ".env").exists():
@@ -135,6 +194,19 @@ def get_endpoint_config(endpoint_key: str) -> dict | None:
     return None
 
 
+def get_endpoint_setting(endpoint_key: str, name: str, default=None):
+    """
+    Retorna uma configuração opcional do endpoint no api_endpoints.json (ex.: cache_ttl_seconds).
+    Endpoints declarados só como path (string) ou paths diretos usam sempre o default.
+    """
+    if "/" in endpoint_key:
+        return default
+    val = _load_endpoints_raw().get(endpoint_key)
+    if isinstance(val, dict) and name in val:
+        return val[name]
+    return default
+
+
 def resolve_path(endpoint_key_or_path: str) -> str | None:
     """
     Resolve um identificador para o path real da API.
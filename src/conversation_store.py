@@ -0,0 +1,274 @@
+"""
+Store local (SQLite) das conversas otimizadas, para sync incremental em vez de rebuscar o período inteiro.
+Conversas de dias passados não mudam: cada conversa fica guardada por endpoint, escopo (agentId + hash dos demais
+params, como nos shards) e identidade (_id/id, ou hash do conteúdo), com o dia do createdAt. Os dias já sincronizados
+ficam registrados; uma consulta from/to busca na API real só os dias que faltam ou são recentes (menos de
+min_age_days, padrão 1 = hoje), em intervalos contínuos, substitui as conversas desses dias e monta o otimizado
+do período a partir do store. ?refresh=full no /wrapper rebusca o período inteiro.
+Ordem de "data": por dia e, dentro do dia, na ordem em que a API real devolveu. O view=full paginado lê só a página
+pedida (count + iter_items em lotes), sem montar o período inteiro.
+Config (api_endpoints.json): "conversation_store": true ou {"min_age_days": N}; arquivo em WRAPPER_STORE_PATH.
+Responsabilidade: persistência e sync incremental das conversas; usado pelo wrapper_server.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Iterator
+
+from src.config import STORE_MIN_AGE_DAYS, STORE_PATH, get_endpoint_setting
+from src.dashboard_treatments import _DateParser, _extrair_data_atendimento
+from src.response_cache import normalize_params
+from src.storage import _normalize_for_folder
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    endpoint TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    conv_key TEXT NOT NULL,
+    day TEXT NOT NULL,
+    pos INTEGER NOT NULL,
+    item TEXT NOT NULL,
+    PRIMARY KEY (endpoint, scope, conv_key)
+);
+CREATE INDEX IF NOT EXISTS conversations_by_day ON conversations (endpoint, scope, day, pos);
+CREATE TABLE IF NOT EXISTS synced_days (
+    endpoint TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    day TEXT NOT NULL,
+    synced_at REAL NOT NULL,
+    PRIMARY KEY (endpoint, scope, day)
+);
+CREATE TABLE IF NOT EXISTS report_meta (
+    endpoint TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    meta TEXT NOT NULL,
+    PRIMARY KEY (endpoint, scope)
+);
+"""
+
+
+def store_enabled(endpoint_key: str) -> bool:
+    """Endpoint usa o store de conversas? ("conversation_store": true ou {"min_age_days": N} no api_endpoints.json)."""
+    return bool(get_endpoint_setting(endpoint_key, "conversation_store", False))
+
+
+def _min_age_days(endpoint_key: str) -> int:
+    """Dias mais novos que isto (0 = hoje) são sempre rebuscados. Padrão: WRAPPER_STORE_MIN_AGE_DAYS."""
+    setting = get_endpoint_setting(endpoint_key, "conversation_store", False)
+    if isinstance(setting, dict) and "min_age_days" in setting:
+        return int(setting["min_age_days"])
+    return STORE_MIN_AGE_DAYS
+
+
+def scope_key(params: dict) -> str:
+    """Escopo das conversas: agente + hash dos demais params (tudo menos from/to)."""
+    rest = {k: v for k, v in params.items() if k not in ("from", "to")}
+    digest = hashlib.sha1(repr(normalize_params(rest)).encode("utf-8")).hexdigest()[:10]
+    return f"{_normalize_for_folder(str(params.get('agentId') or 'all'))}_{digest}"
+
+
+def conversation_key(item: dict, encoded: str) -> str:
+    """Identidade da conversa: _id (ou id) da API real; sem id, hash do próprio JSON."""
+    ident = item.get("_id") or item.get("id")
+    if isinstance(ident, (str, int)) and not isinstance(ident, bool):
+        return f"id:{ident}"
+    return "sha1:" + hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class StorePlan:
+    """Resultado do planejamento: escopo, intervalos contínuos a buscar e último dia que pode ser marcado como sincronizado."""
+
+    endpoint_key: str
+    scope: str
+    missing_runs: list[tuple[date, date]]
+    last_closed_day: date
+    days_from_store: int
+
+
+class ConversationStore:
+    """Acesso ao SQLite (uma conexão, serializada por lock; as chamadas vêm do threadpool)."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        self.days_from_store = 0
+        self.days_fetched = 0
+        self.runs_fetched = 0
+        self.conversations_upserted = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        """Abre o banco na primeira chamada (WAL: leituras não esperam a escrita). Chamar com o lock adquirido."""
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.path), check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(_SCHEMA)
+            self._db = db
+        return self._db
+
+    def plan(self, endpoint_key: str, params: dict, start: date, end: date, refresh_full: bool = False) -> StorePlan:
+        """
+        Dias do período que precisam ir à API real (não sincronizados, recentes ou todos com refresh_full),
+        agrupados em intervalos contínuos.
+        """
+        scope = scope_key(params)
+        last_closed_day = datetime.now(timezone.utc).date() - timedelta(days=_min_age_days(endpoint_key))
+        synced: set[str] = set()
+        if not refresh_full:
+            with self._lock:
+                rows = self._conn().execute(
+                    "SELECT day FROM synced_days WHERE endpoint = ? AND scope = ? AND day BETWEEN ? AND ?",
+                    (endpoint_key, scope, start.isoformat(), end.isoformat()),
+                ).fetchall()
+            synced = {row[0] for row in rows}
+        missing_runs: list[tuple[date, date]] = []
+        from_store = 0
+        day = start
+        while day <= end:
+            if day <= last_closed_day and day.isoformat() in synced:
+                from_store += 1
+            elif missing_runs and missing_runs[-1][1] == day - timedelta(days=1):
+                missing_runs[-1] = (missing_runs[-1][0], day)
+            else:
+                missing_runs.append((day, day))
+            day += timedelta(days=1)
+        with self._lock:
+            self.days_from_store += from_store
+        return StorePlan(endpoint_key, scope, missing_runs, last_closed_day, from_store)
+
+    def upsert_run(self, plan: StorePlan, run: tuple[date, date], optimized: dict) -> int:
+        """
+        Substitui as conversas dos dias do intervalo pelas do otimizado buscado (conversas sem data ou fora do
+        intervalo ficam no primeiro/último dia) e marca os dias fechados como sincronizados. Retorna quantas gravou.
+        """
+        data = optimized.get("data")
+        if not isinstance(data, list):
+            raise ValueError("Resposta da API real sem array 'data'; não é possível sincronizar o store")
+        run_start, run_end = run
+        rows = []
+        parser = _DateParser()
+        for pos, item in enumerate(data):
+            if not isinstance(item, dict):
+                continue
+            dt = _extrair_data_atendimento(item, parser)
+            day = min(max(dt.date() if dt else run_start, run_start), run_end)
+            encoded = json.dumps(item, ensure_ascii=False, separators=(",", ":"))
+            rows.append((plan.endpoint_key, plan.scope, conversation_key(item, encoded), day.isoformat(), pos, encoded))
+        meta = json.dumps({k: v for k, v in optimized.items() if k != "data"}, ensure_ascii=False)
+        now = time.time()
+        closed_days = []
+        day = run_start
+        while day <= min(run_end, plan.last_closed_day):
+            closed_days.append((plan.endpoint_key, plan.scope, day.isoformat(), now))
+            day += timedelta(days=1)
+        with self._lock:
+            db = self._conn()
+            with db:
+                db.execute(
+                    "DELETE FROM conversations WHERE endpoint = ? AND scope = ? AND day BETWEEN ? AND ?",
+                    (plan.endpoint_key, plan.scope, run_start.isoformat(), run_end.isoformat()),
+                )
+                db.executemany("INSERT OR REPLACE INTO conversations VALUES (?, ?, ?, ?, ?, ?)", rows)
+                db.executemany("INSERT OR REPLACE INTO synced_days VALUES (?, ?, ?, ?)", closed_days)
+                db.execute("INSERT OR REPLACE INTO report_meta VALUES (?, ?, ?)", (plan.endpoint_key, plan.scope, meta))
+            self.runs_fetched += 1
+            self.days_fetched += (run_end - run_start).days + 1
+            self.conversations_upserted += len(rows)
+        return len(rows)
+
+    def meta(self, plan: StorePlan) -> dict:
+        """Campos do topo do relatório (tudo menos "data") gravados na última busca do escopo."""
+        with self._lock:
+            row = self._conn().execute(
+                "SELECT meta FROM report_meta WHERE endpoint = ? AND scope = ?", (plan.endpoint_key, plan.scope)
+            ).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def count(self, plan: StorePlan, start: date, end: date) -> int:
+        """Quantidade de conversas do período no store."""
+        with self._lock:
+            row = self._conn().execute(
+                "SELECT COUNT(*) FROM conversations WHERE endpoint = ? AND scope = ? AND day BETWEEN ? AND ?",
+                (plan.endpoint_key, plan.scope, start.isoformat(), end.isoformat()),
+            ).fetchone()
+        return row[0]
+
+    def iter_items(
+        self,
+        plan: StorePlan,
+        start: date,
+        end: date,
+        offset: int = 0,
+        limit: int | None = None,
+        raw: bool = False,
+        batch_size: int = 500,
+    ) -> Iterator[Any]:
+        """
+        Conversas do período na ordem de load(), a partir de offset e até limit, lidas em lotes (o lock só é
+        segurado durante cada lote; depois do primeiro, a posição segue por (day, pos) em vez de OFFSET).
+        raw=True devolve o JSON gravado (bytes UTF-8), sem desserializar.
+        """
+        remaining = limit
+        after: tuple[str, int] | None = None
+        while remaining is None or remaining > 0:
+            n = batch_size if remaining is None else min(batch_size, remaining)
+            if after is None:
+                sql = (
+                    "SELECT day, pos, item FROM conversations WHERE endpoint = ? AND scope = ? AND day BETWEEN ? AND ? "
+                    "ORDER BY day, pos LIMIT ? OFFSET ?"
+                )
+                args = (plan.endpoint_key, plan.scope, start.isoformat(), end.isoformat(), n, offset)
+            else:
+                sql = (
+                    "SELECT day, pos, item FROM conversations WHERE endpoint = ? AND scope = ? AND day BETWEEN ? AND ? "
+                    "AND (day > ? OR (day = ? AND pos > ?)) ORDER BY day, pos LIMIT ?"
+                )
+                args = (plan.endpoint_key, plan.scope, start.isoformat(), end.isoformat(), after[0], after[0], after[1], n)
+            with self._lock:
+                rows = self._conn().execute(sql, args).fetchall()
+            for _, _, item in rows:
+                yield item.encode("utf-8") if raw else json.loads(item)
+            if len(rows) < n:
+                return
+            after = (rows[-1][0], rows[-1][1])
+            if remaining is not None:
+                remaining -= len(rows)
+
+    def load(self, plan: StorePlan, start: date, end: date) -> dict:
+        """Otimizado do período a partir do store: campos do topo da última busca e "data" por dia e ordem da API."""
+        with self._lock:
+            rows = self._conn().execute(
+                "SELECT item FROM conversations WHERE endpoint = ? AND scope = ? AND day BETWEEN ? AND ? ORDER BY day, pos",
+                (plan.endpoint_key, plan.scope, start.isoformat(), end.isoformat()),
+            ).fetchall()
+        report = self.meta(plan)
+        report["data"] = [json.loads(row[0]) for row in rows]
+        return report
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self) -> dict:
+        """Contadores para GET /stats."""
+        with self._lock:
+            return {
+                "days_from_store": self.days_from_store,
+                "days_fetched": self.days_fetched,
+                "runs_fetched": self.runs_fetched,
+                "conversations_upserted": self.conversations_upserted,
+            }
+
+
+# Instância única do processo (arquivo em WRAPPER_STORE_PATH)
+conversation_store = ConversationStore(STORE_PATH)
@@ -0,0 +1,244 @@
+"""
+Tabela colunar das conversas para a Visão Geral: uma passada sobre optimized["data"] extrai só os campos usados
+pelo dashboard para arrays tipados (NumPy, se instalado; senão o módulo array), e as contagens saem de operações
+sobre colunas inteiras (bincount/unique no NumPy, Counter em C no array) em vez de dict.get, isinstance e
+formatação de chaves de hora/dia conversa a conversa.
+Colunas (uma linha por conversa, inclusive itens que não são dict):
+  created              createdAt em segundos desde 1970 pelo relógio do próprio valor (mesma hora/dia que o datetime)
+  uf                   índice da UF normalizada em UF_CODES (-1 = sem estado válido)
+  birth                índice da data de nascimento (YYYY-MM-DD) em birth_dates (-1 = sem data válida)
+  agent_messages       mensagens da LIA (botMessageCount ou contagem em Full Conversation)
+  conversation_length  tamanho de Full Conversation
+Faixa etária, atendimentos_por_hora, volume/cohort por dia e fora do horário são derivados dos histogramas
+por UF, por data de nascimento e por hora (createdAt // 3600); com NumPy as idades das datas de nascimento
+distintas também são calculadas em bloco (datetime64). O resultado é idêntico ao de VisaoGeralAccumulator.
+Responsabilidade: build_visao_geral (dashboard_treatments) e as partes do dashboard_parallel.
+"""
+import re
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from itertools import repeat
+from operator import floordiv
+from typing import Any
+
+from src.dashboard_treatments import (
+    _FAIXAS_LIMITES,
+    _HORAS,
+    _UFS_VALIDAS,
+    FAIXAS_ETARIAS,
+    VisaoGeralAccumulator,
+    _DateParser,
+    _chave_dia,
+    _data_nascimento,
+    _mensagens_lia_item,
+    _normalizar_uf,
+)
+
+try:
+    import numpy as np
+except ImportError:  # opcional: sem NumPy as colunas usam o módulo array
+    np = None
+
+# Ordem fixa das UFs (índice da coluna uf)
+UF_CODES = tuple(sorted(_UFS_VALIDAS))
+_UF_INDEX = {uf: i for i, uf in enumerate(UF_CODES)}
+# createdAt ausente ou inválido (nenhuma data real cai na mesma hora)
+MISSING = -(2**63)
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+# Horas (0-23) contadas como fora do horário (19h–08h), como _esta_fora_do_horario
+_FORA_DO_HORARIO = frozenset(h for h in range(24) if h >= 19 or h < 8)
+# createdAt no formato usual da API (YYYY-MM-DDTHH:MM:SS[.fff][Z]): data+hora, minuto e segundo
+_CREATED_RAPIDO = re.compile(r"([0-9]{4}-[0-9]{2}-[0-9]{2}[T ][0-9]{2}):([0-5][0-9]):([0-5][0-9])(?:\.[0-9]*)?Z?")
+
+
+def _epoch(dt: datetime) -> int:
+    """Segundos desde 1970 dos campos do datetime (sem aplicar fuso), para hora e dia baterem com dt.hour/dt.date()."""
+    return (dt.toordinal() - _EPOCH_ORDINAL) * 86400 + dt.hour * 3600 + dt.minute * 60 + dt.second
+
+
+class _CreatedEpoch:
+    """
+    createdAt -> segundos desde 1970 (MISSING se inválido), com o mesmo resultado de _DateParser.
+    No formato usual o início do valor (data e hora) é convertido uma vez por hora distinta; os demais
+    valores passam pelo _DateParser.
+    """
+
+    def __init__(self):
+        self._parser = _DateParser()
+        self._horas: dict[str, int | None] = {}
+
+    def __call__(self, value: Any) -> int:
+        if isinstance(value, str):
+            m = _CREATED_RAPIDO.fullmatch(value)
+            if m is not None:
+                prefixo, minuto, segundo = m.groups()
+                base = self._horas.get(prefixo, MISSING)
+                if base is MISSING:
+                    try:
+                        base = _epoch(datetime.fromisoformat(prefixo + ":00:00"))
+                    except ValueError:
+                        base = None
+                    self._horas[prefixo] = base
+                if base is not None:
+                    return base + int(minuto) * 60 + int(segundo)
+        dt = self._parser.parse(value)
+        return _epoch(dt) if dt is not None else MISSING
+
+
+@dataclass
+class ConversationTable:
+    """Colunas de um relatório (ver docstring do módulo); numpy=True quando as colunas são arrays NumPy."""
+
+    created: Any
+    uf: Any
+    birth: Any
+    agent_messages: Any
+    conversation_length: Any
+    birth_dates: list[str]
+    numpy: bool
+
+    def __len__(self) -> int:
+        return len(self.created)
+
+    @classmethod
+    def from_items(cls, items: list, use_numpy: bool | None = None) -> "ConversationTable":
+        """
+        Extrai as colunas numa única passada. Estados e datas de nascimento repetidos são resolvidos uma vez
+        por valor distinto. use_numpy=None usa NumPy se estiver instalado.
+        """
+        use_numpy = np is not None if use_numpy is None else use_numpy and np is not None
+        created_epoch = _CreatedEpoch()
+        uf_cache: dict[str, int] = {}
+        # birthDate bruto -> índice em birth_dates (-1 = inválida); data normalizada -> índice
+        birth_cache: dict = {}
+        birth_index: dict[str, int] = {}
+        created, uf, birth, agent_messages, conversation_length = [], [], [], [], []
+        for item in items:
+            if not isinstance(item, dict):
+                created.append(MISSING)
+                uf.append(-1)
+                birth.append(-1)
+                agent_messages.append(0)
+                conversation_length.append(0)
+                continue
+            agent_messages.append(_mensagens_lia_item(item))
+            fc = item.get("Full Conversation")
+            conversation_length.append(len(fc) if isinstance(fc, list) else 0)
+            dcu = item.get("dataCollectFromUser")
+            if not isinstance(dcu, dict):
+                dcu = {}
+            state = dcu.get("state") or dcu.get("estado")
+            if isinstance(state, str):
+                code = uf_cache.get(state)
+                if code is None:
+                    sigla = _normalizar_uf(state.strip())
+                    code = uf_cache[state] = _UF_INDEX[sigla] if sigla else -1
+                uf.append(code)
+            else:
+                uf.append(-1)
+            value = dcu.get("birthDate")
+            if isinstance(value, (str, int, float)):
+                code = birth_cache.get(value)
+                if code is None:
+                    nascimento = _data_nascimento(value)
+                    if nascimento is None:
+                        code = -1
+                    else:
+                        code = birth_index.get(nascimento)
+                        if code is None:
+                            code = birth_index[nascimento] = len(birth_index)
+                    birth_cache[value] = code
+                birth.append(code)
+            else:
+                birth.append(-1)
+            value = item.get("createdAt")
+            created.append(created_epoch(value) if value is not None else MISSING)
+        if use_numpy:
+            columns = (
+                np.array(created, dtype=np.int64),
+                np.array(uf, dtype=np.int8),
+                np.array(birth, dtype=np.int32),
+                np.array(agent_messages, dtype=np.int64),
+                np.array(conversation_length, dtype=np.int64),
+            )
+        else:
+            columns = (array("q", created), array("b", uf), array("i", birth), array("q", agent_messages), array("q", conversation_length))
+        return cls(*columns, birth_dates=list(birth_index), numpy=use_numpy)
+
+    @classmethod
+    def from_optimized(cls, optimized: dict, use_numpy: bool | None = None) -> "ConversationTable":
+        data = optimized.get("data") if isinstance(optimized.get("data"), list) else []
+        return cls.from_items(data, use_numpy)
+
+    def _counts(self) -> tuple[int, dict[int, int], dict[int, int], dict[int, int]]:
+        """(mensagens da LIA, contagem por índice de UF, por índice de nascimento, por hora desde 1970)."""
+        if self.numpy:
+            uf = self.uf[self.uf >= 0]
+            birth = self.birth[self.birth >= 0]
+            created = self.created[self.created != MISSING]
+            hours, hour_counts = np.unique(created // 3600, return_counts=True)
+            return (
+                int(self.agent_messages.sum()),
+                {i: int(n) for i, n in enumerate(np.bincount(uf, minlength=len(UF_CODES))) if n},
+                {i: int(n) for i, n in enumerate(np.bincount(birth, minlength=len(self.birth_dates))) if n},
+                {int(h): int(n) for h, n in zip(hours, hour_counts)},
+            )
+        uf_counts = Counter(self.uf)
+        uf_counts.pop(-1, None)
+        birth_counts = Counter(self.birth)
+        birth_counts.pop(-1, None)
+        hour_counts = Counter(map(floordiv, self.created, repeat(3600)))
+        hour_counts.pop(MISSING // 3600, None)
+        return sum(self.agent_messages), uf_counts, birth_counts, hour_counts
+
+    def accumulator(self) -> VisaoGeralAccumulator:
+        """Contadores da Visão Geral (o mesmo estado que VisaoGeralAccumulator.add item a item produziria)."""
+        mensagens, uf_counts, birth_counts, hour_counts = self._counts()
+        acc = VisaoGeralAccumulator()
+        acc.total_conversas = len(self)
+        acc.mensagens_lia = mensagens
+        for i, n in uf_counts.items():
+            acc.distribuicao_por_estado[UF_CODES[i]] += n
+        for i, n in birth_counts.items():
+            acc.nascimentos[self.birth_dates[i]] += n
+        dias: dict[int, str] = {}
+        for hour, n in hour_counts.items():
+            dia_num, h = divmod(hour, 24)
+            acc.atendimentos_por_hora[_HORAS[h]] += n
+            if h in _FORA_DO_HORARIO:
+                acc.fora_do_horario_count += n
+            dia = dias.get(dia_num)
+            if dia is None:
+                dia = dias[dia_num] = _chave_dia(datetime.fromordinal(dia_num + _EPOCH_ORDINAL))
+            acc.volume_por_dia[dia] += n
+            acc.cohort_por_dia[dia] += n
+        return acc
+
+    def _faixas_etarias_numpy(self, hoje: datetime) -> dict[str, int]:
+        """Conversas por faixa etária: idade de cada data de nascimento distinta em bloco, ponderada pela contagem."""
+        faixa_etaria = dict.fromkeys(FAIXAS_ETARIAS, 0)
+        if not self.birth_dates:
+            return faixa_etaria
+        counts = np.bincount(self.birth[self.birth >= 0], minlength=len(self.birth_dates))
+        dias = np.array(self.birth_dates, dtype="datetime64[D]")
+        anos_inicio = dias.astype("datetime64[Y]")
+        meses_inicio = dias.astype("datetime64[M]")
+        ano = anos_inicio.astype(np.int64) + 1970
+        mes = (meses_inicio - anos_inicio).astype(np.int64) + 1
+        dia = (dias - meses_inicio).astype(np.int64) + 1
+        idade = hoje.year - ano - ((mes > hoje.month) | ((mes == hoje.month) & (dia > hoje.day)))
+        validas = idade >= 0
+        faixa = np.searchsorted(np.array(_FAIXAS_LIMITES), idade[validas], side="left")
+        por_faixa = np.bincount(faixa, weights=counts[validas], minlength=len(FAIXAS_ETARIAS))
+        for nome, n in zip(FAIXAS_ETARIAS, por_faixa):
+            faixa_etaria[nome] = int(n)
+        return faixa_etaria
+
+    def visao_geral(self, hoje: datetime | None = None) -> dict:
+        """Payload da Visão Geral (mesmo dict de build_visao_geral)."""
+        if hoje is None:
+            hoje = datetime.now(timezone.utc)
+        faixa_etaria = self._faixas_etarias_numpy(hoje) if self.numpy else None
+        return self.accumulator().result(hoje, faixa_etaria)
@@ -0,0 +1,132 @@
+"""
+Visão Geral em vários processos (map-reduce) para relatórios muito grandes.
+optimized["data"] é dividido em partes contíguas; cada processo soma a sua parte (tabela colunar) num VisaoGeralAccumulator
+e devolve o estado parcial (to_dict, poucos KB); o processo principal combina as partes na ordem (merge)
+e monta o mesmo dict de build_visao_geral.
+Dois modos:
+- padrão (servidor): pool persistente (forkserver, ou spawn onde não houver) reaproveitado entre requisições;
+  as partes são serializadas (pickle) para os filhos, mas nenhum processo é criado por fork do servidor, cujas
+  threads (uvicorn, pool httpx, SQLite, logging) poderiam deixar locks presos nos filhos;
+- reuse_pool=False (só CLI/benchmarks, processo de uma thread): pool criado por chamada com fork; os filhos herdam
+  a lista de itens (cópia sob demanda do SO), então só os intervalos de índices e os parciais passam entre processos.
+Abaixo de WRAPPER_DASHBOARD_PARALLEL_MIN_ITEMS conversas (ou com 1 processo) roda em um núcleo, como build_visao_geral.
+Responsabilidade: dashboard CPU-bound em relatórios de centenas de milhares de conversas; usado pelo wrapper_server.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from src.config import DASHBOARD_PARALLEL_MIN_ITEMS, DASHBOARD_PARALLEL_WORKERS
+from src.dashboard_columnar import ConversationTable
+from src.dashboard_treatments import VisaoGeralAccumulator, build_visao_geral
+
+# Itens herdados pelos filhos do pool com fork (definido só durante uma chamada, sob _fork_lock)
+_shared_items: list | None = None
+_fork_lock = threading.Lock()
+_pool: ProcessPoolExecutor | None = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def default_workers() -> int:
+    """Processos usados: WRAPPER_DASHBOARD_PARALLEL_WORKERS ou, se 0, a quantidade de núcleos."""
+    return DASHBOARD_PARALLEL_WORKERS if DASHBOARD_PARALLEL_WORKERS > 0 else (os.cpu_count() or 1)
+
+
+def _fork_available() -> bool:
+    return "fork" in multiprocessing.get_all_start_methods()
+
+
+def _partitions(n_items: int, parts: int) -> list[tuple[int, int]]:
+    """Intervalos [início, fim) contíguos e de tamanho parecido cobrindo n_items."""
+    size, extra = divmod(n_items, parts)
+    bounds = []
+    start = 0
+    for i in range(parts):
+        stop = start + size + (1 if i < extra else 0)
+        if stop > start:
+            bounds.append((start, stop))
+        start = stop
+    return bounds
+
+
+def _partial_items(items: list) -> dict:
+    """Estado parcial (to_dict) de uma parte dos itens, via tabela colunar. Executado nos processos do pool."""
+    return ConversationTable.from_items(items).accumulator().to_dict()
+
+
+def _partial_range(bounds: tuple[int, int]) -> dict:
+    """Estado parcial dos itens herdados (_shared_items) no intervalo bounds. Executado nos filhos com fork."""
+    start, stop = bounds
+    return _partial_items(_shared_items[start:stop])
+
+
+def _pool_context():
+    """forkserver (filhos criados a partir de um processo limpo, sem as threads do servidor) ou spawn."""
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Pool persistente (seguro mesmo com as threads do servidor); recriado se mudar o número de processos."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context())
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_pool() -> None:
+    """Encerra o pool persistente (no shutdown do servidor)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+
+def _map_fork(items: list, bounds: list[tuple[int, int]], workers: int) -> list[dict]:
+    """Pool com fork por chamada. Só para processos sem outras threads (CLI/benchmarks), nunca no servidor."""
+    global _shared_items
+    # Uma chamada por vez: os filhos leem _shared_items do momento do fork
+    with _fork_lock:
+        _shared_items = items
+        try:
+            with multiprocessing.get_context("fork").Pool(workers) as pool:
+                return pool.map(_partial_range, bounds)
+        finally:
+            _shared_items = None
+
+
+def build_visao_geral_parallel(
+    optimized: dict,
+    hoje: datetime | None = None,
+    workers: int | None = None,
+    min_items: int | None = None,
+    reuse_pool: bool = True,
+) -> dict:
+    """
+    Mesmo resultado de build_visao_geral(optimized, hoje), com as conversas divididas entre processos.
+    workers e min_items usam as variáveis WRAPPER_DASHBOARD_PARALLEL_* quando None.
+    reuse_pool=False (fork por chamada) só deve ser usado fora do servidor; sem fork disponível (ex.: Windows),
+    usa sempre o pool persistente.
+    """
+    data = optimized.get("data") if isinstance(optimized.get("data"), list) else []
+    workers = workers or default_workers()
+    min_items = DASHBOARD_PARALLEL_MIN_ITEMS if min_items is None else min_items
+    if workers <= 1 or len(data) < max(min_items, 2):
+        return build_visao_geral(optimized, hoje)
+    bounds = _partitions(len(data), workers)
+    if reuse_pool or not _fork_available():
+        partials = list(_get_pool(workers).map(_partial_items, (data[start:stop] for start, stop in bounds)))
+    else:
+        partials = _map_fork(data, bounds, workers)
+    total = VisaoGeralAccumulator()
+    for state in partials:
+        total.merge(VisaoGeralAccumulator.from_dict(state))
+    return total.result(hoje)
@@ -0,0 +1,137 @@
+"""
+Shards diários da Visão Geral: agregados parciais por dia, persistidos por endpoint/agente e combinados por período.
+Todas as métricas da Visão Geral são somas por dia (mensagens_lia, distribuição por estado, datas de nascimento
+para a faixa etária, atendimentos por hora, volume por dia, fora do horário), então um período from/to é a soma
+dos shards dos seus dias. Só os dias sem shard são buscados na API real (agrupados em intervalos contínuos).
+Dias recentes (menos de min_age_days, padrão 1 = hoje) nunca são persistidos, pois ainda podem mudar.
+Pasta: cache/<endpoint>/shards/<agentId>_<hash dos demais params>/<YYYY-MM-DD>.json
+Responsabilidade: dashboard incremental para endpoints com "dashboard_shards" no api_endpoints.json; usado pelo wrapper_server.
+"""
+import hashlib
+import json
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+from src.config import SHARD_MIN_AGE_DAYS, get_endpoint_setting
+from src.dashboard_treatments import VisaoGeralAccumulator, _DateParser, _extrair_data_atendimento
+from src.response_cache import normalize_params
+from src.storage import _normalize_for_folder, atomic_write_bytes, get_cache_folder
+
+# Contadores para diagnóstico (GET /stats)
+_stats_lock = threading.Lock()
+shard_stats = {"days_from_cache": 0, "days_fetched": 0, "runs_fetched": 0, "shards_saved": 0}
+
+
+def _count(name: str, n: int = 1) -> None:
+    with _stats_lock:
+        shard_stats[name] += n
+
+
+def shards_enabled(endpoint_key: str) -> bool:
+    """Endpoint usa shards diários? ("dashboard_shards": true ou {"min_age_days": N} no api_endpoints.json)."""
+    return bool(get_endpoint_setting(endpoint_key, "dashboard_shards", False))
+
+
+def _min_age_days(endpoint_key: str) -> int:
+    """Dias mais novos que isto (0 = hoje) não são persistidos. Padrão: WRAPPER_SHARD_MIN_AGE_DAYS."""
+    setting = get_endpoint_setting(endpoint_key, "dashboard_shards", False)
+    if isinstance(setting, dict) and "min_age_days" in setting:
+        return int(setting["min_age_days"])
+    return SHARD_MIN_AGE_DAYS
+
+
+def shard_folder(endpoint_key: str, params: dict) -> Path:
+    """Pasta dos shards: um conjunto por agente + demais params (tudo menos from/to)."""
+    rest = {k: v for k, v in params.items() if k not in ("from", "to")}
+    digest = hashlib.sha1(repr(normalize_params(rest)).encode("utf-8")).hexdigest()[:10]
+    agent = _normalize_for_folder(str(params.get("agentId") or "all"))
+    folder = get_cache_folder(endpoint_key) / "shards" / f"{agent}_{digest}"
+    folder.mkdir(parents=True, exist_ok=True)
+    return folder
+
+
+def _load_shard(folder: Path, day: date) -> VisaoGeralAccumulator | None:
+    path = folder / f"{day.isoformat()}.json"
+    try:
+        with open(path, encoding="utf-8") as f:
+            return VisaoGeralAccumulator.from_dict(json.load(f))
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _save_shard(folder: Path, day: date, acc: VisaoGeralAccumulator) -> None:
+    """Grava o shard do dia (temporário exclusivo + rename: leitores e requisições simultâneas nunca veem arquivo pela metade)."""
+    body = json.dumps(acc.to_dict(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    atomic_write_bytes(folder / f"{day.isoformat()}.json", body)
+    _count("shards_saved")
+
+
+@dataclass
+class ShardPlan:
+    """Resultado do planejamento: shards já em disco e intervalos contínuos de dias que faltam."""
+
+    endpoint_key: str
+    folder: Path
+    cached: dict[date, VisaoGeralAccumulator]
+    missing_runs: list[tuple[date, date]]
+    last_closed_day: date
+
+
+def plan_shards(endpoint_key: str, params: dict, start: date, end: date) -> ShardPlan:
+    """Verifica quais dias do período já têm shard e agrupa os faltantes em intervalos contínuos."""
+    folder = shard_folder(endpoint_key, params)
+    last_closed_day = datetime.now(timezone.utc).date() - timedelta(days=_min_age_days(endpoint_key))
+    cached: dict[date, VisaoGeralAccumulator] = {}
+    missing_runs: list[tuple[date, date]] = []
+    day = start
+    while day <= end:
+        acc = _load_shard(folder, day) if day <= last_closed_day else None
+        if acc is not None:
+            cached[day] = acc
+        elif missing_runs and missing_runs[-1][1] == day - timedelta(days=1):
+            missing_runs[-1] = (missing_runs[-1][0], day)
+        else:
+            missing_runs.append((day, day))
+        day += timedelta(days=1)
+    _count("days_from_cache", len(cached))
+    return ShardPlan(endpoint_key, folder, cached, missing_runs, last_closed_day)
+
+
+def ingest_run(plan: ShardPlan, run: tuple[date, date], optimized: dict) -> dict[date, VisaoGeralAccumulator]:
+    """
+    Distribui as conversas de um intervalo buscado na API real em acumuladores por dia (createdAt) e
+    persiste os dias fechados. Conversas sem data ou com data fora do intervalo ficam no primeiro/último dia
+    do intervalo, para que cada conversa devolvida pela API conte uma única vez.
+    """
+    run_start, run_end = run
+    accs: dict[date, VisaoGeralAccumulator] = {}
+    day = run_start
+    while day <= run_end:
+        accs[day] = VisaoGeralAccumulator()
+        day += timedelta(days=1)
+    data = optimized.get("data") if isinstance(optimized.get("data"), list) else []
+    parser = _DateParser()
+    for item in data:
+        dt = _extrair_data_atendimento(item, parser) if isinstance(item, dict) else None
+        day = dt.date() if dt else run_start
+        day = min(max(day, run_start), run_end)
+        accs[day].add(item)
+    for day, acc in accs.items():
+        if day <= plan.last_closed_day:
+            _save_shard(plan.folder, day, acc)
+    _count("runs_fetched")
+    _count("days_fetched", len(accs))
+    return accs
+
+
+def merge_shards(*parts: dict[date, VisaoGeralAccumulator]) -> dict:
+    """Combina os shards (em ordem de dia) e devolve a visao_geral do período."""
+    total = VisaoGeralAccumulator()
+    days: dict[date, VisaoGeralAccumulator] = {}
+    for part in parts:
+        days.update(part)
+    for day in sorted(days):
+        total.merge(days[day])
+    return total.result()
@@ -4,41 +4,93 @@ A partir do payload otimizado da API de report, calcula métricas agregadas que
 pode consumir em uma única chamada, sem expor o JSON bruto.
 Responsabilidade: derivar total_conversas, mensagens_lia, distribuição por estado, faixa etária, atendimentos por hora, etc.; pode ser chamado por uma rota de dashboard ou via CLI (python -m src.dashboard_treatments).
 """
+import re
+import threading
 from collections import defaultdict
 from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Any
 
 
-def _parse_date(value: Any) -> datetime | None:
-    """Tenta extrair um datetime de string ou número (timestamp ms). Retorna None se inválido."""
-    if value is None:
-        return None
-    if isinstance(value, (int, float)):
-        try:
-            if value > 1e12:
-                value = value / 1000.0
-            return datetime.utcfromtimestamp(value)
-        except (OSError, ValueError):
+# Formatos aceitos em strings de data (aplicados após remover "Z" e a fração de segundos), na ordem original
+_DATE_FORMATS = ("%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d")
+# Formas ISO-8601 simples em que fromisoformat dá o mesmo resultado que strptime (caminho rápido)
+_ISO_SIMPLES = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2}(?:[T ][0-9]{2}:[0-9]{2}:[0-9]{2})?")
+# Só dígitos, "-", "T", ":" e espaços: fora disso nenhum formato strptime casa (ex.: offset "+03:00")
+_CARACTERES_STRPTIME = re.compile(r"[\d\-Tt:\s]*")
+# Quantidade de valores distintos de birthDate memorizados
+_NASCIMENTO_CACHE_SIZE = 4096
+
+
+class _DateParser:
+    """
+    Parser de datas com o mesmo resultado de _parse_date, mas com caminho rápido para ISO-8601
+    (fromisoformat em C) e memória do último formato strptime que funcionou: use uma instância
+    por campo/relatório, pois os valores de um mesmo campo costumam vir sempre no mesmo formato.
+    Seguro entre threads (_default_parser é compartilhado): cada chamada percorre a tupla de formatos do momento
+    e a reordenação troca a tupla inteira sob lock, sem alterar a que outra thread está percorrendo.
+    """
+
+    def __init__(self):
+        self._formats = tuple(_DATE_FORMATS)
+        self._lock = threading.Lock()
+
+    def parse(self, value: Any) -> datetime | None:
+        """Extrai um datetime de string ou número (timestamp ms). Retorna None se inválido."""
+        if value is None:
             return None
-    if isinstance(value, str):
-        for fmt in ("%Y-%m-%dT%H:%M:%S.%fZ", "%Y-%m-%dT%H:%M:%SZ", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
+        if isinstance(value, (int, float)):
+            try:
+                if value > 1e12:
+                    value = value / 1000.0
+                return datetime.utcfromtimestamp(value)
+            except (OSError, ValueError):
+                return None
+        if isinstance(value, str):
+            base = value.replace("Z", "").split(".")[0]
+            if _ISO_SIMPLES.fullmatch(base):
+                try:
+                    return datetime.fromisoformat(base)
+                except ValueError:
+                    pass
+            formats = self._formats if _CARACTERES_STRPTIME.fullmatch(base) else ()
+            for i, fmt in enumerate(formats):
+                try:
+                    dt = datetime.strptime(base, fmt)
+                except ValueError:
+                    continue
+                if i:
+                    # Formato detectado: tentar primeiro nas próximas chamadas
+                    with self._lock:
+                        current = self._formats
+                        if current[0] != fmt:
+                            self._formats = (fmt,) + tuple(f for f in current if f != fmt)
+                return dt
             try:
-                return datetime.strptime(value.replace("Z", "").split(".")[0], fmt.replace(".%f", "").replace("Z", ""))
+                return datetime.fromisoformat(value.replace("Z", "+00:00"))
             except ValueError:
-                continue
-        try:
-            return datetime.fromisoformat(value.replace("Z", "+00:00"))
-        except ValueError:
-            pass
-    return None
+                pass
+        return None
+
+
+_default_parser = _DateParser()
 
 
-def _idade_em_anos(data_nascimento: Any) -> int | None:
-    """Calcula idade em anos a partir de data de nascimento (string ou timestamp). Retorna None se inválido."""
+def _parse_date(value: Any) -> datetime | None:
+    """Tenta extrair um datetime de string ou número (timestamp ms). Retorna None se inválido."""
+    return _default_parser.parse(value)
+
+
+def _idade_em_anos(data_nascimento: Any, hoje: datetime | None = None) -> int | None:
+    """
+    Calcula idade em anos a partir de data de nascimento (string ou timestamp). Retorna None se inválido.
+    hoje: data de referência (uma só por cálculo do dashboard); padrão agora em UTC.
+    """
     dt = _parse_date(data_nascimento)
     if dt is None:
         return None
-    hoje = datetime.now(timezone.utc)
+    if hoje is None:
+        hoje = datetime.now(timezone.utc)
     anos = hoje.year - dt.year
     if (hoje.month, hoje.day) < (dt.month, dt.day):
         anos -= 1
@@ -116,11 +168,11 @@ def _sigla_para_nome_estado(sigla: str) -> str:
     return _UF_PARA_NOME.get(sigla.upper(), sigla)
 
 
-def _extrair_data_atendimento(item: dict) -> datetime | None:
+def _extrair_data_atendimento(item: dict, parser: _DateParser | None = None) -> datetime | None:
     """Extrai data/hora do atendimento (createdAt no item ou primeiro uso). Retorna None se ausente."""
     created = item.get("createdAt")
     if created is not None:
-        return _parse_date(created)
+        return (parser or _default_parser).parse(created)
     # Fallback: não temos createdAt em todos os relatórios
     return None
 
@@ -130,7 +182,7 @@ def _contar_mensagens_agente(item: dict) -> int:
     fc = item.get("Full Conversation")
     if not isinstance(fc, list):
         return 0
-    return sum(1 for e in fc if isinstance(e, dict) and e.get("sender") == "agent")
+    return [e.get("sender") for e in fc if isinstance(e, dict)].count("agent")
 
 
 def _mensagens_lia_item(item: dict) -> int:
@@ -147,90 +199,211 @@ def _esta_fora_do_horario(dt: datetime) -> bool:
     return hour >= 19 or hour < 8
 
 
-def build_visao_geral(optimized: dict) -> dict:
+@lru_cache(maxsize=_NASCIMENTO_CACHE_SIZE, typed=True)
+def _data_nascimento_memo(value: str | int | float) -> str | None:
+    dt = _parse_date(value)
+    if dt is None:
+        return None
+    return f"{dt.year:04d}-{dt.month:02d}-{dt.day:02d}"
+
+
+def _data_nascimento(value: Any) -> str | None:
     """
-    A partir do JSON otimizado do report, monta o payload da página Visão Geral.
-    Inclui totais, distribuição por estado, faixa etária, menores de 18, atendimentos por hora, etc.
-    Campos que dependem de CSV ou heurísticas complexas ficam null/zero com indicação.
+    Data de nascimento normalizada (YYYY-MM-DD) a partir de string ou timestamp. Retorna None se inválida.
+    Valores repetidos (mesmo birthDate em muitas conversas) vêm de um cache limitado.
     """
-    data = optimized.get("data") if isinstance(optimized.get("data"), list) else []
-    total_conversas = len(data)
-
-    mensagens_lia = 0
-    distribuicao_por_estado = defaultdict(int)
-    idades = []
-    menores_de_18 = 0
-    fora_do_horario_count = 0
-    atendimentos_por_hora = defaultdict(int)
-    volume_por_dia = defaultdict(int)
-    cohort_por_dia = defaultdict(int)
-
-    for item in data:
+    if isinstance(value, (str, int, float)):
+        return _data_nascimento_memo(value)
+    return None
+
+
+# Chaves de hora ("00:00" .. "23:00") pré-montadas, iguais a strftime("%H:00")
+_HORAS = tuple(f"{h:02d}:00" for h in range(24))
+
+
+def _chave_dia(dt: datetime) -> str:
+    """Mesmo resultado de dt.strftime("%Y-%m-%d"), sem o custo de strftime (anos < 1000 usam strftime)."""
+    if dt.year < 1000:
+        return dt.strftime("%Y-%m-%d")
+    return f"{dt.year}-{dt.month:02d}-{dt.day:02d}"
+
+
+# Faixas etárias da Visão Geral (limite superior inclusivo de cada faixa, exceto a última)
+FAIXAS_ETARIAS = ("0-17", "18-24", "25-34", "35-44", "45-54", "55+")
+_FAIXAS_LIMITES = (17, 24, 34, 44, 54)
+
+
+def _idade_na_data(nascimento: str, hoje: datetime) -> int | None:
+    """Idade em anos de uma data YYYY-MM-DD na data de referência hoje. None se negativa."""
+    ano, mes, dia = (int(p) for p in nascimento.split("-"))
+    anos = hoje.year - ano
+    if (hoje.month, hoje.day) < (mes, dia):
+        anos -= 1
+    return anos if anos >= 0 else None
+
+
+class VisaoGeralAccumulator:
+    """
+    Acumula as métricas da Visão Geral item a item (sem guardar a lista de conversas).
+    Todos os contadores são somas, então acumuladores parciais (ex.: um por dia) podem ser combinados
+    com merge() e persistidos com to_dict()/from_dict(). As datas de nascimento são contadas por data
+    e a idade só é calculada em result(), na data de referência do momento.
+    Usado por build_visao_geral, pelo pipeline em streaming (report_stream) e pelos shards diários (dashboard_shards).
+    """
+
+    def __init__(self):
+        # Parser próprio para createdAt: o formato é detectado uma vez por relatório
+        self._created_parser = _DateParser()
+        self.total_conversas = 0
+        self.mensagens_lia = 0
+        self.distribuicao_por_estado = defaultdict(int)
+        self.nascimentos = defaultdict(int)
+        self.fora_do_horario_count = 0
+        self.atendimentos_por_hora = defaultdict(int)
+        self.volume_por_dia = defaultdict(int)
+        self.cohort_por_dia = defaultdict(int)
+
+    def add(self, item: Any) -> None:
+        """Contabiliza uma conversa (item de optimized["data"]). Itens que não são dict só contam no total."""
+        self.total_conversas += 1
         if not isinstance(item, dict):
-            continue
-        mensagens_lia += _mensagens_lia_item(item)
+            return
+        self.mensagens_lia += _mensagens_lia_item(item)
         estado = _extrair_estado(item)
         if estado:
-            distribuicao_por_estado[estado] += 1
+            self.distribuicao_por_estado[estado] += 1
         dcu = item.get("dataCollectFromUser") if isinstance(item.get("dataCollectFromUser"), dict) else {}
-        birth = dcu.get("birthDate")
-        idade = _idade_em_anos(birth)
-        if idade is not None:
-            idades.append(idade)
-            if idade < 18:
-                menores_de_18 += 1
-        dt = _extrair_data_atendimento(item)
+        nascimento = _data_nascimento(dcu.get("birthDate"))
+        if nascimento is not None:
+            self.nascimentos[nascimento] += 1
+        dt = _extrair_data_atendimento(item, self._created_parser)
         if dt:
             if _esta_fora_do_horario(dt):
-                fora_do_horario_count += 1
-            atendimentos_por_hora[dt.strftime("%H:00")] += 1
-            volume_por_dia[dt.strftime("%Y-%m-%d")] += 1
-            cohort_por_dia[dt.strftime("%Y-%m-%d")] += 1
-
-    # Faixa etária: buckets
-    faixa_etaria = {"0-17": 0, "18-24": 0, "25-34": 0, "35-44": 0, "45-54": 0, "55+": 0}
-    for i in idades:
-        if i < 18:
-            faixa_etaria["0-17"] += 1
-        elif i <= 24:
-            faixa_etaria["18-24"] += 1
-        elif i <= 34:
-            faixa_etaria["25-34"] += 1
-        elif i <= 44:
-            faixa_etaria["35-44"] += 1
-        elif i <= 54:
-            faixa_etaria["45-54"] += 1
-        else:
-            faixa_etaria["55+"] += 1
-
-    # Percentuais (quando total > 0)
-    percentual_menores_18 = round((menores_de_18 / total_conversas * 100), 2) if total_conversas else 0
-    fora_do_horario_percent = round((fora_do_horario_count / total_conversas * 100), 2) if total_conversas else 0
-
-    # Distribuição por estado: chave = nome completo (evita siglas corrompidas para o cliente)
-    distribuicao_nomes = {_sigla_para_nome_estado(uf): count for uf, count in distribuicao_por_estado.items()}
-    distribuicao_nomes = dict(sorted(distribuicao_nomes.items()))
+                self.fora_do_horario_count += 1
+            self.atendimentos_por_hora[_HORAS[dt.hour]] += 1
+            dia = _chave_dia(dt)
+            self.volume_por_dia[dia] += 1
+            self.cohort_por_dia[dia] += 1
+
+    def merge(self, other: "VisaoGeralAccumulator") -> "VisaoGeralAccumulator":
+        """Soma os contadores de outro acumulador neste. Retorna self."""
+        self.total_conversas += other.total_conversas
+        self.mensagens_lia += other.mensagens_lia
+        self.fora_do_horario_count += other.fora_do_horario_count
+        for mine, theirs in (
+            (self.distribuicao_por_estado, other.distribuicao_por_estado),
+            (self.nascimentos, other.nascimentos),
+            (self.atendimentos_por_hora, other.atendimentos_por_hora),
+            (self.volume_por_dia, other.volume_por_dia),
+            (self.cohort_por_dia, other.cohort_por_dia),
+        ):
+            for key, count in theirs.items():
+                mine[key] += count
+        return self
+
+    def to_dict(self) -> dict:
+        """Estado parcial serializável em JSON (para persistir e combinar depois)."""
+        return {
+            "total_conversas": self.total_conversas,
+            "mensagens_lia": self.mensagens_lia,
+            "distribuicao_por_estado": dict(self.distribuicao_por_estado),
+            "nascimentos": dict(self.nascimentos),
+            "fora_do_horario_count": self.fora_do_horario_count,
+            "atendimentos_por_hora": dict(self.atendimentos_por_hora),
+            "volume_por_dia": dict(self.volume_por_dia),
+            "cohort_por_dia": dict(self.cohort_por_dia),
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "VisaoGeralAccumulator":
+        """Reconstrói um acumulador a partir de to_dict()."""
+        acc = cls()
+        acc.total_conversas = int(state.get("total_conversas", 0))
+        acc.mensagens_lia = int(state.get("mensagens_lia", 0))
+        acc.fora_do_horario_count = int(state.get("fora_do_horario_count", 0))
+        for name in ("distribuicao_por_estado", "nascimentos", "atendimentos_por_hora", "volume_por_dia", "cohort_por_dia"):
+            getattr(acc, name).update(state.get(name) or {})
+        return acc
+
+    def faixas_etarias(self, hoje: datetime) -> dict[str, int]:
+        """Conversas por faixa etária (FAIXAS_ETARIAS), com a idade de cada data de nascimento na data hoje."""
+        faixa_etaria = dict.fromkeys(FAIXAS_ETARIAS, 0)
+        for nascimento, count in self.nascimentos.items():
+            i = _idade_na_data(nascimento, hoje)
+            if i is None:
+                continue
+            if i < 18:
+                faixa_etaria["0-17"] += count
+            elif i <= 24:
+                faixa_etaria["18-24"] += count
+            elif i <= 34:
+                faixa_etaria["25-34"] += count
+            elif i <= 44:
+                faixa_etaria["35-44"] += count
+            elif i <= 54:
+                faixa_etaria["45-54"] += count
+            else:
+                faixa_etaria["55+"] += count
+        return faixa_etaria
+
+    def result(self, hoje: datetime | None = None, faixa_etaria: dict[str, int] | None = None) -> dict:
+        """
+        Monta o payload da Visão Geral a partir dos contadores acumulados.
+        hoje: data de referência para as idades (uma só para o cálculo inteiro); padrão agora em UTC.
+        faixa_etaria: contagem por faixa já calculada na mesma data hoje (ex.: pela tabela colunar); padrão faixas_etarias(hoje).
+        """
+        total_conversas = self.total_conversas
+
+        # Faixa etária: buckets (idade na data de hoje)
+        if hoje is None:
+            hoje = datetime.now(timezone.utc)
+        if faixa_etaria is None:
+            faixa_etaria = self.faixas_etarias(hoje)
+        menores_de_18 = faixa_etaria["0-17"]
+
+        # Percentuais (quando total > 0)
+        percentual_menores_18 = round((menores_de_18 / total_conversas * 100), 2) if total_conversas else 0
+        fora_do_horario_percent = round((self.fora_do_horario_count / total_conversas * 100), 2) if total_conversas else 0
+
+        # Distribuição por estado: chave = nome completo (evita siglas corrompidas para o cliente)
+        distribuicao_nomes = {_sigla_para_nome_estado(uf): count for uf, count in self.distribuicao_por_estado.items()}
+        distribuicao_nomes = dict(sorted(distribuicao_nomes.items()))
+
+        return {
+            "total_conversas": total_conversas,
+            "mensagens_lia": self.mensagens_lia,
+            "distribuicao_por_estado": distribuicao_nomes,
+            "faixa_etaria": faixa_etaria,
+            "menores_de_18": menores_de_18,
+            "percentual_menores_18": percentual_menores_18,
+            "fora_do_horario_count": self.fora_do_horario_count,
+            "fora_do_horario_percent": fora_do_horario_percent,
+            "atendimentos_por_hora": dict(sorted(self.atendimentos_por_hora.items())),
+            "volume_conversas_por_dia": dict(sorted(self.volume_por_dia.items())),
+            "cohort_por_dia": dict(sorted(self.cohort_por_dia.items())),
+            # Campos que exigem CSV ou heurísticas; deixar indicado para o front
+            "compras_confirmadas": None,
+            "ticket_medio": None,
+            "leads_qualificados": None,
+            "agendamentos": None,
+            "taxa_conversao": None,
+            "efetividade_lia": None,
+        }
+
+
+def build_visao_geral(optimized: dict, hoje: datetime | None = None) -> dict:
+    """
+    A partir do JSON otimizado do report, monta o payload da página Visão Geral.
+    Inclui totais, distribuição por estado, faixa etária, menores de 18, atendimentos por hora, etc.
+    Campos que dependem de CSV ou heurísticas complexas ficam null/zero com indicação.
+    hoje: data de referência para as idades (padrão: agora em UTC).
+    As contagens são feitas sobre a tabela colunar dos campos usados (dashboard_columnar), com o mesmo
+    resultado de somar as conversas uma a uma num VisaoGeralAccumulator.
+    """
+    # Import local: dashboard_columnar usa os helpers deste módulo
+    from src.dashboard_columnar import ConversationTable
 
-    return {
-        "total_conversas": total_conversas,
-        "mensagens_lia": mensagens_lia,
-        "distribuicao_por_estado": distribuicao_nomes,
-        "faixa_etaria": faixa_etaria,
-        "menores_de_18": menores_de_18,
-        "percentual_menores_18": percentual_menores_18,
-        "fora_do_horario_count": fora_do_horario_count,
-        "fora_do_horario_percent": fora_do_horario_percent,
-        "atendimentos_por_hora": dict(sorted(atendimentos_por_hora.items())),
-        "volume_conversas_por_dia": dict(sorted(volume_por_dia.items())),
-        "cohort_por_dia": dict(sorted(cohort_por_dia.items())),
-        # Campos que exigem CSV ou heurísticas; deixar indicado para o front
-        "compras_confirmadas": None,
-        "ticket_medio": None,
-        "leads_qualificados": None,
-        "agendamentos": None,
-        "taxa_conversao": None,
-        "efetividade_lia": None,
-    }
+    return ConversationTable.from_optimized(optimized).visao_geral(hoje)
 
 
 def _variacao_percent(atual: int | float, anterior: int | float) -> float | None:
@@ -263,14 +436,19 @@ def build_comparativo_mes_anterior(visao_atual: dict, visao_anterior: dict) -> d
     return out
 
 
+def dashboard_payload_from_visao_geral(visao_geral: dict) -> dict:
+    """Monta o payload do dashboard a partir de uma visao_geral já calculada (ex.: pelo pipeline em streaming)."""
+    return {
+        "visao_geral": visao_geral,
+    }
+
+
 def build_dashboard_payload(optimized: dict) -> dict:
     """
     Retorna o payload completo do dashboard: uma chave por "página".
     O front chama uma única API e aninha por tela.
     """
-    return {
-        "visao_geral": build_visao_geral(optimized),
-    }
+    return dashboard_payload_from_visao_geral(build_visao_geral(optimized))
 
 
 if __name__ == "__main__":
@@ -289,7 +467,7 @@ if __name__ == "__main__":
     sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
     parser = argparse.ArgumentParser(description="Calcula métricas do dashboard a partir do JSON otimizado.")
-    parser.add_argument("--file", type=str, default=None, help="Caminho para um arquivo optimized_*.json (opcional).")
+    parser.add_argument("--file", type=str, default=None, help="Caminho para um arquivo optimized_*.json, .json.gz ou .json.xz (opcional).")
     parser.add_argument("--endpoint", type=str, default="report_lia", help="Chave do endpoint quando não usa --file.")
     args = parser.parse_args()
 
@@ -298,8 +476,9 @@ if __name__ == "__main__":
         if not path.exists():
             print(f"Arquivo não encontrado: {path}", file=sys.stderr)
             sys.exit(1)
-        with open(path, encoding="utf-8") as f:
-            optimized = json.load(f)
+        from src.storage import load_json
+
+        optimized = load_json(path)
         print(f"# Carregado: {path}", file=sys.stderr)
     else:
         from src.compare_report import load_raw_and_optimized
@@ -0,0 +1,189 @@
+"""
+view=full em streaming: projeção de campos (fields=), paginação de "data" (offset/limit ou cursor) e corpo
+serializado item a item por um gerador, sem montar o JSON inteiro em memória.
+  fields=_id,createdAt,dataCollectFromUser.state   mantém só esses campos de cada conversa (caminhos com ".")
+  fields=-Full Conversation,-dataCollectFromUser.email   remove esses campos (prefixo "-")
+  offset=200&limit=100   ou   cursor=<next_cursor da página anterior>&limit=100
+O corpo é {<campos do topo do relatório>, "pagination": {...}, "data": [...]}; "pagination" traz offset, limit,
+total, returned, next_offset e next_cursor (null na última página). Com Accept-Encoding, os pedaços saem
+comprimidos (gzip; br com o pacote brotli) conforme são gerados.
+Responsabilidade: serialização incremental da visão completa; usado pelo wrapper_server.
+"""
+import base64
+import zlib
+from typing import Any, Iterable, Iterator
+
+from src.config import RESPONSE_BROTLI_QUALITY, RESPONSE_GZIP_LEVEL
+from src.responses import brotli, render_json
+
+# Parâmetros da query que ativam o view=full em streaming
+STREAM_PARAMS = ("fields", "offset", "limit", "cursor")
+# Bytes acumulados antes de enviar um pedaço
+CHUNK_BYTES = 64 * 1024
+
+
+class Projection:
+    """Campos a manter (inclusão) e/ou remover (exclusão) de cada conversa, a partir de fields=."""
+
+    def __init__(self, spec: str | None):
+        self.include: dict = {}
+        self.exclude: dict = {}
+        for part in (spec or "").split(","):
+            part = part.strip()
+            if not part:
+                continue
+            tree = self.exclude if part.startswith("-") else self.include
+            path = [p for p in part.lstrip("-").split(".") if p]
+            for key in path[:-1]:
+                node = tree.get(key)
+                if node is True:
+                    break
+                tree = tree.setdefault(key, {})
+            else:
+                if path:
+                    tree[path[-1]] = True
+
+    def __bool__(self) -> bool:
+        return bool(self.include or self.exclude)
+
+    def apply(self, item: Any) -> Any:
+        """Conversa com a projeção aplicada (a original não é alterada)."""
+        if self.include:
+            item = _keep(item, self.include)
+        if self.exclude:
+            item = _drop(item, self.exclude)
+        return item
+
+
+def _keep(value: Any, tree: dict) -> Any:
+    """Mantém só os caminhos de tree (True = valor inteiro); listas aplicam a cada elemento."""
+    if isinstance(value, list):
+        return [_keep(v, tree) for v in value]
+    if not isinstance(value, dict):
+        return value
+    out = {}
+    for key, sub in value.items():
+        node = tree.get(key)
+        if node is True:
+            out[key] = sub
+        elif node is not None:
+            out[key] = _keep(sub, node)
+    return out
+
+
+def _drop(value: Any, tree: dict) -> Any:
+    """Remove os caminhos de tree (True = chave inteira); listas aplicam a cada elemento."""
+    if isinstance(value, list):
+        return [_drop(v, tree) for v in value]
+    if not isinstance(value, dict):
+        return value
+    out = {}
+    for key, sub in value.items():
+        node = tree.get(key)
+        if node is True:
+            continue
+        out[key] = _drop(sub, node) if node is not None else sub
+    return out
+
+
+def encode_cursor(offset: int) -> str:
+    """Cursor opaco da próxima página."""
+    return base64.urlsafe_b64encode(f"o:{offset}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Offset de um cursor de encode_cursor. ValueError se inválido."""
+    try:
+        text = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("cursor inválido") from e
+    prefix, _, offset = text.partition(":")
+    if prefix != "o" or not offset.isdigit():
+        raise ValueError("cursor inválido")
+    return int(offset)
+
+
+def parse_page(query: dict) -> tuple[int, int | None]:
+    """(offset, limit) de offset/cursor e limit da query; limit None = até o fim. ValueError se inválidos."""
+    if query.get("cursor"):
+        offset = decode_cursor(query["cursor"])
+    else:
+        offset = int(query.get("offset") or 0)
+    limit = int(query["limit"]) if query.get("limit") not in (None, "") else None
+    if offset < 0:
+        raise ValueError("offset não pode ser negativo")
+    if limit is not None and limit <= 0:
+        raise ValueError("limit deve ser maior que zero")
+    return offset, limit
+
+
+def pagination(total: int, offset: int, limit: int | None) -> dict:
+    """Bloco "pagination" da resposta."""
+    returned = max(0, min(total, offset + limit if limit is not None else total) - offset)
+    # Página vazia nunca aponta para a seguinte (o cursor levaria à mesma página)
+    next_offset = offset + returned if returned and offset + returned < total else None
+    return {
+        "offset": offset,
+        "limit": limit,
+        "total": total,
+        "returned": returned,
+        "next_offset": next_offset,
+        "next_cursor": encode_cursor(next_offset) if next_offset is not None else None,
+    }
+
+
+class _Compressor:
+    """Compressão incremental (gzip ou br) com flush a cada pedaço, para o cliente receber os dados já."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=RESPONSE_BROTLI_QUALITY)
+        else:
+            self._gz = zlib.compressobj(RESPONSE_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._br.process(data) + self._br.flush()
+        return self._gz.compress(data) + self._gz.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._br.finish()
+        return self._gz.flush()
+
+
+def stream_full_view(
+    meta: dict,
+    items: Iterable[Any],
+    page: dict,
+    projection: Projection | None = None,
+    encoding: str | None = None,
+) -> Iterator[bytes]:
+    """
+    Gera o corpo em pedaços de ~CHUNK_BYTES: campos do topo, "pagination" e os itens da página um a um.
+    Itens em bytes já são JSON serializado (ex.: direto do store) e só são copiados quando não há projeção.
+    """
+    compressor = _Compressor(encoding) if encoding else None
+    head = {k: v for k, v in meta.items() if k not in ("data", "pagination")}
+    head["pagination"] = page
+    buffer = bytearray(render_json(head)[:-1])
+    buffer += b',"data":[' if head else b'"data":['
+    first = True
+    for item in items:
+        if isinstance(item, (bytes, bytearray)):
+            encoded = item
+        else:
+            encoded = render_json(projection.apply(item) if projection else item)
+        if not first:
+            buffer += b","
+        buffer += encoded
+        first = False
+        if len(buffer) >= CHUNK_BYTES:
+            yield compressor.chunk(bytes(buffer)) if compressor else bytes(buffer)
+            buffer.clear()
+    buffer += b"]}"
+    if compressor:
+        yield compressor.chunk(bytes(buffer)) + compressor.finish()
+    else:
+        yield bytes(buffer)
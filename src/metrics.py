@@ -0,0 +1,272 @@
+"""
+Métricas do pipeline do wrapper: latência por etapa, tamanhos de payload e status da API real, por endpoint.
+Cada série é um histograma com buckets fixos (formato Prometheus) e uma janela das últimas amostras,
+usada para os percentis p50/p95/p99 do resumo em JSON.
+Etapas medidas: upstream, parse, save_raw, optimize, save_optimized, comparison, dashboard, shards, stream,
+previous_month, store_sync, store_load, save_dashboard, render, save_snapshot, compress, prefetch (recálculo do
+agendador) e request (a requisição inteira, inclusive HITs do cache).
+As etapas medidas dentro de request_timings() também são anotadas na requisição corrente (contextvar, que
+acompanha tasks e threadpool) para o header Server-Timing de cada resposta do /wrapper.
+Responsabilidade: instrumentação para capacity planning; exposta pelo wrapper_server em /metrics (texto Prometheus) e /metrics/summary (JSON).
+"""
+import math
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Buckets (limite superior inclusivo) por métrica
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+_BYTES_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9)
+_COUNT_BUCKETS = (1, 10, 100, 1e3, 1e4, 1e5, 1e6)
+
+# nome -> (ajuda, nome do label que varia além de endpoint, buckets)
+HISTOGRAMS = {
+    "wrapper_stage_duration_seconds": ("Latência de cada etapa do pipeline do wrapper", "stage", _LATENCY_BUCKETS),
+    "wrapper_payload_bytes": ("Tamanho dos payloads (upstream = corpo da API real, response = corpo devolvido)", "kind", _BYTES_BUCKETS),
+    "wrapper_payload_items": ("Conversas por relatório", None, _COUNT_BUCKETS),
+    "wrapper_payload_messages": ("Mensagens (Full Conversation) por relatório", None, _COUNT_BUCKETS),
+}
+UPSTREAM_STATUS = "wrapper_upstream_responses_total"
+# Eventos da política de chamadas à API real: retry, hedge (segunda chamada disparada), hedge_win (a segunda
+# respondeu primeiro) e deadline_exceeded
+UPSTREAM_EVENTS = "wrapper_upstream_events_total"
+# Amostras recentes guardadas por série para os percentis
+SAMPLE_WINDOW = 2048
+
+# Etapas (nome, segundos) da requisição em andamento; None fora de request_timings()
+_request_timings: ContextVar[list | None] = ContextVar("wrapper_request_timings", default=None)
+
+
+class _Histogram:
+    """Contagem por bucket, soma, total e janela das últimas amostras."""
+
+    __slots__ = ("buckets", "counts", "sum", "count", "samples")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # último = +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.samples: deque = deque(maxlen=SAMPLE_WINDOW)
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+        self.samples.append(value)
+
+
+def _percentile(sorted_values: list, p: float) -> float | None:
+    """Percentil por posição mais próxima (nearest-rank) de valores já ordenados."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metrics:
+    """Registro de métricas em memória, seguro entre threads (requisições, threadpool e fila de comparação)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (métrica, endpoint, valor do label extra) -> histograma
+        self._histograms: dict[tuple[str, str, str | None], _Histogram] = {}
+        self._status: Counter = Counter()
+        self._events: Counter = Counter()
+
+    def observe(self, metric: str, endpoint_key: str, value: float, label: str | None = None) -> None:
+        """Registra uma amostra na série (metric, endpoint, label)."""
+        key = (metric, endpoint_key, label)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = _Histogram(HISTOGRAMS[metric][2])
+            hist.observe(value)
+
+    def observe_stage(self, stage: str, endpoint_key: str, seconds: float) -> None:
+        self.observe("wrapper_stage_duration_seconds", endpoint_key, seconds, stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((stage, seconds))
+
+    def observe_payload(self, endpoint_key: str, items: int | None = None, messages: int | None = None) -> None:
+        """Conversas e mensagens de um relatório."""
+        if items is not None:
+            self.observe("wrapper_payload_items", endpoint_key, items)
+        if messages is not None:
+            self.observe("wrapper_payload_messages", endpoint_key, messages)
+
+    def observe_report(self, endpoint_key: str, report: dict) -> None:
+        """Conta conversas ("data") e mensagens ("Full Conversation") de um relatório bruto ou otimizado."""
+        data = report.get("data") if isinstance(report, dict) else None
+        if not isinstance(data, list):
+            return
+        messages = 0
+        for item in data:
+            conversation = item.get("Full Conversation") if isinstance(item, dict) else None
+            if isinstance(conversation, list):
+                messages += len(conversation)
+        self.observe_payload(endpoint_key, items=len(data), messages=messages)
+
+    def observe_bytes(self, endpoint_key: str, kind: str, size: int) -> None:
+        self.observe("wrapper_payload_bytes", endpoint_key, size, kind)
+
+    def count_status(self, endpoint_key: str, status: int | str) -> None:
+        """Conta uma resposta da API real pelo status HTTP ("error" = sem resposta: timeout, conexão)."""
+        with self._lock:
+            self._status[(endpoint_key, str(status))] += 1
+
+    def count_event(self, endpoint_key: str, event: str) -> None:
+        """Conta um evento da política de chamadas à API real (retry, hedge, hedge_win, deadline_exceeded)."""
+        with self._lock:
+            self._events[(endpoint_key, event)] += 1
+
+    def stage_percentile(self, stage: str, endpoint_key: str, q: float, min_samples: int = 1) -> float | None:
+        """Percentil q da etapa nas amostras recentes do endpoint; None com menos de min_samples amostras."""
+        with self._lock:
+            hist = self._histograms.get(("wrapper_stage_duration_seconds", endpoint_key, stage))
+            samples = list(hist.samples) if hist is not None else []
+        if len(samples) < max(min_samples, 1):
+            return None
+        return _percentile(sorted(samples), q)
+
+    @contextmanager
+    def timed(self, stage: str, endpoint_key: str):
+        """Mede o bloco como uma amostra da etapa (também quando o bloco levanta exceção)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(stage, endpoint_key, time.perf_counter() - start)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._status.clear()
+            self._events.clear()
+
+    def _snapshot(self) -> tuple[list, list]:
+        """Cópia consistente das séries (para formatar fora do lock)."""
+        with self._lock:
+            hists = [
+                (key, hist.buckets, list(hist.counts), hist.sum, hist.count, list(hist.samples))
+                for key, hist in sorted(self._histograms.items(), key=lambda kv: tuple(str(k) for k in kv[0]))
+            ]
+            status = sorted(self._status.items())
+            events = sorted(self._events.items())
+        return hists, status, events
+
+    def prometheus_text(self) -> str:
+        """Todas as séries no formato de exposição de texto do Prometheus (0.0.4)."""
+        hists, status, events = self._snapshot()
+        lines = []
+        for metric, (help_text, label_name, _) in HISTOGRAMS.items():
+            series = [h for h in hists if h[0][0] == metric]
+            if not series:
+                continue
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} histogram")
+            for (_, endpoint_key, label), buckets, counts, total, count, _samples in series:
+                labels = f'endpoint="{_escape(endpoint_key)}"'
+                if label_name:
+                    labels += f',{label_name}="{_escape(label)}"'
+                cumulative = 0
+                for bound, n in zip(buckets + (math.inf,), counts):
+                    cumulative += n
+                    lines.append(f'{metric}_bucket{{{labels},le="{_fmt(bound)}"}} {cumulative}')
+                lines.append(f"{metric}_sum{{{labels}}} {_fmt(total)}")
+                lines.append(f"{metric}_count{{{labels}}} {count}")
+        if status:
+            lines.append(f"# HELP {UPSTREAM_STATUS} Respostas da API real por status HTTP")
+            lines.append(f"# TYPE {UPSTREAM_STATUS} counter")
+            for (endpoint_key, code), n in status:
+                lines.append(f'{UPSTREAM_STATUS}{{endpoint="{_escape(endpoint_key)}",status="{_escape(code)}"}} {n}')
+        if events:
+            lines.append(f"# HELP {UPSTREAM_EVENTS} Retries, hedges e prazos esgotados nas chamadas à API real")
+            lines.append(f"# TYPE {UPSTREAM_EVENTS} counter")
+            for (endpoint_key, event), n in events:
+                lines.append(f'{UPSTREAM_EVENTS}{{endpoint="{_escape(endpoint_key)}",event="{_escape(event)}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> dict:
+        """
+        Resumo em JSON por endpoint: para cada etapa/tamanho, count, média e p50/p95/p99
+        (percentis sobre as últimas SAMPLE_WINDOW amostras), contagem de status e eventos (retries, hedges) da API real.
+        """
+        hists, status, events = self._snapshot()
+        out: dict = {}
+        for (metric, endpoint_key, label), _buckets, _counts, total, count, samples in hists:
+            ordered = sorted(samples)
+            section = metric.replace("wrapper_", "", 1)
+            entry = {
+                "count": count,
+                "mean": round(total / count, 6) if count else None,
+                "p50": _percentile(ordered, 50),
+                "p95": _percentile(ordered, 95),
+                "p99": _percentile(ordered, 99),
+                "max": ordered[-1] if ordered else None,
+            }
+            target = out.setdefault(endpoint_key, {}).setdefault(section, {})
+            if label is None:
+                target.update(entry)
+            else:
+                target[label] = entry
+        for (endpoint_key, code), n in status:
+            out.setdefault(endpoint_key, {}).setdefault("upstream_status", {})[code] = n
+        for (endpoint_key, event), n in events:
+            out.setdefault(endpoint_key, {}).setdefault("upstream_events", {})[event] = n
+        return out
+
+
+@contextmanager
+def request_timings():
+    """
+    Coleta as etapas medidas durante o bloco (inclusive em tasks e threads disparadas dele) numa lista
+    de (etapa, segundos); a lista é devolvida pelo with e formatada por server_timing.
+    """
+    timings: list = []
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+def server_timing(timings: list) -> str:
+    """
+    Valor do header Server-Timing: uma entrada por etapa, na ordem em que terminou a primeira vez, com a soma
+    das durações em ms (etapas repetidas, ex.: upstream de um período dividido, levam desc com a contagem).
+    """
+    totals: dict[str, list] = {}
+    for stage, seconds in timings:
+        entry = totals.setdefault(stage, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+    parts = []
+    for stage, (seconds, count) in totals.items():
+        part = f"{stage};dur={seconds * 1000:.1f}"
+        if count > 1:
+            part += f';desc="{count}x"'
+        parts.append(part)
+    return ", ".join(parts)
+
+
+# Instância única (wrapper_server, api_client, comparison_queue)
+metrics = Metrics()
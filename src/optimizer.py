@@ -5,6 +5,9 @@ Responsabilidade: transformar a resposta bruta em um payload menor e padronizado
 """
 from copy import deepcopy
 
+# Modos de optimize_report_response (ver docstring)
+OPTIMIZE_MODES = ("share", "inplace", "copy")
+
 # Mapeamento pt -> en para dataCollectFromUser (manter um conjunto canônico em inglês)
 _DATA_COLLECT_PT_TO_EN = {
     "nome completo": "name",
@@ -52,21 +55,38 @@ def _normalize_sender(sender_value: list | dict) -> str:
     return "user"
 
 
-def _optimize_conversation_item(item: dict, agent_at_root: dict | None) -> dict:
+def _optimize_conversation_item(
+    item: dict,
+    agent_at_root: dict | None,
+    mode: str = "copy",
+) -> dict:
     """
     Otimiza um item do array data: consolida dataCollectFromUser,
     substitui sender em Full Conversation, remove aiAgent e agentId vazio.
     agent_at_root: dict que será preenchido com o primeiro aiAgent encontrado.
+    mode: "copy" (deepcopy do item), "share" (copia só os nós alterados) ou "inplace" (altera o próprio item).
     """
-    item = deepcopy(item)
+    if mode == "copy":
+        item = deepcopy(item)
+    elif mode == "share":
+        item = dict(item)
     if "dataCollectFromUser" in item and item["dataCollectFromUser"]:
         item["dataCollectFromUser"] = _consolidate_data_collect_from_user(
             item["dataCollectFromUser"]
         )
     if "Full Conversation" in item and isinstance(item["Full Conversation"], list):
-        for entry in item["Full Conversation"]:
-            if isinstance(entry, dict) and "sender" in entry:
-                entry["sender"] = _normalize_sender(entry["sender"])
+        if mode == "share":
+            # Lista nova; só as mensagens com sender viram dicts novos (texto e demais campos compartilhados)
+            item["Full Conversation"] = [
+                {**entry, "sender": _normalize_sender(entry["sender"])}
+                if isinstance(entry, dict) and "sender" in entry
+                else entry
+                for entry in item["Full Conversation"]
+            ]
+        else:
+            for entry in item["Full Conversation"]:
+                if isinstance(entry, dict) and "sender" in entry:
+                    entry["sender"] = _normalize_sender(entry["sender"])
     if agent_at_root is not None and "aiAgent" in item and not agent_at_root:
         agent_at_root.update(item.get("aiAgent") or {})
     item.pop("aiAgent", None)
@@ -75,26 +95,45 @@ def _optimize_conversation_item(item: dict, agent_at_root: dict | None) -> dict:
     return item
 
 
-def optimize_report_response(data: dict) -> dict:
+def optimize_report_response(data: dict, mode: str = "share") -> dict:
     """
     Recebe o JSON da resposta da API de report (statusCode, msg, data, ...).
-    Retorna um novo dict otimizado com meta.agent no topo e data processado.
+    Retorna um dict otimizado com meta.agent no topo e data processado, numa única passada pelos itens.
+    mode:
+      - "share" (padrão): dict novo que compartilha com a entrada os nós não alterados (sem deepcopy);
+        a entrada não é modificada, mas o resultado não deve ser alterado enquanto a entrada estiver em uso.
+      - "inplace": altera e devolve o próprio dict de entrada (para quem é dono do bruto e não precisa mais dele).
+      - "copy": comportamento anterior, resultado totalmente independente (deepcopy).
+    O conteúdo e a ordem das chaves do resultado são os mesmos nos três modos.
     """
+    if mode not in OPTIMIZE_MODES:
+        raise ValueError(f"Modo de otimização inválido: {mode}. Use um de {OPTIMIZE_MODES}")
     if not data or not isinstance(data, dict):
         return data
-    result = deepcopy(data)
-    result.pop("data", None)
+    items = data.get("data")
+    if mode == "inplace":
+        result = data
+        result.pop("data", None)
+    elif mode == "share":
+        result = {k: v for k, v in data.items() if k != "data"}
+    else:
+        result = deepcopy(data)
+        result.pop("data", None)
     # meta.agent: único no topo
     meta_agent = {}
-    if "data" in data and isinstance(data["data"], list):
-        optimized_data = []
-        for item in data["data"]:
-            optimized_data.append(
-                _optimize_conversation_item(item, meta_agent)
-            )
+    if isinstance(items, list):
+        optimized_data = items if mode == "inplace" else []
+        for i, item in enumerate(items):
+            optimized_item = _optimize_conversation_item(item, meta_agent, mode=mode)
+            if mode == "inplace":
+                optimized_data[i] = optimized_item
+            else:
+                optimized_data.append(optimized_item)
         result["data"] = optimized_data
     if meta_agent:
         if "meta" not in result:
             result["meta"] = {}
+        elif mode == "share":
+            result["meta"] = dict(result["meta"])
         result["meta"]["agent"] = meta_agent
     return result
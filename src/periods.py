@@ -0,0 +1,16 @@
+"""
+Períodos from/to das consultas: leitura dos params de data usada por quem divide ou agrega por dia
+(range_split, dashboard_shards, conversation_store via wrapper_server).
+Responsabilidade: helpers de período sem dependência de busca, cache ou dashboard.
+"""
+from datetime import date
+
+
+def parse_range(params: dict) -> tuple[date, date] | None:
+    """Período from/to (YYYY-MM-DD, inclusivo) dos params; None se ausente ou inválido."""
+    try:
+        start = date.fromisoformat(str(params["from"]))
+        end = date.fromisoformat(str(params["to"]))
+    except (KeyError, ValueError):
+        return None
+    return (start, end) if start <= end else None
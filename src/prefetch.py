@@ -0,0 +1,197 @@
+"""
+Pré-cálculo periódico (prefetch) de consultas frequentes, para a primeira requisição do dia não pagar
+API real + optimize + dashboard: o agendador roda dentro do processo do servidor (iniciado por serve()) e
+recalcula cada preset configurado, enchendo o cache em memória (e o snapshot, em endpoints com
+stale-while-revalidate) que atende o /wrapper.
+Config (api_endpoints.json), por endpoint:
+  "prefetch": {"interval_seconds": 300, "presets": ["today", "month_to_date",
+               {"preset": "previous_month", "view": "dashboard"},
+               {"preset": "last_14_days", "compare": "previous_month"},
+               {"params": {"from": "2026-01-01", "to": "2026-03-31"}}]}
+Presets de período (datas em UTC, recalculadas a cada execução): today, yesterday, last_<N>_days, month_to_date,
+previous_month. Cada execução espera interval_seconds + jitter aleatório (WRAPPER_PREFETCH_JITTER_SECONDS), no
+máximo WRAPPER_PREFETCH_MAX_CONCURRENCY ao mesmo tempo; se a API real falhar, o endpoint fica sem prefetch por
+um intervalo que dobra a cada falha seguida (até WRAPPER_PREFETCH_MAX_BACKOFF_SECONDS).
+Para o resultado servir o /wrapper, cache_ttl_seconds do endpoint deve ser maior que interval_seconds.
+Responsabilidade: agenda dos presets e controle de erros; o cálculo em si é a função warm do wrapper_server.
+"""
+import asyncio
+import logging
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Awaitable, Callable
+
+from src.config import (
+    PREFETCH_ERROR_BACKOFF_SECONDS,
+    PREFETCH_INTERVAL_SECONDS,
+    PREFETCH_JITTER_SECONDS,
+    PREFETCH_MAX_BACKOFF_SECONDS,
+    PREFETCH_MAX_CONCURRENCY,
+    get_endpoint_config,
+    get_endpoint_setting,
+    load_endpoints,
+)
+
+logger = logging.getLogger(__name__)
+
+_LAST_N_DAYS = re.compile(r"last_([0-9]+)_days")
+
+# warm(endpoint_key, params, view_full, compare_previous_month): recalcula a consulta e grava no cache
+WarmFn = Callable[[str, dict, bool, bool], Awaitable[None]]
+
+
+def preset_range(preset: str, today: date | None = None) -> tuple[date, date]:
+    """Período (from, to) do preset. ValueError se o nome não for conhecido."""
+    today = today or datetime.now(timezone.utc).date()
+    if preset == "today":
+        return today, today
+    if preset == "yesterday":
+        yesterday = today - timedelta(days=1)
+        return yesterday, yesterday
+    if preset == "month_to_date":
+        return today.replace(day=1), today
+    if preset == "previous_month":
+        end = today.replace(day=1) - timedelta(days=1)
+        return end.replace(day=1), end
+    m = _LAST_N_DAYS.fullmatch(preset)
+    if m and int(m.group(1)) > 0:
+        return today - timedelta(days=int(m.group(1)) - 1), today
+    raise ValueError(f"preset de prefetch desconhecido: {preset}")
+
+
+@dataclass
+class PrefetchJob:
+    """Uma consulta a manter quente: endpoint, preset de período e/ou params fixos, visão e comparativo."""
+
+    endpoint_key: str
+    interval: float
+    preset: str | None = None
+    params: dict = field(default_factory=dict)
+    view_full: bool = False
+    compare_previous_month: bool = False
+
+    @property
+    def name(self) -> str:
+        return f"{self.endpoint_key}:{self.preset or 'params'}"
+
+    def query(self, default_params: dict) -> dict:
+        """Params da consulta como o /wrapper montaria (default_params + params do preset + from/to de hoje)."""
+        params = {**default_params, **self.params}
+        if self.preset:
+            start, end = preset_range(self.preset)
+            params["from"], params["to"] = start.isoformat(), end.isoformat()
+        return params
+
+
+def load_jobs() -> list[PrefetchJob]:
+    """Presets de "prefetch" de todos os endpoints do api_endpoints.json (presets inválidos são ignorados com aviso)."""
+    jobs = []
+    for endpoint_key in load_endpoints():
+        setting = get_endpoint_setting(endpoint_key, "prefetch", None)
+        if not isinstance(setting, dict):
+            continue
+        interval = float(setting.get("interval_seconds", PREFETCH_INTERVAL_SECONDS))
+        for spec in setting.get("presets") or []:
+            if isinstance(spec, str):
+                spec = {"preset": spec}
+            if not isinstance(spec, dict) or not (spec.get("preset") or spec.get("params")):
+                logger.warning("Preset de prefetch inválido em %s: %r", endpoint_key, spec)
+                continue
+            if spec.get("preset"):
+                try:
+                    preset_range(spec["preset"])
+                except ValueError as e:
+                    logger.warning("%s (%s)", e, endpoint_key)
+                    continue
+            jobs.append(
+                PrefetchJob(
+                    endpoint_key=endpoint_key,
+                    interval=max(interval, 1.0),
+                    preset=spec.get("preset"),
+                    params=dict(spec.get("params") or {}),
+                    view_full=spec.get("view") == "full",
+                    compare_previous_month=spec.get("compare") == "previous_month",
+                )
+            )
+    return jobs
+
+
+class PrefetchScheduler:
+    """Laço de prefetch por preset, com limite de concorrência, jitter e pausa por endpoint após erro da API real."""
+
+    def __init__(self):
+        # serve() liga; o lifespan do servidor só inicia o agendador quando autostart=True
+        self.autostart = False
+        self._tasks: list[asyncio.Task] = []
+        self._semaphore: asyncio.Semaphore | None = None
+        self._failures: dict[str, int] = {}
+        self._paused_until: dict[str, float] = {}
+        self.runs = 0
+        self.errors = 0
+        self.skipped = 0
+
+    def start(self, warm: WarmFn) -> int:
+        """Inicia um laço por preset no event loop atual. Retorna quantos presets foram agendados."""
+        jobs = load_jobs()
+        self._semaphore = asyncio.Semaphore(max(PREFETCH_MAX_CONCURRENCY, 1))
+        self._tasks = [asyncio.create_task(self._loop(job, warm)) for job in jobs]
+        if jobs:
+            logger.info("Prefetch: %d presets agendados (%s)", len(jobs), ", ".join(job.name for job in jobs))
+        return len(jobs)
+
+    async def stop(self) -> None:
+        """Cancela os laços (prefetch em andamento é interrompido)."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _loop(self, job: PrefetchJob, warm: WarmFn) -> None:
+        # Primeira execução espalhada no jitter, para os presets não irem todos juntos à API real
+        await asyncio.sleep(random.uniform(0, PREFETCH_JITTER_SECONDS))
+        while True:
+            await self.run_job(job, warm)
+            await asyncio.sleep(job.interval + random.uniform(0, PREFETCH_JITTER_SECONDS))
+
+    async def run_job(self, job: PrefetchJob, warm: WarmFn) -> bool:
+        """Executa um preset (se o endpoint não estiver em pausa por erro). Retorna True se recalculou."""
+        if time.monotonic() < self._paused_until.get(job.endpoint_key, 0.0):
+            self.skipped += 1
+            return False
+        default_params = (get_endpoint_config(job.endpoint_key) or {}).get("default_params", {})
+        async with self._semaphore:
+            # Outro preset do mesmo endpoint pode ter falhado enquanto este esperava a vez
+            if time.monotonic() < self._paused_until.get(job.endpoint_key, 0.0):
+                self.skipped += 1
+                return False
+            try:
+                await warm(job.endpoint_key, job.query(default_params), job.view_full, job.compare_previous_month)
+            except Exception as e:
+                failures = self._failures.get(job.endpoint_key, 0) + 1
+                self._failures[job.endpoint_key] = failures
+                pause = min(PREFETCH_ERROR_BACKOFF_SECONDS * 2 ** (failures - 1), PREFETCH_MAX_BACKOFF_SECONDS)
+                self._paused_until[job.endpoint_key] = time.monotonic() + pause
+                self.errors += 1
+                logger.warning("Prefetch %s falhou (%s); endpoint pausado por %.0fs", job.name, e, pause)
+                return False
+        self._failures.pop(job.endpoint_key, None)
+        self.runs += 1
+        return True
+
+    def stats(self) -> dict:
+        """Contadores para GET /stats."""
+        now = time.monotonic()
+        return {
+            "presets": len(self._tasks),
+            "runs": self.runs,
+            "errors": self.errors,
+            "skipped": self.skipped,
+            "paused_endpoints": sorted(k for k, until in self._paused_until.items() if until > now),
+        }
+
+
+# Instância única do processo (iniciada pelo lifespan do wrapper_server quando serve() liga autostart)
+prefetch_scheduler = PrefetchScheduler()
@@ -0,0 +1,74 @@
+"""
+Profiling sob demanda de uma requisição do /wrapper (?profile=1, só com WRAPPER_PROFILING_ENABLED).
+A requisição roda sob cProfile e gera, na pasta do endpoint (ao lado de comparison_*), profile_<slug>_<hora>.prof
+(abrir com snakeviz, pstats ou python -m pstats) e profile_<slug>_<hora>.txt com as top-N funções por tempo acumulado.
+cProfile só enxerga a thread onde foi ativado: durante o profiling as etapas síncronas do pipeline (run_sync)
+rodam no próprio event loop em vez do threadpool, e só uma requisição é perfilada por vez. O event loop fica
+bloqueado nessas etapas, por isso o modo é opt-in e desligado por padrão.
+Responsabilidade: executar e salvar o profile de uma chamada lenta; usado pelo wrapper_server.
+"""
+import asyncio
+import cProfile
+import io
+import pstats
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from fastapi.concurrency import run_in_threadpool
+
+from src.config import PROFILING_TOP_N, get_endpoint_slug
+from src.storage import get_cache_folder
+
+# True enquanto a requisição corrente está sob profiling (etapas síncronas ficam no event loop)
+_profiling: ContextVar[bool] = ContextVar("wrapper_profiling", default=False)
+# Uma requisição perfilada por vez (cProfile ativo em uma única thread)
+_profile_lock: asyncio.Lock | None = None
+
+
+async def run_sync(fn: Callable, *args, **kwargs) -> Any:
+    """Executa uma etapa síncrona no threadpool; durante o profiling, direto no event loop (visível ao cProfile)."""
+    if _profiling.get():
+        return fn(*args, **kwargs)
+    return await run_in_threadpool(fn, *args, **kwargs)
+
+
+def profile_paths(endpoint_key: str) -> tuple[Path, Path]:
+    """Caminhos (.prof, .txt) de um novo profile na pasta do endpoint (hora com microssegundos: nomes únicos)."""
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    base = get_cache_folder(endpoint_key) / f"profile_{get_endpoint_slug(endpoint_key)}_{stamp}"
+    return base.with_suffix(".prof"), base.with_suffix(".txt")
+
+
+def _save(profiler: cProfile.Profile, endpoint_key: str, top_n: int) -> tuple[Path, Path]:
+    """Grava o .prof e o resumo em texto (top-N por tempo acumulado, depois por tempo próprio)."""
+    prof_path, txt_path = profile_paths(endpoint_key)
+    profiler.dump_stats(str(prof_path))
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out).strip_dirs()
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top_n)
+    stats.sort_stats(pstats.SortKey.TIME).print_stats(top_n)
+    txt_path.write_text(out.getvalue(), encoding="utf-8")
+    return prof_path, txt_path
+
+
+async def profile_call(endpoint_key: str, fn: Callable[[], Awaitable[Any]], top_n: int | None = None) -> tuple[Any, Path]:
+    """
+    Executa fn() sob cProfile e salva o profile na pasta do endpoint, também quando fn levanta exceção.
+    Retorna (resultado, caminho do resumo .txt). Requisições perfiladas simultâneas aguardam a vez.
+    """
+    global _profile_lock
+    if _profile_lock is None:
+        _profile_lock = asyncio.Lock()
+    async with _profile_lock:
+        profiler = cProfile.Profile()
+        token = _profiling.set(True)
+        profiler.enable()
+        try:
+            result = await fn()
+        finally:
+            profiler.disable()
+            _profiling.reset(token)
+            _, txt_path = await run_in_threadpool(_save, profiler, endpoint_key, top_n or PROFILING_TOP_N)
+    return result, txt_path
@@ -0,0 +1,91 @@
+"""
+Divisão automática de períodos longos (from/to) em sub-consultas à API real.
+Um trimestre ou um ano numa única chamada é lento, pode estourar o timeout e falha por inteiro; com
+"range_split" no endpoint, períodos acima do limite viram pedaços (dia, semana ou mês) buscados em paralelo
+(com limite de concorrência) e os arrays "data" são concatenados na ordem do período.
+A resposta combinada tem os campos do topo do primeiro pedaço e segue para optimizer/dashboard como uma só.
+Config (api_endpoints.json): "range_split": {"threshold_days": 31, "chunk": "week", "max_concurrency": 4}
+Responsabilidade: buscar o relatório de um período longo em partes; usado pelo wrapper_server.
+"""
+import asyncio
+from datetime import date, timedelta
+
+from src.api_client import fetch_json_async
+from src.config import get_endpoint_setting
+from src.periods import parse_range
+
+CHUNKS = ("day", "week", "month")
+_DEFAULTS = {"threshold_days": 31, "chunk": "week", "max_concurrency": 4}
+
+
+def split_settings(endpoint_key: str) -> dict | None:
+    """Configuração de divisão do endpoint ("range_split" no api_endpoints.json) com os padrões preenchidos; None se desligada."""
+    setting = get_endpoint_setting(endpoint_key, "range_split", None)
+    if not setting:
+        return None
+    settings = dict(_DEFAULTS)
+    if isinstance(setting, dict):
+        settings.update(setting)
+    if settings["chunk"] not in CHUNKS:
+        raise ValueError(f"range_split.chunk inválido para {endpoint_key}: {settings['chunk']!r} (use {', '.join(CHUNKS)})")
+    settings["threshold_days"] = int(settings["threshold_days"])
+    settings["max_concurrency"] = max(1, int(settings["max_concurrency"]))
+    return settings
+
+
+def split_range(start: date, end: date, chunk: str) -> list[tuple[date, date]]:
+    """
+    Divide [start, end] (inclusivo) em pedaços contíguos: por dia, semana (7 dias a partir de start)
+    ou mês de calendário (o primeiro e o último podem ser parciais).
+    """
+    parts = []
+    day = start
+    while day <= end:
+        if chunk == "day":
+            last = day
+        elif chunk == "week":
+            last = day + timedelta(days=6)
+        else:
+            next_month = (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+            last = next_month - timedelta(days=1)
+        last = min(last, end)
+        parts.append((day, last))
+        day = last + timedelta(days=1)
+    return parts
+
+
+def merge_responses(responses: list[dict]) -> dict:
+    """Junta as respostas dos pedaços: campos do topo do primeiro e "data" concatenado na ordem."""
+    if not responses:
+        return {}
+    data = []
+    for resp in responses:
+        items = resp.get("data")
+        if not isinstance(items, list):
+            raise ValueError("Resposta de um pedaço do período sem array 'data'; não é possível combinar")
+        data.extend(items)
+    merged = dict(responses[0])
+    merged["data"] = data
+    return merged
+
+
+async def fetch_report(endpoint_key: str, params: dict, timeout: float | None = None) -> dict:
+    """
+    Busca o relatório do período de params. Se o endpoint tem "range_split" e o período passa de
+    threshold_days, busca os pedaços em paralelo (no máximo max_concurrency ao mesmo tempo) e combina;
+    senão, uma única chamada (fetch_json_async). Falha de qualquer pedaço falha a consulta.
+    timeout é o prazo de cada chamada (padrão: deadline_seconds do endpoint, ver api_client).
+    """
+    settings = split_settings(endpoint_key)
+    period = parse_range(params) if settings else None
+    if period is None or (period[1] - period[0]).days + 1 <= settings["threshold_days"]:
+        return await fetch_json_async(endpoint_key, params=params, timeout=timeout)
+    sem = asyncio.Semaphore(settings["max_concurrency"])
+
+    async def fetch_part(part: tuple[date, date]) -> dict:
+        params_part = {**params, "from": part[0].isoformat(), "to": part[1].isoformat()}
+        async with sem:
+            return await fetch_json_async(endpoint_key, params=params_part, timeout=timeout)
+
+    responses = await asyncio.gather(*(fetch_part(part) for part in split_range(*period, settings["chunk"])))
+    return merge_responses(list(responses))
@@ -0,0 +1,249 @@
+"""
+Processamento em streaming do relatório da API real: parse incremental do corpo HTTP conforme chega.
+O parser devolve cada item do array "data" assim que ele termina de chegar; os demais campos do topo
+(statusCode, msg, meta, ...) são guardados à parte. Cada conversa passa pelo optimizer
+(_optimize_conversation_item), pelos acumuladores da Visão Geral e é gravada no arquivo otimizado do cache,
+então o pico de memória fica limitado a uma conversa (mais o buffer de rede), e não ao período inteiro.
+Responsabilidade: modo "streaming" do wrapper_server (endpoint com "streaming": true no api_endpoints.json).
+"""
+import codecs
+import json
+
+from src.config import get_endpoint_setting
+from src.dashboard_treatments import VisaoGeralAccumulator
+from src.optimizer import _optimize_conversation_item
+from src.storage import RawStreamWriter, StreamedReportWriter, cache_encoding, cache_file_path
+
+_WHITESPACE = " \t\n\r"
+
+# Estados do parser
+_START = "start"
+_KEY_OR_END = "key_or_end"
+_KEY = "key"
+_COLON = "colon"
+_VALUE = "value"
+_ITEMS_OPEN = "items_open"
+_ITEM_OR_END = "item_or_end"
+_ITEM = "item"
+_ITEM_SEP = "item_sep"
+_FIELD_SEP = "field_sep"
+_DONE = "done"
+
+
+def streaming_enabled(endpoint_key: str) -> bool:
+    """Endpoint processa a resposta em streaming? ("streaming": true no api_endpoints.json)."""
+    return bool(get_endpoint_setting(endpoint_key, "streaming", False))
+
+
+class ReportStreamParser:
+    """
+    Parser incremental de um objeto JSON no topo. feed(bytes) devolve os itens de items_key já completos;
+    os outros campos do topo ficam em self.fields (na ordem em que chegaram).
+    Valores são decodificados com json.JSONDecoder.raw_decode; se um valor ainda está incompleto,
+    espera o buffer dobrar antes de tentar de novo (evita reprocessar um item grande a cada pedaço).
+    """
+
+    def __init__(self, items_key: str = "data"):
+        self.items_key = items_key
+        self.fields: dict = {}
+        self.has_items = False
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._pos = 0
+        self._state = _START
+        self._key: str | None = None
+        self._retry_len = 0
+        self._eof = False
+
+    def feed(self, chunk: bytes) -> list:
+        """Acrescenta bytes e devolve os itens de items_key que ficaram completos."""
+        self._buf += self._utf8.decode(chunk)
+        if len(self._buf) - self._pos < self._retry_len:
+            return []
+        return self._parse()
+
+    def close(self) -> list:
+        """Fim do corpo: processa o que restou. ValueError se o JSON estiver incompleto ou inválido."""
+        self._buf += self._utf8.decode(b"", final=True)
+        self._eof = True
+        items = self._parse()
+        self._skip_ws()
+        if self._state != _DONE or self._pos < len(self._buf):
+            raise ValueError(f"JSON do relatório incompleto ou inválido (estado {self._state}, posição {self._pos})")
+        return items
+
+    def _skip_ws(self) -> None:
+        buf, pos = self._buf, self._pos
+        while pos < len(buf) and buf[pos] in _WHITESPACE:
+            pos += 1
+        self._pos = pos
+
+    def _expect(self, allowed: str) -> str | None:
+        """Próximo caractere não branco (consumido) se estiver em allowed; None se o buffer acabou."""
+        self._skip_ws()
+        if self._pos >= len(self._buf):
+            return None
+        ch = self._buf[self._pos]
+        if ch not in allowed:
+            raise ValueError(f"JSON do relatório inválido: esperado {allowed!r}, veio {ch!r} na posição {self._pos}")
+        self._pos += 1
+        return ch
+
+    def _decode_value(self):
+        """
+        Decodifica o valor na posição atual. Retorna (True, valor) ou (False, None) se ainda incompleto.
+        Um valor só é aceito se houver algum caractere depois dele (ou EOF): números como 12 podem continuar no próximo pedaço.
+        """
+        self._skip_ws()
+        try:
+            value, end = self._decoder.raw_decode(self._buf, self._pos)
+        except json.JSONDecodeError:
+            if self._eof:
+                raise ValueError(f"JSON do relatório inválido na posição {self._pos}") from None
+            self._retry_len = 2 * (len(self._buf) - self._pos)
+            return False, None
+        if end >= len(self._buf) and not self._eof:
+            self._retry_len = 2 * (len(self._buf) - self._pos)
+            return False, None
+        self._pos = end
+        self._retry_len = 0
+        return True, value
+
+    def _parse(self) -> list:
+        items = []
+        while True:
+            state = self._state
+            if state == _START:
+                if self._expect("{") is None:
+                    break
+                self._state = _KEY_OR_END
+            elif state in (_KEY_OR_END, _KEY):
+                ch = self._expect('"}' if state == _KEY_OR_END else '"')
+                if ch is None:
+                    break
+                if ch == "}":
+                    self._state = _DONE
+                    continue
+                self._pos -= 1
+                ok, key = self._decode_value()
+                if not ok:
+                    break
+                self._key = key
+                self._state = _COLON
+            elif state == _COLON:
+                if self._expect(":") is None:
+                    break
+                self._state = _ITEMS_OPEN if self._key == self.items_key else _VALUE
+            elif state == _ITEMS_OPEN:
+                self._skip_ws()
+                if self._pos >= len(self._buf):
+                    break
+                if self._buf[self._pos] != "[":
+                    # items_key não é lista: guarda como campo comum
+                    self._state = _VALUE
+                    continue
+                self._pos += 1
+                self.has_items = True
+                self.fields.pop(self.items_key, None)
+                self._state = _ITEM_OR_END
+            elif state in (_ITEM_OR_END, _ITEM):
+                self._skip_ws()
+                if self._pos >= len(self._buf):
+                    break
+                if state == _ITEM_OR_END and self._buf[self._pos] == "]":
+                    self._pos += 1
+                    self._state = _FIELD_SEP
+                    continue
+                ok, item = self._decode_value()
+                if not ok:
+                    break
+                items.append(item)
+                self._state = _ITEM_SEP
+            elif state == _ITEM_SEP:
+                ch = self._expect(",]")
+                if ch is None:
+                    break
+                self._state = _ITEM if ch == "," else _FIELD_SEP
+            elif state == _VALUE:
+                ok, value = self._decode_value()
+                if not ok:
+                    break
+                self.fields[self._key] = value
+                if self._key == self.items_key:
+                    self.has_items = False
+                self._state = _FIELD_SEP
+            elif state == _FIELD_SEP:
+                ch = self._expect(",}")
+                if ch is None:
+                    break
+                self._state = _KEY if ch == "," else _DONE
+            else:
+                break
+        # Descarta o que já foi consumido para o buffer não crescer com o corpo inteiro
+        if self._pos > 65536:
+            self._buf = self._buf[self._pos:]
+            self._pos = 0
+        return items
+
+
+class StreamingReportPipeline:
+    """
+    Pipeline por item: bytes da API real -> parser -> optimizer -> acumuladores da Visão Geral -> arquivo otimizado.
+    Com save=True grava raw_<slug>.json (bytes como vieram) e optimized_<slug>.json (mesmo formato de save_optimized),
+    com a extensão e a compressão do cache_encoding do endpoint.
+    feed() a cada pedaço do corpo; finish() devolve a visao_geral; abort() descarta os temporários em caso de erro.
+    """
+
+    def __init__(self, endpoint_key: str, params: dict | None = None, save: bool = True, timestamp: str = "latest"):
+        self._parser = ReportStreamParser()
+        self._acc = VisaoGeralAccumulator()
+        self._meta_agent: dict = {}
+        self._raw_writer = None
+        self._opt_writer = None
+        if save:
+            encoding = cache_encoding(endpoint_key)
+            self._raw_writer = RawStreamWriter(
+                cache_file_path("raw", endpoint_key, params=params, timestamp=timestamp, encoding=encoding), encoding
+            )
+            self._opt_writer = StreamedReportWriter(
+                cache_file_path("optimized", endpoint_key, params=params, timestamp=timestamp, encoding=encoding), encoding
+            )
+
+    def feed(self, chunk: bytes) -> None:
+        if self._raw_writer is not None:
+            self._raw_writer.write(chunk)
+        for item in self._parser.feed(chunk):
+            self._handle_item(item)
+
+    def _handle_item(self, item) -> None:
+        # O item acabou de ser decodificado e não é usado em outro lugar: otimizar no próprio dict
+        if isinstance(item, dict):
+            item = _optimize_conversation_item(item, self._meta_agent, mode="inplace")
+        self._acc.add(item)
+        if self._opt_writer is not None:
+            self._opt_writer.write_item(item)
+
+    def finish(self) -> dict:
+        """Processa o fim do corpo, fecha os arquivos e devolve a visao_geral (igual a build_visao_geral do otimizado)."""
+        for item in self._parser.close():
+            self._handle_item(item)
+        if self._raw_writer is not None:
+            self._raw_writer.finalize()
+        if self._opt_writer is not None:
+            # Mesma forma de optimize_report_response: campos do topo, "data" (se era lista) e meta.agent
+            before = {k: v for k, v in self._parser.fields.items() if k != self._parser.items_key}
+            after = {}
+            if self._meta_agent:
+                if "meta" in before:
+                    before["meta"] = {**before["meta"], "agent": self._meta_agent}
+                else:
+                    after["meta"] = {"agent": self._meta_agent}
+            self._opt_writer.finalize(before, after, include_data=self._parser.has_items)
+        return self._acc.result()
+
+    def abort(self) -> None:
+        if self._raw_writer is not None:
+            self._raw_writer.abort()
+        if self._opt_writer is not None:
+            self._opt_writer.abort()
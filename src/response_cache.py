@@ -0,0 +1,137 @@
+"""
+Cache em memória (TTL + LRU) das respostas do wrapper.
+Chave: endpoint + params normalizados (default_params + query) + variações da resposta (view, compare).
+Cada entrada tem validade própria (TTL por endpoint em api_endpoints.json) e tamanho em bytes;
+ao estourar o limite de entradas ou de bytes, as menos usadas recentemente são descartadas.
+Uma segunda instância (previous_month_cache) guarda a visao_geral de meses fechados usada no comparativo do mês anterior;
+uma terceira (full_view_cache) guarda o otimizado como dict para as páginas do view=full em streaming.
+Responsabilidade: evitar nova chamada à API real (e novo optimize/dashboard) para a mesma consulta em sequência; usado pelo wrapper_server.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from src.config import (
+    FULL_VIEW_CACHE_MAX_ENTRIES,
+    PREVIOUS_MONTH_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_MAX_BYTES,
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_TTL,
+    get_endpoint_setting,
+)
+
+
+def normalize_params(params: dict | None) -> tuple:
+    """
+    Normaliza params para uso em chave: ordena e converte valores para str.
+    Assim by=1 (default_params) e by="1" (query string) geram a mesma chave; bool vira "true"/"false",
+    para messageHistory: true (default_params) e ?messageHistory=true caírem na mesma chave.
+    """
+    if not params:
+        return ()
+    return tuple(sorted((str(k), _key_value(v)) for k, v in params.items() if v is not None))
+
+
+def _key_value(value: Any) -> str:
+    """Valor de param como texto da chave (bool vira true/false)."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def make_cache_key(endpoint_key: str, params: dict | None, **variant: Any) -> tuple:
+    """Monta a chave do cache: endpoint, params normalizados e variações (ex.: view="full", compare=True)."""
+    return (endpoint_key, normalize_params(params), tuple(sorted(variant.items())))
+
+
+def get_endpoint_ttl(endpoint_key: str) -> float:
+    """TTL (segundos) das respostas do endpoint: cache_ttl_seconds no api_endpoints.json ou WRAPPER_RESPONSE_CACHE_TTL. 0 desliga."""
+    ttl = get_endpoint_setting(endpoint_key, "cache_ttl_seconds", RESPONSE_CACHE_TTL)
+    try:
+        return max(float(ttl), 0.0)
+    except (TypeError, ValueError):
+        return RESPONSE_CACHE_TTL
+
+
+class ResponseCache:
+    """Cache LRU com expiração por entrada e limites por quantidade e por bytes. Seguro entre threads."""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # chave -> (expira_em, tamanho, valor); ordem = uso (mais recente no fim)
+        self._entries: OrderedDict[tuple, tuple[float, int, Any]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: tuple) -> Any | None:
+        """Retorna o valor se existir e não estiver expirado (e marca como usado); senão None."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, size, value = entry
+            if expires_at <= now:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: tuple, value: Any, ttl: float, size: int) -> None:
+        """Guarda o valor por ttl segundos. Entradas maiores que max_bytes não são guardadas."""
+        if ttl <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, size, value)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, endpoint_key: str | None = None) -> None:
+        """Remove as entradas de um endpoint (ou todas, se endpoint_key for None)."""
+        with self._lock:
+            for key in [k for k in self._entries if endpoint_key is None or k[0] == endpoint_key]:
+                self._remove(key)
+
+    def _remove(self, key: tuple) -> None:
+        """Remove a entrada e desconta os bytes. Chamar com o lock adquirido."""
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> dict:
+        """Contadores para diagnóstico (hits, misses, ocupação)."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+# Instância única usada pelo wrapper_server
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_MAX_BYTES)
+# visao_geral de meses já fechados (comparativo do mês anterior); valores são dicts pequenos, TTL longo
+previous_month_cache = ResponseCache(PREVIOUS_MONTH_CACHE_MAX_ENTRIES, RESPONSE_CACHE_MAX_BYTES)
+# Otimizado (dict) das consultas paginadas do view=full: poucas entradas, limitadas só pela quantidade
+full_view_cache = ResponseCache(FULL_VIEW_CACHE_MAX_ENTRIES, RESPONSE_CACHE_MAX_BYTES)
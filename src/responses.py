@@ -0,0 +1,151 @@
+"""
+Corpo das respostas do /wrapper: serialização JSON e compressão negociada pelo Accept-Encoding.
+render_json usa orjson quando instalado (serializa direto para bytes, sem string intermediária) e,
+sem ele, json.dumps no mesmo formato do JSONResponse do FastAPI (compacto, UTF-8).
+RenderedBody guarda o corpo serializado e as versões comprimidas (gzip; br se o pacote brotli estiver
+instalado), calculadas uma vez e reaproveitadas enquanto o corpo estiver no response_cache.
+Corpos menores que WRAPPER_RESPONSE_COMPRESS_MIN_BYTES vão sem compressão.
+Cada corpo tem um ETag forte (sha256 do JSON; sufixo -gzip/-br nas versões comprimidas): com If-None-Match
+igual, o wrapper responde 304 sem corpo, e num HIT do cache nem monta nem comprime o payload.
+Responsabilidade: reduzir bytes trafegados (ngrok -> front) e o custo de serializar payloads grandes; usado pelo wrapper_server.
+"""
+import gzip
+import hashlib
+import json
+import threading
+
+from src.config import (
+    RESPONSE_BROTLI_QUALITY,
+    RESPONSE_CACHE_CONTROL,
+    RESPONSE_COMPRESS_MIN_BYTES,
+    RESPONSE_GZIP_LEVEL,
+    get_endpoint_setting,
+)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Preferência quando o cliente aceita mais de uma com o mesmo peso
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def render_json(content) -> bytes:
+    """Serializa o payload em JSON compacto UTF-8 (mesmo formato do JSONResponse)."""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def choose_encoding(accept_encoding: str | None) -> str | None:
+    """
+    Codificação a usar segundo o header Accept-Encoding (com pesos q=); None = sem compressão.
+    "*" vale para as codificações não citadas; q=0 recusa.
+    """
+    if not accept_encoding:
+        return None
+    weights: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name] = q
+    best, best_q = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Comprime body em gzip ou br."""
+    if encoding == "br":
+        return brotli.compress(body, quality=RESPONSE_BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=RESPONSE_GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Codificação não suportada: {encoding}")
+
+
+def cache_control(endpoint_key: str) -> str | None:
+    """Header Cache-Control do endpoint ("cache_control" no api_endpoints.json; padrão WRAPPER_CACHE_CONTROL). Vazio = não enviar."""
+    value = get_endpoint_setting(endpoint_key, "cache_control", RESPONSE_CACHE_CONTROL)
+    return str(value).strip() or None
+
+
+def _parse_if_none_match(header: str | None) -> set[str]:
+    """Tags do If-None-Match sem aspas nem prefixo W/ (comparação fraca, como pede o If-None-Match); "*" vale para qualquer uma."""
+    if not header:
+        return set()
+    tags = set()
+    for part in header.split(","):
+        tag = part.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        tags.add(tag.strip('"'))
+    return tags
+
+
+class RenderedBody:
+    """Corpo JSON serializado com ETag e as versões comprimidas calculadas sob demanda (uma vez por codificação)."""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.digest = hashlib.sha256(body).hexdigest()[:32]
+        self._variants: dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.body)
+
+    def etag(self, encoding: str | None = None) -> str:
+        """ETag forte da representação: "<hash>" sem compressão, "<hash>-gzip" / "<hash>-br" comprimida."""
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+    def not_modified(self, if_none_match: str | None) -> bool:
+        """O cliente já tem este conteúdo (If-None-Match com o ETag de qualquer representação dele)?"""
+        tags = _parse_if_none_match(if_none_match)
+        if not tags:
+            return False
+        if "*" in tags:
+            return True
+        return any(tag.split("-", 1)[0] == self.digest for tag in tags)
+
+    def encoding_for(self, accept_encoding: str | None) -> str | None:
+        """Codificação que variant() usaria para este Accept-Encoding (None = sem compressão)."""
+        if len(self.body) < RESPONSE_COMPRESS_MIN_BYTES:
+            return None
+        return choose_encoding(accept_encoding)
+
+    def variant(self, accept_encoding: str | None) -> tuple[bytes, str | None]:
+        """(corpo, Content-Encoding) para o Accept-Encoding do cliente; corpos pequenos vão sem compressão."""
+        encoding = self.encoding_for(accept_encoding)
+        if encoding is None:
+            return self.body, None
+        with self._lock:
+            compressed = self._variants.get(encoding)
+        if compressed is None:
+            compressed = compress(self.body, encoding)
+            with self._lock:
+                self._variants[encoding] = compressed
+        return compressed, encoding
+
+    def has_variant(self, accept_encoding: str | None) -> bool:
+        """A versão para este Accept-Encoding já está pronta (não exige compressão)?"""
+        encoding = self.encoding_for(accept_encoding)
+        return encoding is None or encoding in self._variants
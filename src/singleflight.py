@@ -0,0 +1,51 @@
+"""
+Coalescência de requisições idênticas em andamento (single-flight).
+A primeira chamada de uma chave (líder) executa o trabalho numa task própria; chamadas concorrentes
+com a mesma chave (seguidoras) aguardam essa mesma task e recebem o mesmo resultado ou a mesma exceção.
+A task do líder é protegida com shield: se o cliente líder desconectar, as seguidoras continuam esperando o resultado.
+Responsabilidade: garantir uma única ida à API real (e um único optimize/dashboard/escrita no cache) por consulta simultânea; usado pelo wrapper_server.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """Agrupa chamadas concorrentes por chave; só o líder executa a função."""
+
+    def __init__(self):
+        self._in_flight: dict[Hashable, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        """
+        Executa fn() uma única vez por chave entre chamadas simultâneas.
+        Retorna (resultado, compartilhado); compartilhado=True quando a chamada aguardou o líder.
+        Exceções do líder são repassadas a todos que aguardam.
+        """
+        task = self._in_flight.get(key)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t, k=key: self._forget(k, t))
+        return await asyncio.shield(task), shared
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        """Remove a chave ao terminar a task (só se ainda for a mesma task registrada)."""
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Marca a exceção como consumida quando ninguém mais aguarda (evita aviso do asyncio)
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        """Contadores: chamadas em andamento, líderes e chamadas coalescidas."""
+        return {
+            "in_flight": len(self._in_flight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+        }
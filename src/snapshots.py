@@ -0,0 +1,68 @@
+"""
+Snapshots do dashboard por consulta para stale-while-revalidate: cada resposta dashboard calculada é gravada
+(corpo JSON já serializado) com a chave do cache em memória (endpoint + params normalizados + compare).
+Quando o cache em memória não tem a consulta, um snapshot com até max_stale segundos é devolvido na hora
+(header Age com a idade) e o wrapper_server recalcula em segundo plano, uma vez por chave, para o próximo cliente.
+Diferente de dashboard_<slug>.json (um arquivo por endpoint, para conferência), aqui há um arquivo por consulta.
+Config (api_endpoints.json): "stale_while_revalidate": true (usa WRAPPER_SWR_MAX_STALE_SECONDS) ou
+{"max_stale_seconds": N}. Pasta: cache/<endpoint>/snapshots/dashboard_<hash da chave>.json
+Responsabilidade: persistência e leitura dos snapshots; usado pelo wrapper_server.
+"""
+import hashlib
+import threading
+import time
+from pathlib import Path
+
+from src.config import SWR_MAX_STALE_SECONDS, get_endpoint_setting
+from src.storage import atomic_write_bytes, get_cache_folder
+
+# Contadores para diagnóstico (GET /stats)
+_stats_lock = threading.Lock()
+swr_stats = {"stale_served": 0, "revalidations": 0, "revalidation_errors": 0, "snapshots_saved": 0}
+
+
+def count_swr(name: str, n: int = 1) -> None:
+    """Soma n ao contador name de swr_stats (GET /stats)."""
+    with _stats_lock:
+        swr_stats[name] += n
+
+
+def swr_max_stale(endpoint_key: str) -> float:
+    """Idade máxima (segundos) de um snapshot servido enquanto revalida; 0 = stale-while-revalidate desligado."""
+    setting = get_endpoint_setting(endpoint_key, "stale_while_revalidate", False)
+    if isinstance(setting, dict):
+        setting = setting.get("max_stale_seconds", SWR_MAX_STALE_SECONDS)
+    if setting is True:
+        return SWR_MAX_STALE_SECONDS
+    if not setting:
+        return 0.0
+    try:
+        return max(float(setting), 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def snapshot_path(endpoint_key: str, cache_key: tuple) -> Path:
+    """Arquivo do snapshot da consulta (hash da chave do cache em memória)."""
+    digest = hashlib.sha1(repr(cache_key).encode("utf-8")).hexdigest()[:20]
+    return get_cache_folder(endpoint_key) / "snapshots" / f"dashboard_{digest}.json"
+
+
+def save_snapshot(endpoint_key: str, cache_key: tuple, body: bytes) -> None:
+    """Grava o corpo da resposta como snapshot da consulta (substitui o anterior)."""
+    path = snapshot_path(endpoint_key, cache_key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write_bytes(path, body)
+    count_swr("snapshots_saved")
+
+
+def load_snapshot(endpoint_key: str, cache_key: tuple, max_stale: float) -> tuple[bytes, float] | None:
+    """(corpo, idade em segundos) do snapshot da consulta, se existir e tiver até max_stale segundos; senão None."""
+    path = snapshot_path(endpoint_key, cache_key)
+    try:
+        age = max(time.time() - path.stat().st_mtime, 0.0)
+        if age > max_stale:
+            return None
+        return path.read_bytes(), age
+    except OSError:
+        return None
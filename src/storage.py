@@ -2,14 +2,38 @@
 Persistência local: cria pasta por endpoint (chave ou path normalizado) e salva JSON bruto, otimizado e dashboard.
 Nomes: raw_<slug>.json, optimized_<slug>.json, dashboard_<slug>.json (ex.: raw_liareport.json, optimized_liareport.json, dashboard_liareport.json).
 Cada nova chamada substitui os arquivos do mesmo endpoint. Padrão reutilizável para outras soluções.
+Formato configurável por endpoint ("cache_encoding" no api_endpoints.json ou WRAPPER_CACHE_ENCODING):
+pretty (indent=2, padrão), compact (sem espaços), gzip (.json.gz) ou lzma (.json.xz). load_json detecta o formato
+pelos primeiros bytes, então quem lê o cache não precisa saber como o arquivo foi gravado.
+Cada pasta tem um manifest.json com o sha256 do conteúdo (JSON serializado, antes da compressão) de cada arquivo:
+se o payload não mudou desde a última gravação, o arquivo não é regravado. Gravações usam arquivo temporário + rename,
+então um leitor nunca vê arquivo pela metade.
 Responsabilidade: definir onde e com que nome os arquivos são gravados; usado pelo wrapper e pelo compare_report.
 """
+import gzip
+import hashlib
 import json
+import logging
+import lzma
+import os
 import re
+import tempfile
+import threading
 from pathlib import Path
 from datetime import datetime
 
-from src.config import CACHE_DIR, resolve_path, get_endpoint_slug
+from src.config import CACHE_DIR, CACHE_ENCODING, get_endpoint_setting, resolve_path, get_endpoint_slug
+
+logger = logging.getLogger(__name__)
+
+# Formato -> extensão do arquivo no cache
+CACHE_ENCODINGS = {"pretty": ".json", "compact": ".json", "gzip": ".json.gz", "lzma": ".json.xz"}
+_GZIP_MAGIC = b"\x1f\x8b"
+_XZ_MAGIC = b"\xfd7zXZ\x00"
+# Nível 6: bom equilíbrio tempo/tamanho para JSON (o padrão 9 do gzip custa bem mais e ganha pouco)
+_GZIP_LEVEL = 6
+MANIFEST_NAME = "manifest.json"
+_manifest_lock = threading.Lock()
 
 
 def _normalize_for_folder(name: str) -> str:
@@ -70,6 +94,184 @@ def _cache_suffix(
     return _suffix_from_params(params)
 
 
+def cache_encoding(endpoint_key_or_path: str) -> str:
+    """Formato do cache do endpoint ("cache_encoding" no api_endpoints.json; padrão WRAPPER_CACHE_ENCODING)."""
+    encoding = str(get_endpoint_setting(endpoint_key_or_path, "cache_encoding", CACHE_ENCODING)).strip().lower()
+    if encoding not in CACHE_ENCODINGS:
+        logger.warning("cache_encoding inválido para %s: %r; usando pretty", endpoint_key_or_path, encoding)
+        return "pretty"
+    return encoding
+
+
+def cache_file_path(
+    prefix: str,
+    endpoint_key_or_path: str,
+    params: dict | None = None,
+    timestamp: str | None = None,
+    encoding: str = "pretty",
+) -> Path:
+    """
+    Caminho do arquivo <prefix>_<sufixo>.json na pasta do endpoint (ex.: raw_liareport.json);
+    .json.gz / .json.xz para os formatos comprimidos.
+    Mesma regra de nomes usada por save_raw, save_optimized e save_dashboard.
+    """
+    folder = get_cache_folder(endpoint_key_or_path)
+    suffix = _cache_suffix(endpoint_key_or_path, params, timestamp)
+    safe_suffix = re.sub(r"[^\w\-=.]", "_", suffix)
+    return folder / f"{prefix}_{safe_suffix}{CACHE_ENCODINGS[encoding]}"
+
+
+def _base_name(path: Path) -> str:
+    """Nome sem a extensão do cache (raw_liareport.json.gz -> raw_liareport)."""
+    name = path.name
+    for ext in (".json.gz", ".json.xz", ".json"):
+        if name.endswith(ext):
+            return name[: -len(ext)]
+    return name
+
+
+def find_cache_file(folder: Path, base_name: str) -> Path | None:
+    """Arquivo do cache com esse nome em qualquer formato (base_name sem extensão, ex.: raw_liareport)."""
+    for ext in (".json", ".json.gz", ".json.xz"):
+        path = folder / f"{base_name}{ext}"
+        if path.exists():
+            return path
+    return None
+
+
+def remove_stale_variants(path: Path) -> None:
+    """Remove o mesmo arquivo gravado em outro formato (ex.: raw_liareport.json ao passar a gravar .json.gz)."""
+    base = _base_name(path)
+    for ext in (".json", ".json.gz", ".json.xz"):
+        other = path.with_name(base + ext)
+        if other != path:
+            other.unlink(missing_ok=True)
+
+
+def _serialize(data, encoding: str) -> bytes:
+    """JSON em UTF-8 antes da compressão: indentado (pretty) ou compacto (demais formatos). É o que entra no hash."""
+    if encoding == "pretty":
+        return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _compress(content: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        # mtime=0: mesmo conteúdo gera os mesmos bytes
+        return gzip.compress(content, compresslevel=_GZIP_LEVEL, mtime=0)
+    if encoding == "lzma":
+        return lzma.compress(content)
+    return content
+
+
+def encode_json(data, encoding: str = "pretty") -> bytes:
+    """Serializa data no formato do cache."""
+    return _compress(_serialize(data, encoding), encoding)
+
+
+def decode_json(content: bytes):
+    """Inverso de encode_json: detecta gzip/xz pelos primeiros bytes; senão, JSON em UTF-8."""
+    if content[:2] == _GZIP_MAGIC:
+        content = gzip.decompress(content)
+    elif content[:6] == _XZ_MAGIC:
+        content = lzma.decompress(content)
+    return json.loads(content.decode("utf-8"))
+
+
+def load_json(path: str | Path):
+    """
+    Lê um JSON do cache em qualquer formato (pretty, compact, gzip, lzma).
+    Erros de leitura/conteúdo sobem como OSError ou ValueError (json.JSONDecodeError é ValueError).
+    """
+    with open(path, "rb") as f:
+        content = f.read()
+    try:
+        return decode_json(content)
+    except (EOFError, lzma.LZMAError, gzip.BadGzipFile, UnicodeDecodeError) as e:
+        raise ValueError(f"Arquivo de cache inválido: {path}: {e}") from e
+
+
+def open_encoded(path: Path, encoding: str, mode: str = "w"):
+    """Abre path para escrita no formato dado: "w" (texto) ou "wb" (bytes), comprimindo em gzip/lzma."""
+    text = {"encoding": "utf-8"} if "b" not in mode else {}
+    if encoding == "gzip":
+        return gzip.open(path, mode if "b" in mode else "wt", compresslevel=_GZIP_LEVEL, **text)
+    if encoding == "lzma":
+        return lzma.open(path, mode if "b" in mode else "wt", **text)
+    return open(path, mode, **text)
+
+
+def content_hash(content: bytes) -> str:
+    """sha256 (hex) do conteúdo, usado no manifest."""
+    return hashlib.sha256(content).hexdigest()
+
+
+def atomic_write_bytes(path: Path, content: bytes) -> None:
+    """Grava num temporário da mesma pasta e renomeia para path (leitores veem o arquivo antigo ou o novo, nunca pela metade)."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def _read_manifest(folder: Path) -> dict:
+    try:
+        with open(folder / MANIFEST_NAME, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+
+def stored_hash(path: Path) -> str | None:
+    """Hash registrado no manifest para o arquivo, se ele ainda existir em disco."""
+    if not path.exists():
+        return None
+    with _manifest_lock:
+        entry = _read_manifest(path.parent).get(path.name)
+    return entry.get("sha256") if isinstance(entry, dict) else None
+
+
+def record_hash(path: Path, digest: str, size: int) -> None:
+    """Registra o hash do arquivo no manifest da pasta (e remove as entradas do mesmo arquivo em outros formatos)."""
+    base = _base_name(path)
+    with _manifest_lock:
+        manifest = _read_manifest(path.parent)
+        for ext in (".json", ".json.gz", ".json.xz"):
+            manifest.pop(base + ext, None)
+        manifest[path.name] = {"sha256": digest, "bytes": size}
+        atomic_write_bytes(path.parent / MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+
+
+def save_payload(
+    kind: str,
+    endpoint_key_or_path: str,
+    data: dict,
+    params: dict | None = None,
+    timestamp: str | None = None,
+) -> tuple[Path, bool]:
+    """
+    Grava <kind>_<sufixo> (kind = raw, optimized ou dashboard) no formato do endpoint e remove
+    a versão do mesmo arquivo em outro formato, para não ficar um par desatualizado no cache.
+    Se o conteúdo é igual ao registrado no manifest, não grava nada.
+    Retorna (Path do arquivo, mudou?).
+    """
+    encoding = cache_encoding(endpoint_key_or_path)
+    path = cache_file_path(kind, endpoint_key_or_path, params=params, timestamp=timestamp, encoding=encoding)
+    content = _serialize(data, encoding)
+    digest = content_hash(content)
+    if stored_hash(path) == digest:
+        return path, False
+    atomic_write_bytes(path, _compress(content, encoding))
+    remove_stale_variants(path)
+    record_hash(path, digest, len(content))
+    return path, True
+
+
 def save_raw(
     endpoint_key_or_path: str,
     data: dict,
@@ -78,17 +280,10 @@ def save_raw(
 ) -> Path:
     """
     Salva o JSON bruto na pasta do endpoint.
-    Com timestamp="latest" gera raw_<slug>.json (ex.: raw_liareport.json); cada chamada substitui.
+    Com timestamp="latest" gera raw_<slug>.json (ex.: raw_liareport.json); cada chamada substitui (se o conteúdo mudou).
     Retorna o Path do arquivo salvo.
     """
-    folder = get_cache_folder(endpoint_key_or_path)
-    suffix = _cache_suffix(endpoint_key_or_path, params, timestamp)
-    safe_suffix = re.sub(r"[^\w\-=.]", "_", suffix)
-    fname = f"raw_{safe_suffix}.json"
-    path = folder / fname
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    return path
+    return save_payload("raw", endpoint_key_or_path, data, params=params, timestamp=timestamp)[0]
 
 
 def save_optimized(
@@ -102,14 +297,7 @@ def save_optimized(
     Com timestamp="latest" gera optimized_<slug>.json (ex.: optimized_liareport.json); cada chamada substitui.
     Retorna o Path do arquivo salvo.
     """
-    folder = get_cache_folder(endpoint_key_or_path)
-    suffix = _cache_suffix(endpoint_key_or_path, params, timestamp)
-    safe_suffix = re.sub(r"[^\w\-=.]", "_", suffix)
-    fname = f"optimized_{safe_suffix}.json"
-    path = folder / fname
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    return path
+    return save_payload("optimized", endpoint_key_or_path, data, params=params, timestamp=timestamp)[0]
 
 
 def save_dashboard(
@@ -123,11 +311,163 @@ def save_dashboard(
     Com timestamp="latest" gera dashboard_<slug>.json (ex.: dashboard_liareport.json); cada chamada substitui.
     Retorna o Path do arquivo salvo. Útil para conferência local da resposta padrão do wrapper.
     """
-    folder = get_cache_folder(endpoint_key_or_path)
-    suffix = _cache_suffix(endpoint_key_or_path, params, timestamp)
-    safe_suffix = re.sub(r"[^\w\-=.]", "_", suffix)
-    fname = f"dashboard_{safe_suffix}.json"
-    path = folder / fname
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    return path
+    return save_payload("dashboard", endpoint_key_or_path, data, params=params, timestamp=timestamp)[0]
+
+
+def _indent_json(value, level: int) -> str:
+    """Serializa value como json.dump(indent=2) faria dentro de um documento, no nível de aninhamento level."""
+    return json.dumps(value, ensure_ascii=False, indent=2).replace("\n", "\n" + "  " * level)
+
+
+def _unique_tmp(path: Path, suffix: str = ".tmp") -> Path:
+    """Cria um temporário vazio e exclusivo na pasta de path (requisições simultâneas não dividem o mesmo arquivo)."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=suffix)
+    os.close(fd)
+    return Path(tmp)
+
+
+def _publish(tmp_path: Path, path: Path, digest: str, size: int) -> bool:
+    """Renomeia o temporário para path e registra o hash; se o conteúdo não mudou, só descarta o temporário."""
+    if stored_hash(path) == digest:
+        tmp_path.unlink(missing_ok=True)
+        return False
+    os.replace(tmp_path, path)
+    remove_stale_variants(path)
+    record_hash(path, digest, size)
+    return True
+
+
+class _HashingWriter:
+    """Repassa o texto ao arquivo e acumula o sha256 do conteúdo sem compressão (o mesmo hash de save_payload)."""
+
+    def __init__(self, file):
+        self._file = file
+        self.hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, text: str) -> None:
+        data = text.encode("utf-8")
+        self.hash.update(data)
+        self.size += len(data)
+        self._file.write(text)
+
+
+class RawStreamWriter:
+    """
+    Grava os bytes da resposta da API real conforme chegam (streaming), num arquivo temporário
+    renomeado para o destino (ex.: raw_liareport.json) só em finalize(). O conteúdo é o JSON como veio
+    (comprimido em gzip/lzma se o endpoint usar esses formatos; "compact" não reformata os bytes).
+    """
+
+    def __init__(self, path: Path, encoding: str = "pretty"):
+        self.path = path
+        self.changed = False
+        self._tmp_path = _unique_tmp(path)
+        try:
+            self._file = open_encoded(self._tmp_path, encoding, "wb")
+        except BaseException:
+            self._tmp_path.unlink(missing_ok=True)
+            raise
+        self._hash = hashlib.sha256()
+        self._size = 0
+
+    def write(self, chunk: bytes) -> None:
+        self._file.write(chunk)
+        self._hash.update(chunk)
+        self._size += len(chunk)
+
+    def finalize(self) -> Path:
+        """Publica o arquivo; se o conteúdo é igual ao do manifest, descarta o temporário (changed=False)."""
+        self._file.close()
+        self.changed = _publish(self._tmp_path, self.path, self._hash.hexdigest(), self._size)
+        return self.path
+
+    def abort(self) -> None:
+        self._file.close()
+        self._tmp_path.unlink(missing_ok=True)
+
+
+class StreamedReportWriter:
+    """
+    Grava um relatório otimizado item a item, no mesmo formato de save_optimized (indent=2 ou compacto,
+    comprimido ou não), sem montar o dict completo: os itens vão para um arquivo temporário e, em finalize(),
+    o documento final é montado com os campos do topo antes e depois de "data".
+    """
+
+    def __init__(self, path: Path, encoding: str = "pretty"):
+        self.path = path
+        self.changed = False
+        self.encoding = encoding
+        self._pretty = encoding == "pretty"
+        self._items_path = _unique_tmp(path, ".items.tmp")
+        self._items = open(self._items_path, "w", encoding="utf-8")
+        self.count = 0
+
+    def _dump(self, value, level: int) -> str:
+        if self._pretty:
+            return _indent_json(value, level)
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+    def write_item(self, item) -> None:
+        """Acrescenta um item ao array data."""
+        if self._pretty:
+            sep = ",\n    " if self.count else "\n    "
+        else:
+            sep = "," if self.count else ""
+        self._items.write(sep + self._dump(item, 2))
+        self.count += 1
+
+    def finalize(self, before: dict, after: dict | None = None, include_data: bool = True) -> Path:
+        """
+        Monta o arquivo final: campos de before, depois "data" (se include_data) e campos de after.
+        Se o conteúdo é igual ao do manifest, o arquivo existente fica como está (changed=False).
+        Retorna o Path do arquivo salvo.
+        """
+        self._items.close()
+        tmp_path = None
+        pretty = self._pretty
+        try:
+            tmp_path = _unique_tmp(self.path)
+            with open_encoded(tmp_path, self.encoding) as f:
+                out = _HashingWriter(f)
+                first = True
+
+                def write_key(key: str) -> None:
+                    nonlocal first
+                    if pretty:
+                        out.write(("{\n  " if first else ",\n  ") + json.dumps(key, ensure_ascii=False) + ": ")
+                    else:
+                        out.write(("{" if first else ",") + json.dumps(key, ensure_ascii=False) + ":")
+                    first = False
+
+                for key, value in before.items():
+                    write_key(key)
+                    out.write(self._dump(value, 1))
+                if include_data:
+                    write_key("data")
+                    if self.count:
+                        out.write("[")
+                        with open(self._items_path, encoding="utf-8") as items:
+                            while True:
+                                block = items.read(1024 * 1024)
+                                if not block:
+                                    break
+                                out.write(block)
+                        out.write("\n  ]" if pretty else "]")
+                    else:
+                        out.write("[]")
+                for key, value in (after or {}).items():
+                    write_key(key)
+                    out.write(self._dump(value, 1))
+                out.write("{}" if first else ("\n}" if pretty else "}"))
+            self.changed = _publish(tmp_path, self.path, out.hash.hexdigest(), out.size)
+        finally:
+            self._items_path.unlink(missing_ok=True)
+            if tmp_path is not None:
+                tmp_path.unlink(missing_ok=True)
+        return self.path
+
+    def abort(self) -> None:
+        """Descarta os arquivos temporários (ex.: falha no meio do streaming)."""
+        self._items.close()
+        self._items_path.unlink(missing_ok=True)
@@ -27,7 +27,8 @@ def run_once(
     """
     raw = fetch_json(endpoint_key_or_path, params=params)
     save_raw(endpoint_key_or_path, raw, params=params)
-    optimized = optimize_report_response(raw)
+    # O bruto já foi salvo e não é mais usado: otimizar no próprio dict (sem cópia)
+    optimized = optimize_report_response(raw, mode="inplace")
     if save_optimized_file:
         save_optimized(endpoint_key_or_path, optimized, params=params)
     return optimized
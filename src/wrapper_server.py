@@ -1,40 +1,332 @@
 """
 Servidor HTTP (FastAPI) que expõe rotas /wrapper/{endpoint_key}.
 Repassa query params à API real, salva bruto, otimiza e devolve JSON otimizado.
-Arquivos no cache: raw_<slug>.json, optimized_<slug>.json e dashboard_<slug>.json; cada chamada substitui.
-Responsabilidade: orquestrar uma requisição (fetch -> save raw -> optimize -> save optimized -> run_comparison -> return); ponto de entrada HTTP do projeto.
+Arquivos no cache: raw_<slug>.json, optimized_<slug>.json e dashboard_<slug>.json; cada chamada substitui
+(só se o conteúdo mudou: o storage compara com o hash do manifest.json da pasta).
+A chamada à API real é assíncrona (pool compartilhado); o processamento síncrono (salvar, otimizar,
+comparar, dashboard) roda em threadpool para não travar o event loop entre requisições concorrentes.
+Respostas já calculadas ficam no cache em memória (response_cache) pelo TTL do endpoint e
+requisições idênticas simultâneas são coalescidas (singleflight) numa única execução.
+A comparação raw vs otimizado é gerada em segundo plano (comparison_queue), fora da latência da resposta.
+Com ?compare=previous_month o mês anterior é buscado junto com o período atual; a visao_geral de meses
+encerrados fica em cache (previous_month_cache), então só o período atual volta à API real.
+Períodos longos podem ser divididos em sub-consultas paralelas ("range_split" no endpoint, ver range_split).
+Endpoints com "conversation_store" guardam as conversas otimizadas num SQLite local e só buscam os dias que
+faltam ou são recentes (conversation_store); ?refresh=full força buscar o período inteiro de novo.
+Cada etapa é medida em metrics (latência, tamanhos, status da API real); GET /metrics expõe no formato
+Prometheus e GET /metrics/summary em JSON com p50/p95/p99. Cada resposta do /wrapper leva as etapas da própria
+requisição no header Server-Timing; com WRAPPER_PROFILING_ENABLED, ?profile=1 roda a requisição sob cProfile (profiling).
+view=full com fields/offset/limit/cursor sai em streaming, item a item e só a página pedida (full_view).
+POST /wrapper/batch resolve várias consultas numa chamada, em paralelo limitado e com erro por item (batch).
+Endpoints com "stale_while_revalidate" devolvem na hora o último snapshot da consulta (header Age) quando o cache
+em memória expirou, e recalculam em segundo plano (snapshots).
+Com "prefetch" no endpoint, serve() inicia um agendador que recalcula presets (hoje, mês até hoje, mês anterior...)
+periodicamente, para as requisições interativas acharem o cache quente (prefetch).
+Responsabilidade: orquestrar uma requisição (fetch -> save raw -> optimize -> save optimized -> agenda comparação -> return); ponto de entrada HTTP do projeto.
 """
-from datetime import date, timedelta
+import asyncio
+import contextvars
+import json
+import logging
+from itertools import islice
+from contextlib import aclosing, asynccontextmanager
+from datetime import date, datetime, timedelta, timezone
 
 from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 
-from src.config import get_endpoint_config, load_endpoints, WRAPPER_PORT
-from src.api_client import fetch_json
-from src.storage import save_raw, save_optimized, save_dashboard
+from src.config import (
+    BATCH_MAX_CONCURRENCY,
+    PREFETCH_ENABLED,
+    PREVIOUS_MONTH_CACHE_TTL,
+    PROFILING_ENABLED,
+    WRAPPER_PORT,
+    get_endpoint_config,
+    load_endpoints,
+)
+from src.api_client import aclose_clients, stream_bytes_async
+from src.response_cache import full_view_cache, get_endpoint_ttl, make_cache_key, previous_month_cache, response_cache
+from src.metrics import metrics, request_timings, server_timing
+from src.prefetch import prefetch_scheduler
+from src.profiling import profile_call, run_sync
+from src.singleflight import SingleFlight
+from src.snapshots import count_swr, load_snapshot, save_snapshot, swr_max_stale, swr_stats
+from src.storage import save_dashboard, save_payload
 from src.optimizer import optimize_report_response
-from src.compare_report import run_comparison
+from src.comparison_queue import comparison_enabled, comparison_queue
+from src.conversation_store import StorePlan, conversation_store, store_enabled
+from src.compare_report import comparison_report_paths
 from src.dashboard_treatments import (
-    build_dashboard_payload,
-    build_visao_geral,
     build_comparativo_mes_anterior,
+    dashboard_payload_from_visao_geral,
 )
+from src.dashboard_parallel import build_visao_geral_parallel, shutdown_pool
+from src.dashboard_shards import ingest_run, merge_shards, plan_shards, shard_stats, shards_enabled
+from src.periods import parse_range
+from src.report_stream import StreamingReportPipeline, streaming_enabled
+from src.range_split import fetch_report
+from src.responses import RenderedBody, cache_control, choose_encoding, render_json
+from src.batch import BatchItem, parse_batch, render_batch
+from src.full_view import STREAM_PARAMS, Projection, pagination, parse_page, stream_full_view
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    """
+    Ciclo de vida do servidor: inicia o prefetch (quando subido por serve()); ao encerrar, para o prefetch,
+    a fila de comparação, o pool de processos do dashboard, fecha o store de conversas e o pool de conexões com a API real.
+    """
+    if prefetch_scheduler.autostart:
+        prefetch_scheduler.start(_prefetch)
+    yield
+    await prefetch_scheduler.stop()
+    await run_in_threadpool(comparison_queue.shutdown)
+    await run_in_threadpool(shutdown_pool)
+    await run_in_threadpool(conversation_store.close)
+    await aclose_clients()
+
 
 app = FastAPI(
     title="Wrapper API Report",
     description="Proxy que chama a API real, persiste o bruto e devolve por padrão o JSON tratado para dashboards (visao_geral, etc.).",
+    lifespan=_lifespan,
 )
 
-# CORS: front (ex.: Lovable) em outro domínio faz preflight OPTIONS antes do GET; sem isso retorna 405
+# CORS: front (ex.: Lovable) em outro domínio faz preflight OPTIONS antes do GET/POST; sem isso retorna 405
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=False,
-    allow_methods=["GET", "OPTIONS"],
+    allow_methods=["GET", "POST", "OPTIONS"],
     allow_headers=["*"],
+    # Front em outro domínio pode ler o ETag (para enviar If-None-Match), o status do cache e os tempos por etapa
+    expose_headers=["Age", "ETag", "Server-Timing", "X-Wrapper-Cache", "X-Wrapper-View", "X-Wrapper-Profile"],
 )
 
+# Requisições idênticas simultâneas compartilham um único fetch/optimize/dashboard
+_inflight = SingleFlight()
+# Revalidações em segundo plano (stale-while-revalidate) em andamento, por chave do cache
+_revalidating: dict[tuple, asyncio.Task] = {}
+
+
+def _save_and_optimize(endpoint_key: str, params: dict, raw: dict) -> dict:
+    """
+    Etapa síncrona do pipeline: salva bruto, otimiza, salva otimizado e agenda a comparação
+    na fila em segundo plano (se o endpoint não desligou com "comparison": false). Retorna o otimizado.
+    Se bruto e otimizado são iguais aos já gravados (manifest do storage), nada é regravado e a comparação
+    só é refeita se os arquivos dela não existirem.
+    """
+    with metrics.timed("save_raw", endpoint_key):
+        _, raw_changed = save_payload("raw", endpoint_key, raw, params=params, timestamp="latest")
+    with metrics.timed("optimize", endpoint_key):
+        optimized = optimize_report_response(raw)
+    metrics.observe_report(endpoint_key, optimized)
+    with metrics.timed("save_optimized", endpoint_key):
+        _, opt_changed = save_payload("optimized", endpoint_key, optimized, params=params, timestamp="latest")
+    if comparison_enabled(endpoint_key) and (
+        raw_changed or opt_changed or not comparison_report_paths(endpoint_key, params, "latest")[2].exists()
+    ):
+        comparison_queue.submit(endpoint_key, params, raw=raw, optimized=optimized, timestamp="latest")
+    return optimized
+
+
+async def _compute_payload(
+    endpoint_key: str,
+    params: dict,
+    view_full: bool,
+    compare_previous_month: bool,
+    refresh_full: bool = False,
+) -> dict:
+    """
+    Pipeline completo de uma consulta: fetch -> save raw -> optimize -> save optimized -> agenda comparação
+    e, na visão padrão, dashboard (com comparativo do mês anterior opcional) -> save dashboard.
+    Retorna o otimizado (view=full) ou o payload do dashboard.
+    Endpoints com "dashboard_shards" combinam agregados diários e só buscam os dias faltantes;
+    endpoints com "streaming": true calculam o dashboard item a item, sem montar bruto/otimizado em memória;
+    endpoints com "conversation_store" montam o otimizado do store local (refresh_full rebusca o período inteiro).
+    """
+    # Visão dashboard: shards diários (só os dias faltantes vão à API real) ou streaming item a item
+    period = parse_range(params) if not view_full and shards_enabled(endpoint_key) else None
+    streaming = not view_full and period is None and streaming_enabled(endpoint_key)
+    store_period = parse_range(params) if period is None and not streaming and store_enabled(endpoint_key) else None
+
+    async def current() -> dict:
+        if period is not None or streaming:
+            try:
+                if period is not None:
+                    with metrics.timed("shards", endpoint_key):
+                        visao_atual = await _sharded_visao_geral(endpoint_key, params, period)
+                else:
+                    with metrics.timed("stream", endpoint_key):
+                        visao_atual = await _stream_visao_geral(endpoint_key, params, save=True)
+            except Exception as e:
+                raise HTTPException(status_code=502, detail=f"Erro ao chamar API real: {e}") from e
+            return dashboard_payload_from_visao_geral(visao_atual)
+        if store_period is not None:
+            try:
+                optimized = await _stored_report(endpoint_key, params, store_period, refresh_full)
+            except Exception as e:
+                raise HTTPException(status_code=502, detail=f"Erro ao chamar API real: {e}") from e
+            # O bruto do período não existe inteiro neste modo: grava só o otimizado (sem comparação)
+            with metrics.timed("save_optimized", endpoint_key):
+                await run_sync(save_payload, "optimized", endpoint_key, optimized, params=params, timestamp="latest")
+        else:
+            try:
+                raw = await fetch_report(endpoint_key, params)
+            except Exception as e:
+                raise HTTPException(status_code=502, detail=f"Erro ao chamar API real: {e}") from e
+            optimized = await run_sync(_save_and_optimize, endpoint_key, params, raw)
+        if view_full:
+            return optimized
+        # Relatórios grandes: dashboard dividido entre processos (dashboard_parallel)
+        with metrics.timed("dashboard", endpoint_key):
+            visao_atual = await run_sync(build_visao_geral_parallel, optimized)
+        return dashboard_payload_from_visao_geral(visao_atual)
+
+    if view_full or not (compare_previous_month and params.get("from")):
+        payload = await current()
+        if view_full:
+            return payload
+    else:
+        # Período atual e mês anterior buscados ao mesmo tempo (o mês anterior costuma vir do cache)
+        payload, visao_anterior = await asyncio.gather(
+            current(), _timed_previous_month_visao(endpoint_key, params, streaming)
+        )
+        payload["comparativo_mes_anterior"] = (
+            build_comparativo_mes_anterior(payload["visao_geral"], visao_anterior) if visao_anterior is not None else None
+        )
+    with metrics.timed("save_dashboard", endpoint_key):
+        await run_sync(save_dashboard, endpoint_key, payload, params=params, timestamp="latest")
+    return payload
+
+
+async def _timed_previous_month_visao(endpoint_key: str, params: dict, streaming: bool) -> dict | None:
+    """_previous_month_visao medido como etapa "previous_month" (inclui os HITs do previous_month_cache)."""
+    with metrics.timed("previous_month", endpoint_key):
+        return await _previous_month_visao(endpoint_key, params, streaming)
+
+
+async def _previous_month_visao(endpoint_key: str, params: dict, streaming: bool) -> dict | None:
+    """
+    visao_geral do mês anterior ao "from" (mesmo modo do período atual: shards, streaming ou normal).
+    Meses já encerrados ficam em previous_month_cache (WRAPPER_PREVIOUS_MONTH_CACHE_TTL), então
+    comparações repetidas só buscam o período atual na API real. Retorna None se from for inválido
+    ou o cálculo falhar com ValueError/KeyError (o comparativo vai como null).
+    """
+    try:
+        first_curr = date.fromisoformat(params["from"]).replace(day=1)
+    except (ValueError, KeyError):
+        return None
+    prev_end = first_curr - timedelta(days=1)
+    prev_start = prev_end.replace(day=1)
+    params_anterior = {**params, "from": prev_start.isoformat(), "to": prev_end.isoformat()}
+    key = make_cache_key(endpoint_key, params_anterior, kind="visao_mes_anterior")
+    cached = previous_month_cache.get(key)
+    if cached is not None:
+        return cached
+
+    async def compute() -> dict:
+        try:
+            if shards_enabled(endpoint_key):
+                visao = await _sharded_visao_geral(endpoint_key, params_anterior, (prev_start, prev_end))
+            elif streaming:
+                visao = await _stream_visao_geral(endpoint_key, params_anterior, save=False)
+            elif store_enabled(endpoint_key):
+                optimized_anterior = await _stored_report(endpoint_key, params_anterior, (prev_start, prev_end))
+                visao = await run_sync(build_visao_geral_parallel, optimized_anterior)
+            else:
+                raw_anterior = await fetch_report(endpoint_key, params_anterior)
+                # Bruto do mês anterior não é salvo nem comparado: otimizar no próprio dict
+                optimized_anterior = await run_sync(optimize_report_response, raw_anterior, "inplace")
+                visao = await run_sync(build_visao_geral_parallel, optimized_anterior)
+        except (ValueError, KeyError):
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"Erro ao chamar API real (mês anterior): {e}") from e
+        # Só meses encerrados vão para o cache (o mês corrente ainda recebe conversas)
+        if prev_end < datetime.now(timezone.utc).date():
+            previous_month_cache.set(key, visao, ttl=PREVIOUS_MONTH_CACHE_TTL, size=len(json.dumps(visao)))
+        return visao
+
+    try:
+        visao, _ = await _inflight.do(key, compute)
+    except (ValueError, KeyError):
+        return None
+    return visao
+
+
+async def _sync_store(endpoint_key: str, params: dict, period: tuple[date, date], refresh_full: bool = False) -> StorePlan:
+    """
+    Sincroniza o store de conversas com o período: busca na API real (em paralelo) só os intervalos de dias
+    não sincronizados ou recentes (todos com refresh_full) e grava no store. Retorna o plano (escopo) para leitura.
+    """
+    plan = await run_sync(conversation_store.plan, endpoint_key, params, *period, refresh_full)
+
+    async def sync_run(run: tuple[date, date]) -> None:
+        params_run = {**params, "from": run[0].isoformat(), "to": run[1].isoformat()}
+        raw = await fetch_report(endpoint_key, params_run)
+        optimized_run = await run_sync(optimize_report_response, raw, "inplace")
+        await run_sync(conversation_store.upsert_run, plan, run, optimized_run)
+
+    with metrics.timed("store_sync", endpoint_key):
+        await asyncio.gather(*(sync_run(run) for run in plan.missing_runs))
+    return plan
+
+
+async def _stored_report(endpoint_key: str, params: dict, period: tuple[date, date], refresh_full: bool = False) -> dict:
+    """Otimizado do período a partir do store de conversas (sincronizado antes com _sync_store)."""
+    plan = await _sync_store(endpoint_key, params, period, refresh_full)
+    with metrics.timed("store_load", endpoint_key):
+        optimized = await run_sync(conversation_store.load, plan, *period)
+    metrics.observe_report(endpoint_key, optimized)
+    return optimized
+
+
+async def _sharded_visao_geral(endpoint_key: str, params: dict, period: tuple[date, date]) -> dict:
+    """
+    Visão Geral a partir dos shards diários: carrega os dias já agregados e busca na API real
+    (em paralelo) só os intervalos de dias que faltam; os dias fechados buscados viram novos shards.
+    Neste modo os arquivos raw/optimized não são gravados (cada intervalo é só uma parte do período).
+    """
+    plan = await run_sync(plan_shards, endpoint_key, params, *period)
+
+    async def fetch_run(run: tuple[date, date]) -> dict:
+        params_run = {**params, "from": run[0].isoformat(), "to": run[1].isoformat()}
+        raw = await fetch_report(endpoint_key, params_run)
+        optimized = await run_sync(optimize_report_response, raw, "inplace")
+        return await run_sync(ingest_run, plan, run, optimized)
+
+    fetched = await asyncio.gather(*(fetch_run(run) for run in plan.missing_runs))
+    return await run_sync(merge_shards, plan.cached, *fetched)
+
+
+async def _stream_visao_geral(endpoint_key: str, params: dict, save: bool) -> dict:
+    """
+    Modo streaming: consome o corpo da API real em pedaços e passa cada conversa por optimizer,
+    acumuladores da Visão Geral e (com save=True) arquivos raw/optimized do cache. Retorna a visao_geral.
+    A comparação raw vs otimizado não é agendada neste modo (exigiria os dois JSONs inteiros em memória).
+    """
+    pipeline = StreamingReportPipeline(endpoint_key, params, save=save)
+    try:
+        # aclosing: se o parser falhar ou o cliente desconectar, o gerador é fechado na hora e libera
+        # a vaga do semáforo por host e a conexão do pool (sem esperar o GC)
+        async with aclosing(stream_bytes_async(endpoint_key, params=params)) as chunks:
+            async for chunk in chunks:
+                await run_sync(pipeline.feed, chunk)
+        return await run_sync(pipeline.finish)
+    except BaseException:
+        pipeline.abort()
+        raise
+
+
+def _render_body(content: dict) -> RenderedBody:
+    """Serializa o payload (orjson se instalado) para guardar no cache; a compressão é feita por codificação sob demanda."""
+    return RenderedBody(render_json(content))
+
 
 @app.get("/wrapper/{endpoint_key}")
 async def wrapper_get(endpoint_key: str, request: Request):
@@ -42,6 +334,19 @@ async def wrapper_get(endpoint_key: str, request: Request):
     Rota encurtada: GET /wrapper/report_lia?from=2026-01-01&to=2026-01-14
     Resposta padrão: JSON tratado para dashboards (visao_geral, etc.), pronto para o front.
     Com ?view=full devolve o JSON otimizado completo (relatório bruto tratado).
+    Respostas ficam no cache em memória pelo TTL do endpoint; chamadas idênticas simultâneas aguardam
+    a mesma execução (header X-Wrapper-Cache: HIT, MISS, COALESCED ou STALE).
+    O corpo vai comprimido (br/gzip) conforme o Accept-Encoding, acima de WRAPPER_RESPONSE_COMPRESS_MIN_BYTES.
+    Toda resposta tem ETag; com If-None-Match igual devolve 304 sem corpo (num HIT, sem montar o payload).
+    Cache-Control vem de "cache_control" no endpoint (padrão WRAPPER_CACHE_CONTROL).
+    Com "stale_while_revalidate" no endpoint, um snapshot recente da consulta é devolvido na hora (X-Wrapper-Cache: STALE
+    e header Age) enquanto a resposta é recalculada em segundo plano.
+    Com ?refresh=full ignora o cache em memória e, em endpoints com "conversation_store", rebusca o período inteiro.
+    Server-Timing traz a duração de cada etapa desta requisição (upstream, parse, optimize, dashboard, save_*, ...).
+    Com ?profile=1 (só se WRAPPER_PROFILING_ENABLED) o pipeline roda sem cache sob cProfile e o resumo é salvo
+    na pasta do endpoint (header X-Wrapper-Profile com o nome do arquivo).
+    Com ?view=full e fields=, offset=, limit= ou cursor= a resposta sai em streaming, só com a página pedida
+    e os campos projetados (ver full_view); sem esses parâmetros o view=full continua com cache de corpo e ETag.
     """
     config = get_endpoint_config(endpoint_key)
     if not config:
@@ -53,46 +358,275 @@ async def wrapper_get(endpoint_key: str, request: Request):
     query_params = dict(request.query_params)
     view_full = query_params.pop("view", None) == "full"
     compare_previous_month = query_params.pop("compare", None) == "previous_month"
+    profile = query_params.pop("profile", None) in ("1", "true")
+    refresh_full = query_params.pop("refresh", None) == "full"
+    if profile and not PROFILING_ENABLED:
+        raise HTTPException(status_code=403, detail="Profiling desligado no servidor (WRAPPER_PROFILING_ENABLED)")
+    stream_query = {name: query_params.pop(name) for name in STREAM_PARAMS if view_full and name in query_params}
+    if stream_query:
+        try:
+            offset, limit = parse_page(stream_query)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Paginação inválida: {e}") from e
     params = {**config.get("default_params", {}), **query_params}
-    try:
-        raw = fetch_json(endpoint_key, params=params)
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Erro ao chamar API real: {e}") from e
-    save_raw(endpoint_key, raw, params=params, timestamp="latest")
-    optimized = optimize_report_response(raw)
-    save_optimized(endpoint_key, optimized, params=params, timestamp="latest")
-    run_comparison(endpoint_key, params, raw=raw, optimized=optimized, timestamp="latest")
-    if view_full:
-        return JSONResponse(
-            content=optimized,
-            headers={"X-Wrapper-View": "full"},
-        )
-    payload = build_dashboard_payload(optimized)
-    if compare_previous_month and params.get("from"):
+    with request_timings() as timings:
+        with metrics.timed("request", endpoint_key):
+            if stream_query:
+                projection = Projection(stream_query.get("fields"))
+                response = await _respond_full_stream(endpoint_key, request, params, projection, offset, limit, refresh_full)
+            else:
+                response = await _respond(endpoint_key, request, params, view_full, compare_previous_month, profile, refresh_full)
+    response.headers["Server-Timing"] = server_timing(timings)
+    response.headers["Timing-Allow-Origin"] = "*"
+    return response
+
+
+async def _cached_body(
+    endpoint_key: str,
+    params: dict,
+    view_full: bool,
+    compare_previous_month: bool,
+    profile: bool = False,
+    refresh_full: bool = False,
+    force: bool = False,
+) -> tuple[RenderedBody, str, dict]:
+    """
+    Corpo serializado de uma consulta: cache em memória ou pipeline (singleflight ou profiling).
+    Retorna (corpo, status do cache: HIT/MISS/COALESCED/STALE/PROFILE, headers extras).
+    force=True (prefetch) recalcula mesmo com a consulta no cache ou em snapshot.
+    """
+    view = "full" if view_full else "dashboard"
+    cache_key = make_cache_key(endpoint_key, params, view=view, compare=compare_previous_month)
+    ttl = get_endpoint_ttl(endpoint_key)
+    body = response_cache.get(cache_key) if ttl > 0 and not (profile or refresh_full or force) else None
+    if body is not None:
+        return body, "HIT", {}
+    max_stale = swr_max_stale(endpoint_key) if not view_full else 0.0
+
+    async def compute_body() -> RenderedBody:
+        payload = await _compute_payload(endpoint_key, params, view_full, compare_previous_month, refresh_full)
+        with metrics.timed("render", endpoint_key):
+            rendered = await run_sync(_render_body, payload)
+        metrics.observe_bytes(endpoint_key, "response", len(rendered))
+        response_cache.set(cache_key, rendered, ttl=ttl, size=len(rendered))
+        if max_stale > 0:
+            with metrics.timed("save_snapshot", endpoint_key):
+                await run_sync(save_snapshot, endpoint_key, cache_key, rendered.body)
+        return rendered
+
+    if max_stale > 0 and not (profile or refresh_full or force):
+        snapshot = await run_sync(load_snapshot, endpoint_key, cache_key, max_stale)
+        if snapshot is not None:
+            content, age = snapshot
+            count_swr("stale_served")
+            _revalidate(cache_key, compute_body)
+            return RenderedBody(content), "STALE", {"Age": str(int(age))}
+
+    if profile:
+        # Execução própria (sem singleflight), para o profile cobrir o pipeline inteiro
+        body, profile_path = await profile_call(endpoint_key, compute_body)
+        return body, "PROFILE", {"X-Wrapper-Profile": profile_path.name}
+    # refresh=full não aproveita uma execução normal em andamento (que pode usar o store)
+    body, shared = await _inflight.do((cache_key, "refresh") if refresh_full else cache_key, compute_body)
+    return body, "COALESCED" if shared else "MISS", {}
+
+
+def _revalidate(cache_key: tuple, compute_body) -> None:
+    """
+    Recalcula a consulta em segundo plano depois de servir um snapshot (uma revalidação por chave; requisições
+    sem snapshot que chegarem no meio aguardam a mesma execução pelo singleflight).
+    A task roda num contexto próprio, fora do Server-Timing da requisição que a disparou.
+    """
+    if cache_key in _revalidating:
+        return
+
+    async def run() -> None:
         try:
-            from_str = params["from"]
-            d = date.fromisoformat(from_str)
-            first_curr = d.replace(day=1)
-            prev_end = first_curr - timedelta(days=1)
-            prev_start = prev_end.replace(day=1)
-            params_anterior = {**params, "from": prev_start.isoformat(), "to": prev_end.isoformat()}
-            raw_anterior = fetch_json(endpoint_key, params=params_anterior)
-            optimized_anterior = optimize_report_response(raw_anterior)
-            visao_atual = payload["visao_geral"]
-            visao_anterior = build_visao_geral(optimized_anterior)
-            payload["comparativo_mes_anterior"] = build_comparativo_mes_anterior(visao_atual, visao_anterior)
-        except (ValueError, KeyError) as e:
-            payload["comparativo_mes_anterior"] = None
-    save_dashboard(endpoint_key, payload, params=params, timestamp="latest")
-    return JSONResponse(
-        content=payload,
-        headers={"X-Wrapper-View": "dashboard"},
+            await _inflight.do(cache_key, compute_body)
+            count_swr("revalidations")
+        except Exception:
+            count_swr("revalidation_errors")
+            logger.warning("Falha ao revalidar %s em segundo plano", cache_key[0], exc_info=True)
+        finally:
+            _revalidating.pop(cache_key, None)
+
+    _revalidating[cache_key] = asyncio.get_running_loop().create_task(run(), context=contextvars.Context())
+
+
+async def _prefetch(endpoint_key: str, params: dict, view_full: bool, compare_previous_month: bool) -> None:
+    """Recalcula uma consulta do agendador de prefetch e grava no cache em memória (e no snapshot, com SWR)."""
+    with metrics.timed("prefetch", endpoint_key):
+        await _cached_body(endpoint_key, params, view_full, compare_previous_month, force=True)
+
+
+async def _respond(
+    endpoint_key: str,
+    request: Request,
+    params: dict,
+    view_full: bool,
+    compare_previous_month: bool,
+    profile: bool = False,
+    refresh_full: bool = False,
+) -> Response:
+    """Monta a resposta do /wrapper: corpo de _cached_body, ETag/304 e compressão."""
+    view = "full" if view_full else "dashboard"
+    body, cache_status, extra_headers = await _cached_body(
+        endpoint_key, params, view_full, compare_previous_month, profile, refresh_full
     )
+    accept_encoding = request.headers.get("accept-encoding")
+    headers = {"X-Wrapper-View": view, "X-Wrapper-Cache": cache_status, "Vary": "Accept-Encoding", **extra_headers}
+    control = cache_control(endpoint_key)
+    if control:
+        headers["Cache-Control"] = control
+    if body.not_modified(request.headers.get("if-none-match")):
+        headers["ETag"] = body.etag(body.encoding_for(accept_encoding))
+        return Response(status_code=304, headers=headers)
+    if body.has_variant(accept_encoding):
+        content, content_encoding = body.variant(accept_encoding)
+    else:
+        # Primeira compressão deste corpo nesta codificação: CPU fora do event loop
+        with metrics.timed("compress", endpoint_key):
+            content, content_encoding = await run_sync(body.variant, accept_encoding)
+    headers["ETag"] = body.etag(content_encoding)
+    if content_encoding:
+        headers["Content-Encoding"] = content_encoding
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+async def _respond_full_stream(
+    endpoint_key: str,
+    request: Request,
+    params: dict,
+    projection: Projection,
+    offset: int,
+    limit: int | None,
+    refresh_full: bool = False,
+) -> StreamingResponse:
+    """
+    view=full paginado em streaming. Endpoints com "conversation_store" leem só a página do SQLite (sem projeção,
+    o JSON gravado vai direto para o corpo); os demais paginam o otimizado guardado em full_view_cache pelo TTL
+    do endpoint (uma execução do pipeline por consulta, coalescida no singleflight).
+    """
+    period = parse_range(params) if store_enabled(endpoint_key) else None
+    if period is not None:
+        plan = await _sync_store(endpoint_key, params, period, refresh_full)
+        meta = await run_sync(conversation_store.meta, plan)
+        total = await run_sync(conversation_store.count, plan, *period)
+        items = conversation_store.iter_items(plan, *period, offset, limit, raw=not projection)
+        cache_status = "STORE"
+    else:
+        cache_key = make_cache_key(endpoint_key, params, view="full_items")
+        ttl = get_endpoint_ttl(endpoint_key)
+        optimized = full_view_cache.get(cache_key) if ttl > 0 and not refresh_full else None
+        cache_status = "HIT"
+        if optimized is None:
+
+            async def compute_optimized() -> dict:
+                result = await _compute_payload(endpoint_key, params, True, False, refresh_full)
+                full_view_cache.set(cache_key, result, ttl=ttl, size=0)
+                return result
+
+            optimized, shared = await _inflight.do((cache_key, "refresh") if refresh_full else cache_key, compute_optimized)
+            cache_status = "COALESCED" if shared else "MISS"
+        data = optimized.get("data") if isinstance(optimized.get("data"), list) else []
+        meta, total = optimized, len(data)
+        items = islice(data, offset, None if limit is None else offset + limit)
+    encoding = choose_encoding(request.headers.get("accept-encoding"))
+    headers = {"X-Wrapper-View": "full", "X-Wrapper-Cache": cache_status, "Vary": "Accept-Encoding"}
+    control = cache_control(endpoint_key)
+    if control:
+        headers["Cache-Control"] = control
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    body = stream_full_view(meta, items, pagination(total, offset, limit), projection or None, encoding)
+    return StreamingResponse(body, media_type="application/json", headers=headers)
+
+
+@app.post("/wrapper/batch")
+async def wrapper_batch(request: Request):
+    """
+    Várias consultas do /wrapper numa chamada (formato em batch): até WRAPPER_BATCH_MAX_CONCURRENCY ao mesmo tempo,
+    itens iguais (endpoint, params, view, compare) executados uma vez só, e erros reportados por item.
+    Cada item usa o mesmo cache em memória e singleflight do GET /wrapper/{endpoint_key}.
+    """
+    try:
+        items = parse_batch(await request.json())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Batch inválido: {e}") from e
+    semaphore = asyncio.Semaphore(max(BATCH_MAX_CONCURRENCY, 1))
+
+    async def run(item: BatchItem) -> tuple[dict, bytes | None]:
+        head = {"endpoint_key": item.endpoint_key, "view": item.view}
+        # Só chaves do api_endpoints.json: get_endpoint_config aceitaria um path qualquer da API real com "/"
+        # (o GET /wrapper/{endpoint_key} nunca recebe "/", o corpo do batch sim)
+        config = get_endpoint_config(item.endpoint_key) if item.endpoint_key in load_endpoints() else None
+        if not config:
+            return {**head, "status": 404, "error": f"Endpoint desconhecido: {item.endpoint_key}"}, None
+        params = {**config.get("default_params", {}), **item.params}
+        try:
+            async with semaphore:
+                body, cache_status, _ = await _cached_body(
+                    item.endpoint_key, params, item.view_full, item.compare_previous_month, refresh_full=item.refresh_full
+                )
+        except HTTPException as e:
+            return {**head, "status": e.status_code, "error": e.detail}, None
+        except Exception as e:
+            logger.exception("Falha no item %s do batch (%s)", item.id, item.endpoint_key)
+            return {**head, "status": 500, "error": f"{type(e).__name__}: {e}"}, None
+        return {**head, "status": 200, "cache": cache_status, "etag": body.etag()}, body.body
+
+    # Itens iguais compartilham a mesma execução (mesmo sem estarem no ar ao mesmo tempo por causa do limite)
+    groups: dict[tuple, list[BatchItem]] = {}
+    for item in items:
+        params = {**(get_endpoint_config(item.endpoint_key) or {}).get("default_params", {}), **item.params}
+        key = make_cache_key(item.endpoint_key, params, view=item.view, compare=item.compare_previous_month, refresh=item.refresh_full)
+        groups.setdefault(key, []).append(item)
+    with request_timings() as timings:
+        with metrics.timed("request", "batch"):
+            outcomes = await asyncio.gather(*(run(group[0]) for group in groups.values()))
+            by_id = {item.id: outcome for group, outcome in zip(groups.values(), outcomes) for item in group}
+            content = await run_sync(render_batch, [(item, *by_id[item.id]) for item in items])
+            body = RenderedBody(content)
+            content, content_encoding = await run_sync(body.variant, request.headers.get("accept-encoding"))
+    headers = {"Vary": "Accept-Encoding", "Server-Timing": server_timing(timings), "Timing-Allow-Origin": "*"}
+    if content_encoding:
+        headers["Content-Encoding"] = content_encoding
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+@app.get("/stats")
+async def stats():
+    """Contadores internos do wrapper (cache em memória, coalescência de requisições e fila de comparação)."""
+    return {
+        "response_cache": response_cache.stats(),
+        "previous_month_cache": previous_month_cache.stats(),
+        "full_view_cache": full_view_cache.stats(),
+        "singleflight": _inflight.stats(),
+        "comparison_queue": comparison_queue.stats(),
+        "dashboard_shards": dict(shard_stats),
+        "conversation_store": conversation_store.stats(),
+        "stale_while_revalidate": {**swr_stats, "revalidating": len(_revalidating)},
+        "prefetch": prefetch_scheduler.stats(),
+    }
+
+
+@app.get("/metrics")
+async def metrics_prometheus():
+    """Métricas no formato de texto do Prometheus: latência por etapa e endpoint, tamanhos e status da API real."""
+    text = await run_in_threadpool(metrics.prometheus_text)
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/metrics/summary")
+async def metrics_summary():
+    """Resumo das métricas por endpoint em JSON: count, média e p50/p95/p99 de cada etapa e tamanho."""
+    return await run_in_threadpool(metrics.summary)
 
 
 def serve(port: int | None = None):
-    """Sobe o servidor uvicorn."""
+    """Sobe o servidor uvicorn (com o agendador de prefetch, salvo WRAPPER_PREFETCH_ENABLED=false)."""
     import uvicorn
+    prefetch_scheduler.autostart = PREFETCH_ENABLED
     uvicorn.run(
         "src.wrapper_server:app",
         host="0.0.0.0",